@@ -11,6 +11,10 @@ def create_app():
     app.config["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
     origins = [o.strip() for o in os.getenv("CORS_ORIGINS", "http://localhost:4200").split(",") if o.strip()]
     CORS(app, origins=origins, supports_credentials=True)
+    from . import metrics, responses, serving
+    responses.init_app(app)
+    metrics.init_app(app)
+    serving.init_app(app)
     from . import auth, profiles, projects, proposals, interviews, messages
     app.register_blueprint(auth.bp, url_prefix="/api/auth")
     app.register_blueprint(profiles.bp, url_prefix="/api/profiles")
@@ -18,4 +22,9 @@ def create_app():
     app.register_blueprint(proposals.bp, url_prefix="/api/proposals")
     app.register_blueprint(interviews.bp, url_prefix="/api/interviews")
     app.register_blueprint(messages.bp, url_prefix="/api/messages")
+    from .jobs import run_inline
+    from .live_index import warm_all
+    if not run_inline():
+        # Load the in-memory indexes now, in the background, instead of on the first request.
+        warm_all()
     return app
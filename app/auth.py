@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify, g
-from .auth_middleware import require_auth, get_current_user_id
+from .auth_middleware import require_auth, get_current_user_id, invalidate_role
 from .supabase_client import get_supabase
+from . import recommend
+from .directory import index_freelancer
+from .response_cache import invalidate
 
 bp = Blueprint("auth", __name__)
 
@@ -34,12 +37,22 @@ def create_profile():
     existing = _get_profile(supabase, g.user_id)
     if existing:
         supabase.table("profiles").update({"role": role}).eq("id", g.user_id).execute()
+        invalidate_role(g.user_id)
+        invalidate(f"profile:{g.user_id}")
         r2 = supabase.table("profiles").select("*").eq("id", g.user_id).single().execute()
+        if r2 and getattr(r2, "data", None):
+            index_freelancer(r2.data)
+            recommend.index_freelancer(r2.data)
         return jsonify(r2.data if r2 and hasattr(r2, "data") and r2.data else {})
     username = f"user_{g.user_id[:8]}"
     payload = {"id": g.user_id, "role": role, "username": username}
     supabase.table("profiles").insert(payload).execute()
+    invalidate_role(g.user_id)
+    invalidate(f"profile:{g.user_id}")
     r2 = supabase.table("profiles").select("*").eq("id", g.user_id).single().execute()
+    if r2 and getattr(r2, "data", None):
+        index_freelancer(r2.data)
+        recommend.index_freelancer(r2.data)
     return jsonify(r2.data if r2 and hasattr(r2, "data") and r2.data else payload), 201
 
 @bp.route("/session", methods=["GET"])
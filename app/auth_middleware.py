@@ -1,9 +1,92 @@
 import os
 import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from functools import wraps
-from flask import request, g, jsonify
+from flask import request, g, jsonify, has_request_context
+from .metrics import track
 
 _firebase_app = None
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+ROLE_CACHE_TTL = float(os.getenv("AUTH_ROLE_CACHE_TTL", "60"))
+_UNSET = object()
+
+
+class _TokenCache:
+    """LRU of verified ID tokens: sha256(token) -> (uid, exp). Entries die at the token's own exp."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        k = self.key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(k)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._data[k]
+                self.misses += 1
+                return None
+            self._data.move_to_end(k)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, uid: str, exp: float):
+        if self.maxsize <= 0 or exp <= time.time():
+            return
+        k = self.key(token)
+        with self._lock:
+            self._data[k] = (uid, exp)
+            self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, token: str | None = None, uid: str | None = None):
+        """Drop one token, every token for a uid, or (no args) everything."""
+        with self._lock:
+            if token is None and uid is None:
+                self._data.clear()
+                return
+            if token is not None:
+                self._data.pop(self.key(token), None)
+            if uid is not None:
+                for k in [k for k, v in self._data.items() if v[0] == uid]:
+                    del self._data[k]
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+_token_cache = _TokenCache(TOKEN_CACHE_SIZE)
+
+
+def invalidate_token_cache(token: str | None = None, uid: str | None = None):
+    """Forget cached verifications (e.g. after revoking a user's sessions)."""
+    _token_cache.invalidate(token=token, uid=uid)
+
+
+def token_cache_stats() -> dict:
+    return _token_cache.stats()
 
 
 def _get_firebase_app():
@@ -34,24 +117,79 @@ def _get_firebase_app():
 
 
 def _verify_firebase_token(token: str):
-    """Verify Firebase ID token and return uid, or None."""
+    """Verify Firebase ID token and return uid, or None. Verified tokens are cached until their exp."""
+    uid = _token_cache.get(token)
+    if uid:
+        return uid
     try:
         from firebase_admin import auth as firebase_auth
         _get_firebase_app()
-        decoded = firebase_auth.verify_id_token(token)
-        return decoded.get("uid")
+        with track("firebase", "verify_token"):
+            decoded = firebase_auth.verify_id_token(token)
     except Exception:
         return None
+    uid = decoded.get("uid")
+    if uid and decoded.get("exp"):
+        _token_cache.put(token, uid, float(decoded["exp"]))
+    return uid
+
+
+_role_cache = {}
+_role_lock = threading.Lock()
+
+
+def invalidate_role(uid: str | None = None):
+    """Drop the cached role for uid (or all roles). Call after any write that can change profiles.role."""
+    with _role_lock:
+        if uid is None:
+            _role_cache.clear()
+        else:
+            _role_cache.pop(uid, None)
+    if has_request_context() and getattr(g, "_auth_uid", None) == uid:
+        g.pop("_auth_role", None)
 
 
-def get_current_user_id():
+def get_user_role(uid: str):
+    """Return profiles.role for uid, or None. Memoized on g and in a process-wide TTL cache."""
+    if getattr(g, "_auth_uid", None) == uid and "_auth_role" in g:
+        return g._auth_role
+    now = time.monotonic()
+    with _role_lock:
+        entry = _role_cache.get(uid)
+    if entry is not None and entry[1] > now:
+        role = entry[0]
+    else:
+        from .supabase_client import get_supabase
+        supabase = get_supabase(service_role=True)
+        r = supabase.table("profiles").select("role").eq("id", uid).limit(1).execute()
+        role = r.data[0].get("role") if r and r.data else None
+        # Missing profiles are not cached: they are about to be created by /api/auth/profile.
+        if role is not None and ROLE_CACHE_TTL > 0:
+            with _role_lock:
+                _role_cache[uid] = (role, now + ROLE_CACHE_TTL)
+    if getattr(g, "_auth_uid", None) == uid:
+        g._auth_role = role
+    return role
+
+
+def get_current_user_id(allow_query_token: bool = False):
+    """Verified uid for this request, or None. The token is verified at most once per request.
+
+    allow_query_token also accepts ?access_token=, for clients such as EventSource that
+    cannot set an Authorization header.
+    """
+    uid = g.get("_auth_uid", _UNSET)
+    if uid is not _UNSET:
+        return uid
+    uid = None
     auth = request.headers.get("Authorization")
-    if not auth or not auth.startswith("Bearer "):
-        return None
-    token = auth[7:].strip()
-    if not token:
-        return None
-    return _verify_firebase_token(token)
+    token = auth[7:].strip() if auth and auth.startswith("Bearer ") else ""
+    if not token and allow_query_token:
+        token = (request.args.get("access_token") or "").strip()
+    if token:
+        uid = _verify_firebase_token(token)
+    g._auth_uid = uid
+    return uid
 
 
 def require_auth(f):
@@ -73,9 +211,7 @@ def require_role(role: str):
             if not uid:
                 return jsonify({"error": "Unauthorized"}), 401
             g.user_id = uid
-            supabase = __import__("app.supabase_client", fromlist=["get_supabase"]).get_supabase(service_role=True)
-            r = supabase.table("profiles").select("role").eq("id", uid).maybe_single().execute()
-            if not r.data or r.data.get("role") != role:
+            if get_user_role(uid) != role:
                 return jsonify({"error": "Forbidden"}), 403
             return f(*args, **kwargs)
         return decorated
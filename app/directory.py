@@ -0,0 +1,282 @@
+"""Freelancer directory: skill -> freelancer posting lists for filtering without scanning profiles.
+
+Each freelancer gets a slot number. Posting lists are bitsets stored as Python ints
+(bit n set = slot n), so AND/OR skill queries are single big-int operations. Hourly rates
+are indexed twice: a sorted (rate, slot) list for range edges and rate ordering, and
+per-bucket bitsets so a range filter is a handful of ORs instead of a walk over every profile.
+Slots are handed out in created_at order, so "newest first" is simply descending slot order;
+a profile that arrives out of order (e.g. re-added after switching back from client) triggers a
+rebuild that renumbers every slot.
+"""
+import math
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from .live_index import IndexNotReady, LiveIndex
+
+DIRECTORY_RESYNC_SECONDS = float(os.getenv("DIRECTORY_RESYNC_SECONDS", "600"))
+DIRECTORY_COLUMNS = "id, full_name, title, skills, hourly_rate, avatar_url, username, created_at, role"
+ENTRY_FIELDS = ("id", "full_name", "title", "skills", "hourly_rate", "avatar_url", "username", "created_at")
+RATE_BUCKET = 10
+SORTS = ("newest", "rate_asc", "rate_desc")
+# Below this many candidates it is cheaper to sort them directly than to walk the rate list.
+SMALL_RESULT = 2048
+
+
+def _bits(slots) -> int:
+    out = 0
+    for slot in slots:
+        out |= 1 << slot
+    return out
+
+
+def _iter_bits_desc(bits: int):
+    while bits:
+        top = bits.bit_length() - 1
+        yield top
+        bits ^= 1 << top
+
+
+def _rate(row):
+    v = row.get("hourly_rate")
+    try:
+        return float(v) if v is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class FreelancerDirectory:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._entries = []
+        self._created = []
+        self._by_id = {}
+        self._live = 0
+        self._skill_bits = {}
+        self._rates = []
+        self._rate_bits = {}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def upsert(self, row: dict):
+        pid = str(row["id"])
+        with self._lock:
+            if (row.get("role") or "freelancer") != "freelancer":
+                self._remove(pid)
+                return
+            entry = {k: row[k] for k in ENTRY_FIELDS if k in row}
+            slot = self._by_id.get(pid)
+            if slot is None and self._created and (row.get("created_at") or "") < self._created[-1]:
+                self._rebuild([e for e in self._entries if e is not None] + [entry])
+                return
+            if slot is None:
+                slot = len(self._entries)
+                self._entries.append(None)
+                self._created.append(row.get("created_at") or "")
+                self._by_id[pid] = slot
+                self._live |= 1 << slot
+            else:
+                old = self._entries[slot]
+                entry = {**old, **entry}
+                self._unindex(slot, old)
+            self._entries[slot] = entry
+            bit = 1 << slot
+            for skill in set(entry.get("skills") or []):
+                self._skill_bits[skill] = self._skill_bits.get(skill, 0) | bit
+            rate = _rate(entry)
+            if rate is not None:
+                insort(self._rates, (rate, slot))
+                bucket = int(rate // RATE_BUCKET)
+                self._rate_bits[bucket] = self._rate_bits.get(bucket, 0) | bit
+
+    def _rebuild(self, entries: list):
+        """Re-slot every entry in (created_at, id) order; also drops the holes left by removals."""
+        entries.sort(key=lambda e: (e.get("created_at") or "", str(e["id"])))
+        self._reset()
+        for entry in entries:
+            self.upsert(entry)
+
+    def remove(self, profile_id):
+        with self._lock:
+            self._remove(str(profile_id))
+
+    def _remove(self, pid: str):
+        slot = self._by_id.pop(pid, None)
+        if slot is None:
+            return
+        self._unindex(slot, self._entries[slot])
+        self._entries[slot] = None
+        self._live &= ~(1 << slot)
+
+    def _unindex(self, slot: int, entry: dict):
+        mask = ~(1 << slot)
+        for skill in set(entry.get("skills") or []):
+            bits = self._skill_bits.get(skill, 0) & mask
+            if bits:
+                self._skill_bits[skill] = bits
+            else:
+                self._skill_bits.pop(skill, None)
+        rate = _rate(entry)
+        if rate is not None:
+            i = bisect_left(self._rates, (rate, slot))
+            if i < len(self._rates) and self._rates[i] == (rate, slot):
+                del self._rates[i]
+            bucket = int(rate // RATE_BUCKET)
+            self._rate_bits[bucket] = self._rate_bits.get(bucket, 0) & mask
+
+    def _rate_range_bits(self, rate_min, rate_max) -> int:
+        if not self._rates:
+            return 0
+        lo_rate = rate_min if rate_min is not None else float("-inf")
+        hi_rate = rate_max if rate_max is not None else float("inf")
+        lo = bisect_left(self._rates, (lo_rate, -1))
+        hi = bisect_right(self._rates, (hi_rate, len(self._entries)))
+        # Buckets lying wholly inside [rate_min, rate_max] come from the bucket bitsets; only
+        # the partial buckets at either edge are read from the sorted list.
+        first = math.ceil(lo_rate / RATE_BUCKET) if rate_min is not None else min(self._rate_bits)
+        last = math.floor(hi_rate / RATE_BUCKET) - 1 if rate_max is not None else max(self._rate_bits)
+        if hi - lo <= SMALL_RESULT or first > last:
+            return _bits(slot for _, slot in self._rates[lo:hi])
+        bits = 0
+        for bucket in range(first, last + 1):
+            bits |= self._rate_bits.get(bucket, 0)
+        inner_lo = bisect_left(self._rates, (first * RATE_BUCKET, -1))
+        inner_hi = bisect_left(self._rates, ((last + 1) * RATE_BUCKET, -1))
+        bits |= _bits(slot for _, slot in self._rates[lo:inner_lo])
+        bits |= _bits(slot for _, slot in self._rates[inner_hi:hi])
+        return bits
+
+    def query(self, skills=None, match: str = "any", rate_min=None, rate_max=None, sort: str = "newest", limit: int = 50, after=None):
+        """Return (entries, total, next_after). after/next_after are the (sort key, id) of the last row served."""
+        with self._lock:
+            bits = self._live
+            if skills:
+                lists = [self._skill_bits.get(s, 0) for s in skills]
+                if match == "all":
+                    for b in lists:
+                        bits &= b
+                else:
+                    combined = 0
+                    for b in lists:
+                        combined |= b
+                    bits &= combined
+            if rate_min is not None or rate_max is not None:
+                bits &= self._rate_range_bits(rate_min, rate_max)
+            total = bits.bit_count()
+            if sort == "newest":
+                slots = self._page_newest(bits, limit + 1, after)
+            else:
+                slots = self._page_by_rate(bits, total, sort == "rate_desc", limit + 1, after)
+            entries = [self._entries[s] for s in slots]
+        next_after = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            last = entries[-1]
+            key = last.get("created_at") if sort == "newest" else _rate(last)
+            next_after = (key, str(last["id"]))
+        return entries, total, next_after
+
+    def _slot_after(self, after, key_fn):
+        slot = self._by_id.get(str(after[1]))
+        if slot is not None and self._entries[slot] is not None and key_fn(self._entries[slot]) == after[0]:
+            return slot
+        return None
+
+    def _page_newest(self, bits: int, n: int, after) -> list:
+        if after:
+            slot = self._slot_after(after, lambda e: e.get("created_at"))
+            if slot is None:
+                slot = bisect_left(self._created, after[0] or "")
+            bits &= (1 << slot) - 1
+        out = []
+        for slot in _iter_bits_desc(bits):
+            out.append(slot)
+            if len(out) >= n:
+                break
+        return out
+
+    def _page_by_rate(self, bits: int, total: int, desc: bool, n: int, after) -> list:
+        """Slots in hourly_rate order. Freelancers without a rate are left out of rate sorts."""
+        start = None
+        if after:
+            slot = self._slot_after(after, _rate)
+            start = (after[0], slot if slot is not None else (len(self._entries) if desc else -1))
+        if total <= SMALL_RESULT:
+            ranked = sorted((r, s) for r, s in ((_rate(self._entries[s]), s) for s in _iter_bits_desc(bits)) if r is not None)
+            if desc:
+                ranked.reverse()
+            if start is not None:
+                ranked = [x for x in ranked if (x < start if desc else x > start)]
+            return [s for _, s in ranked[:n]]
+        out = []
+        if desc:
+            i = bisect_left(self._rates, start) if start else len(self._rates)
+            while i > 0 and len(out) < n:
+                i -= 1
+                s = self._rates[i][1]
+                if bits >> s & 1:
+                    out.append(s)
+        else:
+            i = bisect_right(self._rates, start) if start else 0
+            while i < len(self._rates) and len(out) < n:
+                s = self._rates[i][1]
+                if bits >> s & 1:
+                    out.append(s)
+                i += 1
+        return out
+
+
+def _load(directory):
+    from .supabase_client import get_supabase, iter_pages
+    supabase = get_supabase(service_role=True)
+    query = lambda: supabase.table("profiles").select(DIRECTORY_COLUMNS).eq("role", "freelancer").order("created_at").order("id")
+    for row in iter_pages(query):
+        directory.upsert(row)
+
+
+freelancer_directory = LiveIndex(FreelancerDirectory, _load, DIRECTORY_RESYNC_SECONDS, "freelancer directory")
+
+
+def index_freelancer(row: dict):
+    """Refresh a profile in the directory after a write; non-freelancer rows are dropped."""
+    if row and row.get("id"):
+        freelancer_directory.apply("upsert", row)
+
+
+def _query_database(skills=None, match: str = "any", rate_min=None, rate_max=None, sort: str = "newest", limit: int = 50, after=None):
+    """FreelancerDirectory.query() against profiles, served while the directory is loading.
+    Same filters, order and (sort key, id) cursors; the total is only counted on the first page."""
+    from .pagination import keyset_filter
+    from .supabase_client import get_supabase
+    supabase = get_supabase(service_role=True)
+    q = supabase.table("profiles").select(", ".join(ENTRY_FIELDS), count=None if after else "exact").eq("role", "freelancer")
+    if skills:
+        q = q.contains("skills", skills) if match == "all" else q.overlaps("skills", skills)
+    if sort != "newest" and rate_min is None:
+        rate_min = 0  # rate sorts leave out freelancers without a rate
+    if rate_min is not None:
+        q = q.gte("hourly_rate", rate_min)
+    if rate_max is not None:
+        q = q.lte("hourly_rate", rate_max)
+    column, desc = ("created_at", True) if sort == "newest" else ("hourly_rate", sort == "rate_desc")
+    if after:
+        q = q.or_(keyset_filter(column, after[0], after[1], desc))
+    r = q.order(column, desc=desc).order("id", desc=desc).limit(limit + 1).execute()
+    entries = r.data or []
+    next_after = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        last = entries[-1]
+        next_after = (last.get("created_at") if sort == "newest" else _rate(last), str(last["id"]))
+    return entries, r.count, next_after
+
+
+def query_freelancers(**kwargs):
+    try:
+        return freelancer_directory.get().query(**kwargs)
+    except IndexNotReady:
+        return _query_database(**kwargs)
@@ -0,0 +1,223 @@
+"""In-process pub/sub hub feeding the /api/messages/stream Server-Sent Events endpoint.
+
+Write handlers call publish(); the hub fans events out to the open SSE connections of the
+recipients. Events travel through a pluggable backend: MemoryBackend delivers within this
+process, RedisStreamBackend (EVENT_BACKEND=redis, REDIS_URL) goes through a Redis stream
+so every worker process sees every event and assigns it the same id. The hub keeps the last
+EVENT_HISTORY events so a reconnecting client can resume from its Last-Event-ID.
+"""
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+EVENT_BACKEND = os.getenv("EVENT_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL")
+EVENT_STREAM_KEY = os.getenv("EVENT_STREAM_KEY", "freefreelancer:events")
+EVENT_HISTORY = int(os.getenv("EVENT_HISTORY", "2000"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_QUEUED_EVENTS = int(os.getenv("SSE_MAX_QUEUED_EVENTS", "200"))
+SSE_MAX_QUEUED_BYTES = int(os.getenv("SSE_MAX_QUEUED_BYTES", str(256 * 1024)))
+
+log = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Single-process backend: events are numbered and delivered synchronously."""
+
+    def __init__(self):
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._deliver = None
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, payload: dict):
+        with self._lock:
+            self._deliver(str(next(self._seq)), payload)
+
+
+class RedisStreamBackend:
+    """Multi-process backend: XADD on publish, and a listener thread per process doing XREAD."""
+
+    def __init__(self, url: str, key: str = EVENT_STREAM_KEY, maxlen: int = EVENT_HISTORY * 5):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("EVENT_BACKEND=redis requires the redis package") from e
+        self._redis = redis.Redis.from_url(url)
+        self.key = key
+        self.maxlen = maxlen
+
+    def start(self, deliver):
+        threading.Thread(target=self._listen, args=(deliver,), daemon=True, name="event-listener").start()
+
+    def publish(self, payload: dict):
+        self._redis.xadd(self.key, {"p": json.dumps(payload, default=str)}, maxlen=self.maxlen, approximate=True)
+
+    def _listen(self, deliver):
+        last = "$"
+        while True:
+            try:
+                resp = self._redis.xread({self.key: last}, block=5000, count=200)
+            except Exception:
+                log.exception("Reading the Redis event stream failed; retrying")
+                time.sleep(1)
+                continue
+            for _, entries in resp or []:
+                for event_id, fields in entries:
+                    last = event_id
+                    deliver(event_id.decode(), json.loads(fields[b"p"]))
+
+
+class Subscription:
+    """One SSE connection's bounded queue. Overflow drops the backlog and asks the client to resync."""
+
+    def __init__(self, user_id: str, max_events: int = SSE_MAX_QUEUED_EVENTS, max_bytes: int = SSE_MAX_QUEUED_BYTES):
+        self.user_id = user_id
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.overflowed = False
+        self.closed = False
+        self._queue = deque()
+        self._bytes = 0
+        self._cond = threading.Condition()
+
+    def push(self, event_id: str, event_type: str, data: str) -> bool:
+        """Queue an event. Returns True if this push overflowed the connection's cap."""
+        with self._cond:
+            if self.overflowed:
+                return False
+            self._queue.append((event_id, event_type, data))
+            self._bytes += len(data)
+            if len(self._queue) > self.max_events or self._bytes > self.max_bytes:
+                self._queue.clear()
+                self._bytes = 0
+                self.overflowed = True
+            self._cond.notify()
+            return self.overflowed
+
+    def close(self):
+        """Wake a waiting get() for good; the stream loop then ends."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def get(self, timeout: float):
+        """Next queued event, or None after timeout (or once overflowed or closed)."""
+        with self._cond:
+            if not self._queue and not self.overflowed and not self.closed:
+                self._cond.wait(timeout)
+            if not self._queue:
+                return None
+            event = self._queue.popleft()
+            self._bytes -= len(event[2])
+            return event
+
+
+class EventHub:
+    def __init__(self, backend, history: int = EVENT_HISTORY):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._subs = {}
+        self._history = deque(maxlen=history)
+        self.published = 0
+        self.delivered = 0
+        self.dropped_connections = 0
+        backend.start(self._deliver)
+
+    def publish(self, recipients, event_type: str, data: dict):
+        recipients = sorted({str(r) for r in recipients if r})
+        if recipients:
+            self.backend.publish({"to": recipients, "type": event_type, "data": data})
+            self.published += 1
+
+    def _deliver(self, event_id: str, payload: dict):
+        data = json.dumps(payload.get("data"), default=str, separators=(",", ":"))
+        event = (event_id, payload.get("type") or "message", data, payload.get("to") or [])
+        with self._lock:
+            self._history.append(event)
+            for uid in event[3]:
+                for sub in self._subs.get(uid, ()):
+                    if sub.push(event_id, event[1], data):
+                        self.dropped_connections += 1
+                    self.delivered += 1
+
+    def subscribe(self, user_id: str, last_event_id: str | None = None):
+        """Register a connection. Returns (subscription, replay); replay is None if the client
+        asked to resume from an event that is no longer in history and must refetch instead."""
+        sub = Subscription(str(user_id))
+        with self._lock:
+            self._subs.setdefault(sub.user_id, set()).add(sub)
+            if not last_event_id:
+                return sub, []
+            ids = [e[0] for e in self._history]
+            if last_event_id not in ids:
+                return sub, None
+            start = ids.index(last_event_id) + 1
+            replay = [(e[0], e[1], e[2]) for e in list(self._history)[start:] if sub.user_id in e[3]]
+        return sub, replay
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subs.get(sub.user_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.user_id]
+
+    def close_all(self):
+        """Wake every open stream so it ends (graceful shutdown)."""
+        with self._lock:
+            subs = [sub for group in self._subs.values() for sub in group]
+        for sub in subs:
+            sub.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "connections": sum(len(s) for s in self._subs.values()),
+                "users": len(self._subs),
+                "history": len(self._history),
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped_connections": self.dropped_connections,
+            }
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub() -> EventHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                if EVENT_BACKEND == "redis":
+                    if not REDIS_URL:
+                        raise RuntimeError("EVENT_BACKEND=redis requires REDIS_URL")
+                    backend = RedisStreamBackend(REDIS_URL)
+                else:
+                    backend = MemoryBackend()
+                _hub = EventHub(backend)
+    return _hub
+
+
+def publish(recipients, event_type: str, data: dict):
+    """Fire-and-forget publish from a write handler; a broken event backend never fails the write."""
+    try:
+        get_hub().publish(recipients, event_type, data)
+    except Exception:
+        log.exception("Publishing %s event failed", event_type)
+
+
+def format_sse(event_id: str | None, event_type: str, data: str) -> str:
+    out = ""
+    if event_id:
+        out += f"id: {event_id}\n"
+    return out + f"event: {event_type}\ndata: {data}\n\n"
@@ -1,13 +1,42 @@
+import logging
 import os
+from datetime import datetime, timezone, timedelta
 from flask import Blueprint, request, jsonify, g
 from .auth_middleware import require_auth, require_role
 from .supabase_client import get_supabase
+from .loaders import get_loader
+from .parallel import gather
+from .events import publish
+from .metrics import track
+from .jobs import QueueFull, get_queue, retry, run_inline
+from .question_cache import cache_key, question_cache
+from .scoring import build_transcript, enqueue_scoring, get_pipeline, load_answers, score_now, scoring_stale
 
 bp = Blueprint("interviews", __name__)
 
-PASS_THRESHOLD = 70
 MAX_RETAKES = 2
 COOLDOWN_HOURS = 24
+NUM_QUESTIONS = 5
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "20"))
+OPENAI_ATTEMPTS = int(os.getenv("OPENAI_ATTEMPTS", "3"))
+# A "generating" interview older than this lost its job (e.g. worker restart) and gets the static questions.
+GENERATION_STALE_SECONDS = float(os.getenv("INTERVIEW_GENERATION_STALE_SECONDS", "120"))
+# A "scoring" interview queued longer ago than this (and not queued here) is re-enqueued on poll.
+SCORING_STALE_SECONDS = float(os.getenv("INTERVIEW_SCORING_STALE_SECONDS", "300"))
+# A "score_failed" interview is re-enqueued on poll once this many seconds (doubling per
+# re-enqueue) have passed since it was last queued, at most INTERVIEW_SCORING_MAX_REQUEUES times.
+SCORING_REQUEUE_BACKOFF_SECONDS = float(os.getenv("INTERVIEW_SCORING_REQUEUE_BACKOFF_SECONDS", "60"))
+SCORING_MAX_REQUEUES = int(os.getenv("INTERVIEW_SCORING_MAX_REQUEUES", "3"))
+FALLBACK_QUESTIONS = [
+    "Describe your experience with the required skills for this project.",
+    "Tell us about a similar project you completed and the outcome.",
+    "How do you approach deadlines and scope changes?",
+    "What tools do you use for this type of work?",
+    "Why are you a good fit for this project?",
+]
+
+log = logging.getLogger(__name__)
+
 
 def _get_openai():
     try:
@@ -15,64 +44,131 @@ def _get_openai():
         key = os.getenv("OPENAI_API_KEY")
         if not key:
             return None
-        return OpenAI(api_key=key)
+        # Retries are ours (jobs.retry) so each attempt gets the full timeout and backoff.
+        return OpenAI(api_key=key, timeout=OPENAI_TIMEOUT_SECONDS, max_retries=0)
     except Exception:
         return None
 
+def _ask_for_questions(client, skills, freelancer_skills):
+    prompt = f"Generate exactly 5 short interview questions (one per line, no numbering) for a freelancer applying to a project. Project skills: {skills}. Freelancer skills: {freelancer_skills}. Mix: 40% technical, 40% scenario, 20% problem-solving. Each question one line."
+    with track("openai", "question_generation"):
+        resp = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}], max_tokens=400)
+    text = (resp.choices[0].message.content or "").strip()
+    questions = [q.strip() for q in text.split("\n") if q.strip()][:NUM_QUESTIONS]
+    if not questions:
+        raise ValueError("No questions in completion")
+    return questions
+
+def _generate_questions(skills, freelancer_skills):
+    """LLM questions with per-call timeout and retries, added to the question-set cache; the
+    static list if that fails."""
+    client = _get_openai()
+    if client:
+        try:
+            questions = retry(lambda: _ask_for_questions(client, skills, freelancer_skills), attempts=OPENAI_ATTEMPTS)
+            question_cache.put(cache_key(skills, freelancer_skills), questions)
+            return questions
+        except Exception:
+            log.exception("Question generation failed; using the static questions")
+    return list(FALLBACK_QUESTIONS)
+
+def _set_questions(interview_id, freelancer_id, questions):
+    """Move a generating interview to in_progress. Guarded on status so a late job cannot clobber it."""
+    supabase = get_supabase(service_role=True)
+    supabase.table("interviews").update({"questions": questions, "status": "in_progress"}).eq("id", interview_id).eq("status", "generating").execute()
+    publish([freelancer_id], "interview", {"interview_id": interview_id, "status": "in_progress"})
+
+def _question_job(interview_id, freelancer_id, skills, freelancer_skills):
+    _set_questions(interview_id, freelancer_id, _generate_questions(skills, freelancer_skills))
+
 @bp.route("/start/<project_id>", methods=["POST"])
 @require_auth
 @require_role("freelancer")
 def start_interview(project_id):
     supabase = get_supabase(service_role=True)
-    project = supabase.table("projects").select("id, skills, title").eq("id", project_id).maybe_single().execute()
-    if not project.data:
+    # Project, earlier attempts and the freelancer's skills in one concurrent round
+    project, existing, profile = gather(
+        lambda: supabase.table("projects").select("id, skills, title").eq("id", project_id).maybe_single().execute(),
+        lambda: supabase.table("interviews").select("id, passed, created_at").eq("project_id", project_id).eq("freelancer_id", g.user_id).order("created_at", desc=True).execute(),
+        lambda: supabase.table("profiles").select("skills").eq("id", g.user_id).maybe_single().execute(),
+    )
+    if not project or not project.data:
         return jsonify({"error": "Project not found"}), 404
     # Check existing completed interviews for this freelancer + project
-    existing = supabase.table("interviews").select("id, passed, created_at").eq("project_id", project_id).eq("freelancer_id", g.user_id).order("created_at", desc=True).execute()
     if existing.data and existing.data[0].get("passed"):
         return jsonify({"error": "You already passed the interview", "interview_id": existing.data[0]["id"]}), 400
     attempts = [e for e in (existing.data or [])]
     if len(attempts) >= MAX_RETAKES + 1:
         return jsonify({"error": "Max retakes reached"}), 400
     if attempts:
-        from datetime import datetime, timezone, timedelta
         last = datetime.fromisoformat(attempts[0]["created_at"].replace("Z", "+00:00"))
         if datetime.now(timezone.utc) - last < timedelta(hours=COOLDOWN_HOURS):
             return jsonify({"error": "Cooldown active", "retry_after": COOLDOWN_HOURS}), 429
-    # Create interview and generate questions
+    # Create the interview now; questions are generated off the request path, or here when
+    # there is no long-lived worker to run the job (run_inline).
     skills = project.data.get("skills") or []
-    profile = supabase.table("profiles").select("skills").eq("id", g.user_id).maybe_single().execute()
-    freelancer_skills = (profile.data or {}).get("skills") or []
-    client = _get_openai()
-    questions = []
-    if client:
-        prompt = f"Generate exactly 5 short interview questions (one per line, no numbering) for a freelancer applying to a project. Project skills: {skills}. Freelancer skills: {freelancer_skills}. Mix: 40% technical, 40% scenario, 20% problem-solving. Each question one line."
-        try:
-            resp = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}], max_tokens=400)
-            text = (resp.choices[0].message.content or "").strip()
-            questions = [q.strip() for q in text.split("\n") if q.strip()][:5]
-        except Exception:
-            pass
-    if not questions:
-        questions = [
-            "Describe your experience with the required skills for this project.",
-            "Tell us about a similar project you completed and the outcome.",
-            "How do you approach deadlines and scope changes?",
-            "What tools do you use for this type of work?",
-            "Why are you a good fit for this project?",
-        ]
+    freelancer_skills = ((profile.data if profile else None) or {}).get("skills") or []
+    cached = question_cache.get(cache_key(skills, freelancer_skills))
+    if not cached and run_inline():
+        cached = _generate_questions(skills, freelancer_skills)
     payload = {
         "project_id": project_id,
         "freelancer_id": g.user_id,
-        "questions": questions,
+        "questions": cached or [],
         "answers": [],
         "transcript": [],
         "score": None,
         "passed": None,
-        "status": "in_progress",
+        "status": "in_progress" if cached else "generating",
     }
     r = supabase.table("interviews").insert(payload).execute()
-    return jsonify(r.data[0] if r.data else {}), 201
+    inv = r.data[0] if r.data else {}
+    if not inv or cached:
+        return jsonify(inv), 201
+    try:
+        get_queue().submit("interview_questions", _question_job, inv["id"], g.user_id, skills, freelancer_skills, job_id=inv["id"])
+    except QueueFull:
+        _set_questions(inv["id"], g.user_id, list(FALLBACK_QUESTIONS))
+        inv = {**inv, "questions": list(FALLBACK_QUESTIONS), "status": "in_progress"}
+    return jsonify(inv), 201
+
+@bp.route("/<interview_id>/status", methods=["GET"])
+@require_auth
+def interview_status(interview_id):
+    """Cheap poll target while questions are generating."""
+    supabase = get_supabase(service_role=True)
+    r = supabase.table("interviews").select("id, status, created_at, score, passed, scoring_queued_at, scoring_requeues").eq("id", interview_id).eq("freelancer_id", g.user_id).maybe_single().execute()
+    if not r or not r.data:
+        return jsonify({"error": "Not found"}), 404
+    inv = r.data
+    job = get_queue().get(interview_id)
+    if inv["status"] == "generating" and not job:
+        created = datetime.fromisoformat(inv["created_at"].replace("Z", "+00:00"))
+        if datetime.now(timezone.utc) - created > timedelta(seconds=GENERATION_STALE_SECONDS):
+            _set_questions(interview_id, g.user_id, list(FALLBACK_QUESTIONS))
+            inv["status"] = "in_progress"
+    # Polls never score in the request, not even with BACKGROUND_MODE=inline; they only hand
+    # stale or failed interviews back to the pipeline, with a backoff and a bounded count.
+    if inv["status"] in ("scoring", "score_failed") and not run_inline() and not get_pipeline().is_queued(interview_id):
+        requeues = inv.get("scoring_requeues") or 0
+        wait = SCORING_STALE_SECONDS if inv["status"] == "scoring" else SCORING_REQUEUE_BACKOFF_SECONDS * 2 ** requeues
+        if requeues < SCORING_MAX_REQUEUES and scoring_stale(inv, wait):
+            # Conditional on the status we read, so concurrent polls enqueue it once.
+            u = supabase.table("interviews").update({
+                "status": "scoring",
+                "scoring_queued_at": datetime.now(timezone.utc).isoformat(),
+                "scoring_requeues": requeues + 1,
+            }).eq("id", interview_id).eq("status", inv["status"]).execute()
+            if u and u.data:
+                enqueue_scoring(interview_id)
+                inv["status"] = "scoring"
+    return jsonify({
+        "id": inv["id"],
+        "status": inv["status"],
+        "score": inv.get("score"),
+        "passed": inv.get("passed"),
+        "job": {k: job[k] for k in ("status", "created_at", "started_at", "finished_at")} if job else None,
+    })
 
 @bp.route("/<interview_id>", methods=["GET"])
 @require_auth
@@ -82,52 +178,49 @@ def get_interview(interview_id):
     if not r.data:
         return jsonify({"error": "Not found"}), 404
     if r.data["freelancer_id"] != g.user_id:
-        proj = supabase.table("projects").select("client_id").eq("id", r.data["project_id"]).maybe_single().execute()
-        if not proj.data or proj.data["client_id"] != g.user_id:
+        proj = get_loader("projects", "client_id").load(r.data["project_id"])
+        if not proj or proj["client_id"] != g.user_id:
             return jsonify({"error": "Forbidden"}), 403
-    return jsonify(r.data)
+    inv = r.data
+    if inv.get("answer_count") and not inv.get("transcript"):
+        # Answers live in interview_answers until the interview is scored.
+        inv["answers"] = load_answers(supabase, inv)
+        inv["transcript"] = build_transcript(inv.get("questions") or [], inv["answers"])
+    return jsonify(inv)
 
 @bp.route("/<interview_id>/answer", methods=["POST"])
 @require_auth
 @require_role("freelancer")
 def submit_answer(interview_id):
+    """Append one answer. Pass "index" (the question being answered) to make retries safe:
+    a submit for an index that is already answered is rejected with 409 instead of being
+    recorded against the next question."""
     data = request.get_json() or {}
     answer = (data.get("answer") or "").strip()
     if not answer:
         return jsonify({"error": "Answer required"}), 400
+    expected = data.get("index")
+    if expected is not None and (not isinstance(expected, int) or expected < 0):
+        return jsonify({"error": "index must be a non-negative integer"}), 400
     supabase = get_supabase(service_role=True)
-    r = supabase.table("interviews").select("*").eq("id", interview_id).eq("freelancer_id", g.user_id).maybe_single().execute()
-    if not r.data or r.data.get("status") != "in_progress":
+    r = supabase.rpc("append_interview_answer", {
+        "p_interview_id": interview_id,
+        "p_freelancer_id": g.user_id,
+        "p_answer": answer,
+        "p_expected_index": expected,
+    }).execute()
+    res = (r.data if r and hasattr(r, "data") else None) or {}
+    if not res.get("ok"):
+        if res.get("error") == "stale":
+            return jsonify({"error": "Answer already recorded for this question", "next_index": res.get("answer_count"), "total": res.get("question_count")}), 409
+        if res.get("error") == "complete":
+            return jsonify({"error": "All questions answered"}), 400
         return jsonify({"error": "Interview not found or not in progress"}), 400
-    inv = r.data
-    questions = inv.get("questions") or []
-    answers = list(inv.get("answers") or [])
-    transcript = list(inv.get("transcript") or [])
-    idx = len(answers)
-    if idx >= len(questions):
-        return jsonify({"error": "All questions answered"}), 400
-    transcript.append({"q": questions[idx], "a": answer})
-    answers.append(answer)
-    if len(answers) >= len(questions):
-        # Score with OpenAI if available
-        score = 75
-        client = _get_openai()
-        if client and transcript:
-            try:
-                prompt = f"Score this freelancer interview (0-100 integer only, one number). Be fair. Transcript: {transcript}. Reply with only the number."
-                resp = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}], max_tokens=10)
-                t = (resp.choices[0].message.content or "75").strip()
-                score = min(100, max(0, int("".join(c for c in t if c.isdigit()) or "75")))
-            except Exception:
-                pass
-        passed = score >= PASS_THRESHOLD
-        supabase.table("interviews").update({
-            "answers": answers,
-            "transcript": transcript,
-            "score": score,
-            "passed": passed,
-            "status": "completed",
-        }).eq("id", interview_id).execute()
-        return jsonify({"completed": True, "score": score, "passed": passed})
-    supabase.table("interviews").update({"answers": answers, "transcript": transcript}).eq("id", interview_id).execute()
-    return jsonify({"next_index": len(answers), "total": len(questions)})
+    if res["answer_count"] >= res["question_count"]:
+        if run_inline():
+            return jsonify({"completed": True, **score_now(interview_id)})
+        # The RPC already moved the interview to 'scoring'; the result arrives via the
+        # status endpoint, GET /<id>, or an 'interview' event on the message stream.
+        enqueue_scoring(interview_id)
+        return jsonify({"completed": True, "status": "scoring"}), 202
+    return jsonify({"next_index": res["answer_count"], "total": res["question_count"]})
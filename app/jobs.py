@@ -0,0 +1,133 @@
+"""Background jobs: a bounded in-process worker pool with status tracking, plus retry helpers.
+
+LocalJobQueue is the only backend today. Anything exposing submit/get/stats/shutdown can be
+returned from get_queue() instead (for example a wrapper around an external task queue).
+Job state here is per process; durable state, such as an interview's status, lives in the
+database row that the job writes back.
+
+Background threads need a process that outlives the response (gunicorn, index.py). Serverless
+platforms freeze the function once it has responded, so with BACKGROUND_MODE=inline (the
+default when VERCEL is set) callers do question generation and scoring inside the request
+instead; see run_inline().
+"""
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "200"))
+JOB_HISTORY_SECONDS = float(os.getenv("JOB_HISTORY_SECONDS", "3600"))
+BACKGROUND_MODE = os.getenv("BACKGROUND_MODE") or ("inline" if os.getenv("VERCEL") else "threads")
+
+log = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+def retry(fn, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0, retry_on=(Exception,)):
+    """Call fn() up to attempts times with exponential backoff and full jitter between tries."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except retry_on:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * (2 ** attempt))))
+
+
+def run_inline() -> bool:
+    """True when work must finish before the response is sent (no long-lived worker process)."""
+    return BACKGROUND_MODE == "inline"
+
+
+class LocalJobQueue:
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, kind: str, fn, *args, job_id: str | None = None, **kwargs) -> dict:
+        """Queue fn(*args, **kwargs). Raises QueueFull when max_pending jobs are already waiting or running."""
+        job = {
+            "id": job_id or str(uuid.uuid4()),
+            "kind": kind,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(kind)
+            self._pending += 1
+            self._prune()
+            self._jobs[job["id"]] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return dict(job)
+
+    def _run(self, job, fn, args, kwargs):
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        try:
+            fn(*args, **kwargs)
+            job["status"] = "completed"
+        except Exception as e:
+            log.exception("Background job %s failed", job["id"])
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+            with self._lock:
+                self._pending -= 1
+                if job["status"] == "completed":
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def _prune(self):
+        cutoff = time.time() - JOB_HISTORY_SECONDS
+        for jid in [jid for jid, j in self._jobs.items() if j["finished_at"] and j["finished_at"] < cutoff]:
+            del self._jobs[jid]
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> LocalJobQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = LocalJobQueue()
+    return _queue
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+# After a failed first load, wait this long before get() starts another one.
+LOAD_RETRY_SECONDS = 30.0
+
+_registry = []
+
+
+class IndexNotReady(Exception):
+    """The index has not finished its first load; callers serve the database path meanwhile."""
+
+
+class LiveIndex:
+    """A process-local index loaded from Supabase in the background and kept current by write handlers.
+
+    factory() builds an empty index and load(index) fills it. The first load runs on a
+    background thread, started by warm() (at app start) or by the first get(); until it is done
+    get() raises IndexNotReady, so no request waits on reading a whole table. Writes go through
+    apply(), which forwards to the live index and queues them while a rebuild is running so they
+    are replayed on the fresh copy. Every resync_seconds a background rebuild picks up writes
+    made by other worker processes.
+    """
+
+    def __init__(self, factory, load, resync_seconds: float = 0, name: str = "live"):
+        self.factory = factory
+        self.load = load
+        self.resync_seconds = resync_seconds
+        self.name = name
+        self._index = None
+        self._loaded_at = 0.0
+        self._failed_at = None
+        self._pending = None
+        self._state_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        _registry.append(self)
+
+    def _rebuild(self):
+        with self._state_lock:
+            self._pending = []
+        index = self.factory()
+        try:
+            self.load(index)
+        except Exception:
+            with self._state_lock:
+                self._pending = None
+            raise
+        with self._state_lock:
+            for op, args in self._pending:
+                getattr(index, op)(*args)
+            self._pending = None
+            self._index = index
+            self._loaded_at = time.monotonic()
+
+    def _resync(self, first: bool = False):
+        if not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            if first and self._index is not None:
+                return
+            self._rebuild()
+            self._failed_at = None
+        except Exception:
+            self._failed_at = time.monotonic()
+            log.exception("Loading the %s index failed", self.name)
+        finally:
+            self._build_lock.release()
+
+    def warm(self, wait: bool = False):
+        """Start the first load in the background (no-op if loaded or loading). wait=True loads
+        in the caller instead, after any load already running; for benchmarks and scripts."""
+        if wait:
+            with self._build_lock:
+                if self._index is None:
+                    self._rebuild()
+            return
+        if self._index is None and not self._build_lock.locked():
+            threading.Thread(target=self._resync, args=(True,), daemon=True, name=f"warm-{self.name}").start()
+
+    def get(self):
+        if self._index is None:
+            if self._failed_at is None or time.monotonic() - self._failed_at > LOAD_RETRY_SECONDS:
+                self.warm()
+            raise IndexNotReady(self.name)
+        if (
+            self.resync_seconds > 0
+            and time.monotonic() - self._loaded_at > self.resync_seconds
+            and not self._build_lock.locked()
+        ):
+            threading.Thread(target=self._resync, daemon=True).start()
+        return self._index
+
+    def peek(self):
+        """The current index without triggering a load (None until the first load is done)."""
+        return self._index
+
+    def apply(self, op: str, *args):
+        with self._state_lock:
+            if self._pending is not None:
+                self._pending.append((op, args))
+            index = self._index
+        if index is not None:
+            getattr(index, op)(*args)
+
+    def reset(self, index=None):
+        """Drop (or replace) the live index; used by tests and benchmarks."""
+        with self._state_lock:
+            self._index = index
+            self._loaded_at = time.monotonic()
+
+
+def warm_all(wait: bool = False):
+    """Start loading every index created so far (see LiveIndex.warm)."""
+    for live in _registry:
+        live.warm(wait)
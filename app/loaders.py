@@ -0,0 +1,63 @@
+from flask import g
+from .supabase_client import get_supabase
+
+
+class Loader:
+    """Request-scoped batching loader (DataLoader style) for one table and column list.
+
+    Keys queued with want() are fetched together by the next load()/load_many() in a single
+    in_() query; every row fetched is memoized for the rest of the request, including misses.
+    """
+
+    def __init__(self, table: str, columns: str, key: str = "id"):
+        self.table = table
+        self.key = key
+        cols = [c.strip() for c in columns.split(",")]
+        self.columns = columns if key in cols or "*" in cols else f"{key}, {columns}"
+        self._cache = {}
+        self._pending = set()
+
+    def want(self, *keys):
+        for k in keys:
+            if k is not None and str(k) not in self._cache:
+                self._pending.add(str(k))
+        return self
+
+    def _dispatch(self):
+        if not self._pending:
+            return
+        keys = list(self._pending)
+        self._pending.clear()
+        supabase = get_supabase(service_role=True)
+        r = supabase.table(self.table).select(self.columns).in_(self.key, keys).execute()
+        for row in (r.data if r and hasattr(r, "data") else []) or []:
+            self._cache[str(row[self.key])] = row
+        for k in keys:
+            self._cache.setdefault(k, None)
+
+    def load_many(self, keys) -> dict:
+        """Return {str(key): row or None} for keys, in one query for whatever is not cached yet."""
+        keys = [k for k in keys if k is not None]
+        self.want(*keys)
+        self._dispatch()
+        return {str(k): self._cache.get(str(k)) for k in keys}
+
+    def load(self, key):
+        if key is None:
+            return None
+        return self.load_many([key])[str(key)]
+
+    def prime(self, row: dict):
+        """Seed the cache with a row already fetched some other way (e.g. an embed)."""
+        if row and row.get(self.key) is not None:
+            self._cache[str(row[self.key])] = row
+
+
+def get_loader(table: str, columns: str, key: str = "id") -> Loader:
+    """The Loader for (table, columns, key) on this request, created on first use."""
+    loaders = g.setdefault("_loaders", {})
+    ident = (table, columns, key)
+    loader = loaders.get(ident)
+    if loader is None:
+        loader = loaders[ident] = Loader(table, columns, key)
+    return loader
@@ -1,25 +1,81 @@
 from datetime import datetime, timezone
-from flask import Blueprint, request, jsonify, g
-from .auth_middleware import require_auth
+from flask import Blueprint, Response, request, jsonify, g, stream_with_context
+from .auth_middleware import require_auth, get_current_user_id
+from .events import SSE_HEARTBEAT_SECONDS, format_sse, get_hub, publish
 from .supabase_client import get_supabase
+from .loaders import get_loader
+from .parallel import gather
+from .serving import draining
+from .responses import stream_json
+from .pagination import decode_cursor, encode_cursor, keyset_filter, page_limit
 
 bp = Blueprint("messages", __name__)
 
-def _unread_counts(supabase, thread_ids, my_id):
-    """Return dict thread_id -> count of messages received (not by me) and not read."""
-    if not thread_ids:
-        return {}
-    all_msgs = supabase.table("messages").select("thread_id,read_at,sender_id").in_("thread_id", list(thread_ids)).execute()
-    items = (all_msgs.data if all_msgs and hasattr(all_msgs, "data") else []) or []
-    counts = {}
-    for m in items:
-        if m.get("sender_id") == my_id:
-            continue
-        if m.get("read_at") is not None:
-            continue
-        tid = m.get("thread_id")
-        counts[tid] = counts.get(tid, 0) + 1
-    return counts
+PARTICIPANT_COLUMNS = "full_name, username"
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
+def _page_args(args):
+    """Parse before/after cursors, since timestamp and limit. Returns (opts, error message)."""
+    opts = {"limit": page_limit(args.get("limit", type=int), MESSAGE_PAGE_SIZE, MAX_MESSAGE_PAGE_SIZE)}
+    for name in ("before", "after"):
+        if args.get(name):
+            opts[name] = decode_cursor(args[name])
+            if opts[name] is None:
+                return None, f"Invalid {name} cursor"
+    if args.get("since"):
+        try:
+            datetime.fromisoformat(args["since"].replace("Z", "+00:00"))
+        except ValueError:
+            return None, "Invalid since timestamp"
+        opts["since"] = args["since"]
+    if "before" in opts and ("after" in opts or "since" in opts):
+        return None, "Use either before or after/since"
+    return opts, None
+
+def _message_page(supabase, thread_id, limit, before=None, after=None, since=None):
+    """One page of a thread's messages, oldest first, ordered on (created_at, id).
+
+    With no cursor this is the latest page; before pages backwards, after/since page forwards.
+    prev_cursor (pass as before) is None once the oldest message is reached; next_cursor
+    (pass as after) is the newest message served, so clients can poll for new messages.
+    """
+    q = supabase.table("messages").select("*").eq("thread_id", thread_id)
+    forward = after is not None or since is not None
+    if after:
+        q = q.or_(keyset_filter("created_at", after[0], after[1], desc=False))
+    elif since:
+        q = q.gt("created_at", since)
+    elif before:
+        q = q.or_(keyset_filter("created_at", before[0], before[1], desc=True))
+    r = q.order("created_at", desc=not forward).order("id", desc=not forward).limit(limit + 1).execute()
+    items = (r.data if r and hasattr(r, "data") else []) or []
+    has_more = len(items) > limit
+    items = items[:limit]
+    if not forward:
+        items.reverse()
+    first = encode_cursor(items[0]["created_at"], items[0]["id"]) if items else None
+    last = encode_cursor(items[-1]["created_at"], items[-1]["id"]) if items else None
+    return {
+        "items": items,
+        "prev_cursor": first if forward or has_more else None,
+        "next_cursor": last or (encode_cursor(*after) if after else (encode_cursor(*before) if before else None)),
+        "has_more": has_more,
+    }
+
+def _unread_column(thread, my_id):
+    return "client_unread" if thread["client_id"] == my_id else "freelancer_unread"
+
+def _participants(thread):
+    return [thread["client_id"], thread["freelancer_id"]]
+
+def _mark_read(supabase, thread, my_id):
+    """Stamp read_at on messages I received in this thread, zero my unread counter (one RPC) and
+    push a read receipt to both participants."""
+    r = supabase.rpc("mark_thread_read", {"p_thread_id": thread["id"], "p_reader_id": my_id}).execute()
+    read_at = r.data if r and getattr(r, "data", None) else datetime.now(timezone.utc).isoformat()
+    publish(_participants(thread), "read", {"thread_id": thread["id"], "reader_id": my_id, "read_at": read_at})
+    return read_at
 
 @bp.route("/threads", methods=["GET"])
 @require_auth
@@ -27,21 +83,25 @@ def list_threads():
     supabase = get_supabase(service_role=True)
     r = supabase.table("message_threads").select("*, projects(title)").or_(f"client_id.eq.{g.user_id},freelancer_id.eq.{g.user_id}").order("updated_at", desc=True).execute()
     data = (r.data if r and hasattr(r, "data") else []) or []
-    thread_ids = [t["id"] for t in data]
-    unread = _unread_counts(supabase, thread_ids, g.user_id)
     other_ids = list({(t["freelancer_id"] if t["client_id"] == g.user_id else t["client_id"]) for t in data})
-    profiles = {}
-    if other_ids:
-        for uid in other_ids:
-            p = supabase.table("profiles").select("full_name, username").eq("id", uid).maybe_single().execute()
-            if p and getattr(p, "data", None) and p.data:
-                profiles[str(uid)] = p.data
+    profiles = get_loader("profiles", PARTICIPANT_COLUMNS).load_many(other_ids)
     for t in data:
         oid = t["freelancer_id"] if t["client_id"] == g.user_id else t["client_id"]
         t["other_participant"] = profiles.get(str(oid))
-        t["unread_count"] = unread.get(t["id"], 0)
+        t["unread_count"] = t.get(_unread_column(t, g.user_id)) or 0
     return jsonify({"items": data})
 
+@bp.route("/unread", methods=["GET"])
+@require_auth
+def unread_total():
+    """Total unread messages for the nav-bar badge; only threads with a non-zero counter are read."""
+    supabase = get_supabase(service_role=True)
+    uid = g.user_id
+    r = supabase.table("message_threads").select("client_id, client_unread, freelancer_unread").or_(f"and(client_id.eq.{uid},client_unread.gt.0),and(freelancer_id.eq.{uid},freelancer_unread.gt.0)").execute()
+    data = (r.data if r and hasattr(r, "data") else []) or []
+    total = sum((t.get("client_unread") if t["client_id"] == uid else t.get("freelancer_unread")) or 0 for t in data)
+    return jsonify({"unread": total, "threads": len(data)})
+
 @bp.route("/thread/<thread_id>/read", methods=["POST"])
 @require_auth
 def mark_thread_read(thread_id):
@@ -49,34 +109,41 @@ def mark_thread_read(thread_id):
     thread = supabase.table("message_threads").select("*").eq("id", thread_id).maybe_single().execute()
     if not thread.data or (thread.data["client_id"] != g.user_id and thread.data["freelancer_id"] != g.user_id):
         return jsonify({"error": "Forbidden"}), 403
-    now = datetime.now(timezone.utc).isoformat()
-    supabase.table("messages").update({"read_at": now}).eq("thread_id", thread_id).neq("sender_id", g.user_id).execute()
+    _mark_read(supabase, thread.data, g.user_id)
     return jsonify({"ok": True}), 200
 
 @bp.route("/thread/<thread_id>", methods=["GET"])
 @require_auth
 def get_thread(thread_id):
     supabase = get_supabase(service_role=True)
-    thread = supabase.table("message_threads").select("*").eq("id", thread_id).maybe_single().execute()
-    if not thread.data:
+    thread = supabase.table("message_threads").select("*, projects(title)").eq("id", thread_id).maybe_single().execute()
+    if not thread or not thread.data:
         return jsonify({"error": "Not found"}), 404
     t = thread.data
     if t["client_id"] != g.user_id and t["freelancer_id"] != g.user_id:
         return jsonify({"error": "Forbidden"}), 403
-    messages = supabase.table("messages").select("*").eq("thread_id", thread_id).order("created_at", desc=False).execute()
-    proj = supabase.table("projects").select("title").eq("id", t["project_id"]).maybe_single().execute()
+    opts, err = _page_args(request.args)
+    if err:
+        return jsonify({"error": err}), 400
+    proj = t.pop("projects", None)
     other_id = t["freelancer_id"] if t["client_id"] == g.user_id else t["client_id"]
-    other = supabase.table("profiles").select("full_name, username").eq("id", other_id).maybe_single().execute()
+    # Page and other participant are independent. Read marking waits for the page so the
+    # messages always show their state before this visit (read_at unset = new since last visit).
+    page, other = gather(
+        lambda: _message_page(supabase, thread_id, **opts),
+        lambda: get_loader("profiles", PARTICIPANT_COLUMNS).load(other_id),
+    )
+    _mark_read(supabase, t, g.user_id)
     payload = {
         **t,
-        "messages": messages.data or [],
-        "project_title": proj.data.get("title") if proj and getattr(proj, "data", None) and proj.data else None,
-        "other_participant": other.data if other and getattr(other, "data", None) else None,
+        "prev_cursor": page["prev_cursor"],
+        "next_cursor": page["next_cursor"],
+        "has_more": page["has_more"],
+        "project_title": proj.get("title") if proj else None,
+        "other_participant": other,
     }
-    # Mark messages in this thread as read (for current user as receiver)
-    now = datetime.now(timezone.utc).isoformat()
-    supabase.table("messages").update({"read_at": now}).eq("thread_id", thread_id).neq("sender_id", g.user_id).execute()
-    return jsonify(payload)
+    payload[_unread_column(t, g.user_id)] = 0
+    return stream_json(page["items"], key="messages", head=payload)
 
 @bp.route("/thread", methods=["POST"])
 @require_auth
@@ -108,8 +175,10 @@ def list_messages(thread_id):
     thread = supabase.table("message_threads").select("*").eq("id", thread_id).maybe_single().execute()
     if not thread.data or (thread.data["client_id"] != g.user_id and thread.data["freelancer_id"] != g.user_id):
         return jsonify({"error": "Forbidden"}), 403
-    r = supabase.table("messages").select("*").eq("thread_id", thread_id).order("created_at", desc=False).execute()
-    return jsonify({"items": r.data or []})
+    opts, err = _page_args(request.args)
+    if err:
+        return jsonify({"error": err}), 400
+    return jsonify(_message_page(supabase, thread_id, **opts))
 
 @bp.route("/thread/<thread_id>/messages", methods=["POST"])
 @require_auth
@@ -123,6 +192,54 @@ def send_message(thread_id):
     if not thread.data or (thread.data["client_id"] != g.user_id and thread.data["freelancer_id"] != g.user_id):
         return jsonify({"error": "Forbidden"}), 403
     payload = {"thread_id": thread_id, "sender_id": g.user_id, "body": body}
+    # The insert trigger bumps updated_at (to created_at) and the recipient's unread counter.
     r = supabase.table("messages").insert(payload).execute()
-    supabase.table("message_threads").update({"updated_at": datetime.now(timezone.utc).isoformat()}).eq("id", thread_id).execute()
-    return jsonify(r.data[0] if r.data else {}), 201
+    message = r.data[0] if r.data else {}
+    recipients = _participants(thread.data)
+    if message:
+        publish(recipients, "message", {"thread_id": thread_id, "message": message})
+    publish(recipients, "thread", {"thread_id": thread_id, "updated_at": message.get("created_at")})
+    return jsonify(message), 201
+
+@bp.route("/stream", methods=["GET"])
+def stream():
+    """Server-Sent Events: message, thread and read events for the caller's threads.
+
+    Resumes from Last-Event-ID (header or ?last_event_id=) when the event is still in the hub's
+    history; otherwise a resync event tells the client to refetch /threads. Each open stream
+    holds one worker greenlet (or thread, outside gunicorn.conf.py). Streams end when the worker
+    starts draining; the client's automatic reconnect lands on another worker.
+    """
+    uid = get_current_user_id(allow_query_token=True)
+    if not uid:
+        return jsonify({"error": "Unauthorized"}), 401
+    hub = get_hub()
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    sub, replay = hub.subscribe(uid, last_id)
+
+    def events():
+        try:
+            yield "retry: 3000\n\n"
+            if replay is None:
+                yield format_sse(None, "resync", "{}")
+            for event in replay or []:
+                yield format_sse(*event)
+            while not draining():
+                event = sub.get(SSE_HEARTBEAT_SECONDS)
+                if event is not None:
+                    yield format_sse(*event)
+                elif sub.closed:
+                    return
+                elif sub.overflowed:
+                    # Client fell too far behind; it reconnects and refetches.
+                    yield format_sse(None, "resync", "{}")
+                    return
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            hub.unsubscribe(sub)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
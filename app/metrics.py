@@ -0,0 +1,222 @@
+"""Prometheus metrics: a small in-process registry rendered in text format at /metrics.
+
+Recorded here:
+- every request: latency histogram and status counter per blueprint, route and method;
+- upstream calls (Supabase by table and operation, OpenAI by purpose, Firebase token
+  verification, outbound page fetches): latency histogram and outcome counter;
+- per request, how many calls each upstream took and how long they took in total.
+At render time, the stats of the caches, job queue, scoring pipeline, event hub and Supabase
+pools are added as gauges. Values are per process; each worker serves its own /metrics.
+Set METRICS_TOKEN to require "Authorization: Bearer <token>" on /metrics.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+log = logging.getLogger(__name__)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            v = self._values.get(labels)
+            if v is None:
+                v = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            v[i] += 1
+            v[-1] += value
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for k, v in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), v[:-1]):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, k)} {v[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, k)} {cumulative}")
+        return lines
+
+
+http_duration = Histogram("http_request_duration_seconds", "Time to produce the response (first byte for streamed bodies).", ("blueprint", "route", "method"))
+http_requests = Counter("http_requests_total", "Requests by response status.", ("blueprint", "route", "method", "status"))
+upstream_duration = Histogram("upstream_call_duration_seconds", "Latency of calls to Supabase, OpenAI, Firebase and fetched pages.", ("upstream", "operation", "target"))
+upstream_calls = Counter("upstream_calls_total", "Upstream calls by outcome.", ("upstream", "operation", "target", "outcome"))
+request_upstream_calls = Histogram("http_request_upstream_calls", "Upstream calls made while serving one request.", ("route", "upstream"), COUNT_BUCKETS)
+request_upstream_seconds = Histogram("http_request_upstream_seconds", "Time spent in one upstream while serving one request.", ("route", "upstream"))
+
+_metrics = [http_duration, http_requests, upstream_duration, upstream_calls, request_upstream_calls, request_upstream_seconds]
+_collectors = []
+_tally_lock = threading.Lock()
+
+
+def observe_upstream(upstream: str, operation: str, target: str, seconds: float, ok: bool = True):
+    """Record one upstream call, and add it to the current request's tally if there is one."""
+    if not METRICS_ENABLED:
+        return
+    upstream_duration.observe(seconds, upstream, operation, target)
+    upstream_calls.inc(upstream, operation, target, "ok" if ok else "error")
+    if has_request_context():
+        # Pooled calls (app.parallel) share the request's g, so tally under a lock.
+        with _tally_lock:
+            tally = g.setdefault("_upstream_tally", {})
+            calls, total = tally.get(upstream, (0, 0.0))
+            tally[upstream] = (calls + 1, total + seconds)
+
+
+@contextmanager
+def track(upstream: str, operation: str, target: str = ""):
+    """Time the enclosed upstream call; an exception counts as an error outcome and propagates."""
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        observe_upstream(upstream, operation, target, time.perf_counter() - start, ok)
+
+
+def add_collector(name: str, collect):
+    """collect() -> dict (or None to skip); its numeric values render as app_<name>_<key> gauges.
+    A dict of dicts renders each inner dict with a "key" label (for example per-role pools)."""
+    _collectors.append((name, collect))
+
+
+def _render_collectors() -> list:
+    samples = {}
+    for name, collect in _collectors:
+        try:
+            stats = collect()
+        except Exception:
+            log.exception("Metrics collector %s failed", name)
+            continue
+        if not stats:
+            continue
+        groups = stats.items() if all(isinstance(v, dict) for v in stats.values()) else [(None, stats)]
+        for group, values in groups:
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                labels = f'{{key="{_escape(group)}"}}' if group is not None else ""
+                samples.setdefault(f"app_{name}_{key}", []).append(f"{labels} {value}")
+    lines = []
+    for metric, values in samples.items():
+        lines.append(f"# TYPE {metric} gauge")
+        lines += [metric + v for v in values]
+    return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    lines += _render_collectors()
+    return "\n".join(lines) + "\n"
+
+
+def _route():
+    rule = request.url_rule
+    return (request.blueprint or "", rule.rule if rule else "unmatched")
+
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.get("_metrics_start")
+    if start is None:
+        return response
+    blueprint, route = _route()
+    http_duration.observe(time.perf_counter() - start, blueprint, route, request.method)
+    http_requests.inc(blueprint, route, request.method, str(response.status_code))
+    tally = g.get("_upstream_tally") or {}
+    for upstream in ("supabase", "openai", "firebase", "page_fetch"):
+        calls, total = tally.get(upstream, (0, 0.0))
+        request_upstream_calls.observe(calls, route, upstream)
+        if calls:
+            request_upstream_seconds.observe(total, route, upstream)
+    return response
+
+
+def metrics_view():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render(), mimetype="text/plain; version=0.0.4")
+
+
+def _register_default_collectors():
+    if _collectors:
+        return
+    from . import auth_middleware, events, jobs, page_content, parallel, question_cache, recommend, response_cache, scoring, serving, similarity, supabase_client
+    add_collector("token_cache", auth_middleware.token_cache_stats)
+    add_collector("question_cache", question_cache.question_cache.stats)
+    add_collector("import_cache", page_content.extraction_cache.stats)
+    add_collector("supabase_pool", supabase_client.client_stats)
+    # Only report singletons that exist; collecting must not start a pool or a listener thread.
+    add_collector("response_cache", lambda: response_cache._cache.stats() if response_cache._cache else None)
+    add_collector("jobs", lambda: jobs._queue.stats() if jobs._queue else None)
+    add_collector("scoring", lambda: scoring._pipeline.stats() if scoring._pipeline else None)
+    add_collector("events", lambda: events._hub.stats() if events._hub else None)
+    add_collector("recommend", recommend.stats)
+    add_collector("similarity", similarity.stats)
+    add_collector("parallel", parallel.stats)
+    add_collector("admission", serving.stats)
+
+
+def init_app(app):
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    _register_default_collectors()
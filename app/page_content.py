@@ -0,0 +1,252 @@
+"""Fetching and reducing external profile pages for /api/profiles/import-from-link.
+
+Pages are fetched through a pooled requests.Session with streaming reads that stop at
+MAX_FETCH_BYTES. ETag/Last-Modified validators are remembered per canonical URL, so a
+re-import of an unchanged page is a 304 with no body. The HTML is reduced to readable text
+(scripts, styles, navigation and chrome dropped; links and images kept as URLs) before it is
+sent to the model. Extraction results are cached by (canonical URL, content hash).
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (compatible; FreeFreelancer/1.0; +https://freefreelancer.us)"
+MAX_FETCH_BYTES = int(os.getenv("IMPORT_MAX_FETCH_BYTES", str(1024 * 1024)))
+MAX_TEXT_CHARS = int(os.getenv("IMPORT_MAX_TEXT_CHARS", "40000"))
+FETCH_TIMEOUT = (5, 15)
+CHUNK_SIZE = 16 * 1024
+VALIDATOR_CACHE_SIZE = 512
+EXTRACTION_CACHE_SIZE = int(os.getenv("IMPORT_CACHE_SIZE", "512"))
+EXTRACTION_CACHE_TTL = float(os.getenv("IMPORT_CACHE_TTL", str(24 * 3600)))
+TRACKING_PREFIXES = ("utm_", "mc_")
+TRACKING_PARAMS = {"fbclid", "gclid", "ref", "trk"}
+
+FetchedPage = namedtuple("FetchedPage", "url text content_hash not_modified")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.headers["User-Agent"] = USER_AGENT
+                _session = s
+    return _session
+
+
+def _is_tracking(param: str) -> bool:
+    param = param.lower()
+    return param in TRACKING_PARAMS or param.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    """Lower-cased scheme/host, no fragment, tracking parameters dropped, remaining query sorted."""
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+class _LRU:
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (self.ttl and entry[1] < time.time() - self.ttl):
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        return {"size": size, "hits": self.hits, "misses": self.misses}
+
+
+_validators = _LRU(VALIDATOR_CACHE_SIZE)
+extraction_cache = _LRU(EXTRACTION_CACHE_SIZE, EXTRACTION_CACHE_TTL)
+
+
+class _Reducer(HTMLParser):
+    SKIP = {"script", "style", "noscript", "svg", "nav", "footer", "iframe", "form", "template", "button", "select", "canvas"}
+    # A <header> inside one of these introduces that content (a profile's name and headline);
+    # only the page-level banner header is boilerplate.
+    SECTIONING = {"article", "main", "section", "aside"}
+    BLOCK = {"p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "br", "tr", "section", "article", "main", "dd", "dt", "blockquote", "pre"}
+    META = {"description", "og:title", "og:description", "og:image", "twitter:description", "profile:username"}
+    MAX_JSON_LD = 5000
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.head = []
+        self._skip = 0
+        self._json_ld = None
+        self._title = None
+        self._links = []
+        self._sections = 0
+        self._headers = []
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == "script" and (a.get("type") or "").lower() == "application/ld+json":
+            self._json_ld = []
+            return
+        if tag == "header":
+            banner = self._sections == 0 or (a.get("role") or "").lower() == "banner"
+            self._headers.append(banner)
+            if banner:
+                self._skip += 1
+            return
+        if tag in self.SKIP:
+            self._skip += 1
+            return
+        if self._skip:
+            return
+        if tag in self.SECTIONING:
+            self._sections += 1
+        if tag == "title":
+            self._title = []
+        elif tag == "meta":
+            name = (a.get("name") or a.get("property") or "").lower()
+            if name in self.META and a.get("content"):
+                self.head.append(f"{name}: {a['content'].strip()}")
+        elif tag == "a":
+            self._links.append(a.get("href") or "")
+        elif tag == "img":
+            src = a.get("src") or ""
+            if src.startswith("http"):
+                alt = (a.get("alt") or "").strip()
+                self.out.append(f" [image: {alt + ' ' if alt else ''}{src}] ")
+        elif tag in self.BLOCK:
+            self.out.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._json_ld is not None:
+            data = "".join(self._json_ld).strip()
+            if data:
+                self.head.append("json-ld: " + data[: self.MAX_JSON_LD])
+            self._json_ld = None
+            return
+        if tag == "header":
+            if self._headers and self._headers.pop():
+                self._skip = max(0, self._skip - 1)
+            return
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+            return
+        if self._skip:
+            return
+        if tag in self.SECTIONING:
+            self._sections = max(0, self._sections - 1)
+        if tag == "title" and self._title is not None:
+            self.head.insert(0, "title: " + "".join(self._title).strip())
+            self._title = None
+        elif tag == "a" and self._links:
+            href = self._links.pop()
+            if href.startswith("http"):
+                self.out.append(f" ({href})")
+        elif tag in self.BLOCK:
+            self.out.append("\n")
+
+    def handle_data(self, data):
+        if self._json_ld is not None:
+            self._json_ld.append(data)
+        elif self._title is not None:
+            self._title.append(data)
+        elif not self._skip:
+            self.out.append(data)
+
+
+def reduce_html(html: str) -> str:
+    """Readable text of an HTML page: head metadata first, then body text with link/image URLs."""
+    parser = _Reducer()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    lines, prev = [], None
+    for line in "".join(parser.out).split("\n"):
+        line = re.sub(r"[ \t\r\f\v]+", " ", line).strip()
+        if line and line != prev:
+            lines.append(line)
+        prev = line or prev
+    text = "\n".join(parser.head + ([""] if parser.head else []) + lines)
+    return text[:MAX_TEXT_CHARS]
+
+
+def _decode(body: bytes, resp) -> str:
+    encoding = resp.encoding if "charset" in (resp.headers.get("Content-Type") or "").lower() else None
+    try:
+        return body.decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def fetch_page(url: str) -> FetchedPage:
+    """Fetch and reduce url. Raises requests.RequestException on network/HTTP errors."""
+    canon = canonical_url(url)
+    cached = _validators.get(canon)
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    with get_session().get(url, headers=headers, timeout=FETCH_TIMEOUT, allow_redirects=True, stream=True) as resp:
+        if resp.status_code == 304 and cached:
+            return FetchedPage(canon, cached["text"], cached["hash"], True)
+        resp.raise_for_status()
+        buf = bytearray()
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            buf += chunk
+            if len(buf) >= MAX_FETCH_BYTES:
+                del buf[MAX_FETCH_BYTES:]
+                break
+        raw = _decode(bytes(buf), resp)
+        content_type = (resp.headers.get("Content-Type") or "").lower()
+        text = reduce_html(raw) if "html" in content_type or raw.lstrip()[:1] == "<" else raw[:MAX_TEXT_CHARS]
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+    if etag or last_modified:
+        _validators.put(canon, {"etag": etag, "last_modified": last_modified, "text": text, "hash": content_hash})
+    return FetchedPage(canon, text, content_hash, False)
+
+
+def extraction_key(page: FetchedPage) -> str:
+    return json.dumps([page.url, page.content_hash])
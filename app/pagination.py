@@ -0,0 +1,51 @@
+import base64
+import json
+
+
+def quote(value) -> str:
+    """Quote a value for use inside a PostgREST or=(...) / and=(...) filter."""
+    s = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{s}"'
+
+
+def like_pattern(text: str) -> str:
+    """Quoted *text* ilike pattern with LIKE wildcards in the user input escaped."""
+    escaped = "".join("\\" + c if c in "%_\\" else c for c in text.replace("*", " "))
+    return quote(f"*{escaped}*")
+
+
+def encode_cursor(*parts) -> str:
+    raw = json.dumps(list(parts), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 2):
+    """Decode a cursor made by encode_cursor. Returns the list of parts, or None if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        parts = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(parts, list) or len(parts) != size:
+        return None
+    return parts
+
+
+def keyset_filter(column: str, value, row_id, desc: bool = True) -> str:
+    """or=(...) filter selecting rows strictly after (value, row_id) in ORDER BY column, id."""
+    op = "lt" if desc else "gt"
+    return f"{column}.{op}.{quote(value)},and({column}.eq.{quote(value)},id.{op}.{quote(row_id)})"
+
+
+def all_of(*groups: str) -> str:
+    """Combine several or=(...) bodies into one, since PostgREST takes a single or= parameter."""
+    groups = [grp for grp in groups if grp]
+    if len(groups) == 1:
+        return groups[0]
+    return "and(" + ",".join(f"or({grp})" for grp in groups) + ")"
+
+
+def page_limit(value, default: int = 50, maximum: int = 100) -> int:
+    if value is None:
+        return default
+    return max(1, min(int(value), maximum))
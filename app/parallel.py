@@ -0,0 +1,89 @@
+"""Run a request's independent upstream queries concurrently on one bounded, shared thread pool.
+
+    project, attempts, profile = gather(
+        lambda: supabase.table("projects")...execute(),
+        lambda: supabase.table("interviews")...execute(),
+        task(load_profile, user_id, timeout=2),
+    )
+
+Each call runs in a copy of the caller's context, so flask.g, the request and the app are
+visible to it. Results come back in argument order. If a call raises, or is still running
+after its timeout, calls that have not started yet are cancelled and the error is raised in
+the caller; a call that is already running cannot be interrupted, so it finishes in the
+background and its result is dropped. Calls made from inside a pooled call run inline, so
+nested fan-out cannot deadlock the pool.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", "16"))
+PARALLEL_TIMEOUT = float(os.getenv("PARALLEL_TIMEOUT", "15"))
+
+_executor = None
+_lock = threading.Lock()
+_in_pool = threading.local()
+
+
+class Task:
+    __slots__ = ("fn", "args", "kwargs", "timeout")
+
+    def __init__(self, fn, args=(), kwargs=None, timeout: float | None = None):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.timeout = timeout
+
+
+def task(fn, *args, timeout: float | None = None, **kwargs) -> Task:
+    """A call for gather() with its own timeout in seconds."""
+    return Task(fn, args, kwargs, timeout)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PARALLEL_WORKERS, thread_name_prefix="parallel")
+    return _executor
+
+
+def _run(t: Task):
+    _in_pool.active = True
+    try:
+        return t.fn(*t.args, **t.kwargs)
+    finally:
+        _in_pool.active = False
+
+
+def gather(*calls, timeout: float | None = None) -> list:
+    """Results of calls (zero-argument callables or task()s), run concurrently."""
+    tasks = [c if isinstance(c, Task) else Task(c) for c in calls]
+    default = PARALLEL_TIMEOUT if timeout is None else timeout
+    if len(tasks) < 2 or PARALLEL_WORKERS < 1 or getattr(_in_pool, "active", False):
+        return [t.fn(*t.args, **t.kwargs) for t in tasks]
+    executor = get_executor()
+    start = time.monotonic()
+    futures = [executor.submit(contextvars.copy_context().run, _run, t) for t in tasks]
+    results = []
+    try:
+        for t, f in zip(tasks, futures):
+            limit = t.timeout if t.timeout is not None else default
+            try:
+                results.append(f.result(timeout=max(0.0, start + limit - time.monotonic())))
+            except FutureTimeout:
+                raise TimeoutError(f"{getattr(t.fn, '__name__', 'call')} exceeded {limit}s") from None
+    except BaseException:
+        for f in futures:
+            f.cancel()
+        raise
+    return results
+
+
+def stats() -> dict | None:
+    if _executor is None:
+        return None
+    return {"workers": PARALLEL_WORKERS, "threads": len(_executor._threads), "queued": _executor._work_queue.qsize()}
@@ -4,13 +4,18 @@ import re
 import requests
 from openai import OpenAI
 from flask import Blueprint, request, jsonify, g
-from .auth_middleware import require_auth, require_role
+from .auth_middleware import require_auth, require_role, invalidate_role
 from .supabase_client import get_supabase
+from . import recommend
+from .directory import SORTS, index_freelancer, query_freelancers
+from .pagination import decode_cursor, encode_cursor, page_limit
+from .response_cache import cached_response, invalidate
+from .metrics import track
+from .page_content import extraction_cache, extraction_key, fetch_page
 
 bp = Blueprint("profiles", __name__)
 OPENAI_API_KEY = (os.getenv("OPENAI_API_KEY") or "").strip()
-MAX_PAGE_BYTES = 120_000
-USER_AGENT = "Mozilla/5.0 (compatible; FreeFreelancer/1.0; +https://freefreelancer.us)"
+MAX_PROMPT_CHARS = 30_000
 
 @bp.route("/me", methods=["GET", "PATCH"])
 @require_auth
@@ -27,18 +32,26 @@ def me():
     if not payload:
         return jsonify({"error": "No valid fields"}), 400
     r = supabase.table("profiles").update(payload).eq("id", g.user_id).execute()
+    invalidate_role(g.user_id)
+    invalidate(f"profile:{g.user_id}")
+    if r.data:
+        index_freelancer(r.data[0])
+        recommend.index_freelancer(r.data[0])
     return jsonify(r.data[0] if r.data else {})
 
 @bp.route("/freelancer/<username>", methods=["GET"])
+@cached_response(lambda p: [f"profile:{p['id']}"])
 def get_freelancer_by_username(username):
     supabase = get_supabase(service_role=True)
-    r = supabase.table("profiles").select("id, full_name, title, bio, skills, hourly_rate, avatar_url, username, created_at").eq("username", username).eq("role", "freelancer").maybe_single().execute()
-    if not r.data:
+    # Portfolio embedded (portfolio_items.user_id -> profiles.id) instead of a second query
+    r = supabase.table("profiles").select("id, full_name, title, bio, skills, hourly_rate, avatar_url, username, created_at, portfolio_items(*)").eq("username", username).eq("role", "freelancer").order("created_at", desc=True, foreign_table="portfolio_items").maybe_single().execute()
+    if not r or not r.data:
         return jsonify({"error": "Not found"}), 404
-    portfolio = supabase.table("portfolio_items").select("*").eq("user_id", r.data["id"]).order("created_at", desc=True).execute()
-    return jsonify({**r.data, "portfolio": portfolio.data or []})
+    profile = r.data
+    return jsonify({**profile, "portfolio": profile.pop("portfolio_items", None) or []})
 
 @bp.route("/client/<username>", methods=["GET"])
+@cached_response(lambda p: [f"profile:{p['id']}"])
 def get_client_by_username(username):
     supabase = get_supabase(service_role=True)
     r = supabase.table("profiles").select("id, full_name, company_name, industry, bio, avatar_url, username, website, created_at").eq("username", username).eq("role", "client").maybe_single().execute()
@@ -48,15 +61,22 @@ def get_client_by_username(username):
 
 @bp.route("/freelancers", methods=["GET"])
 def list_freelancers():
-    supabase = get_supabase(service_role=True)
     skills = request.args.getlist("skills") or request.args.get("skills", "").split(",")
     skills = [s.strip() for s in skills if s.strip()]
-    q = supabase.table("profiles").select("id, full_name, title, skills, hourly_rate, avatar_url, username").eq("role", "freelancer")
-    r = q.order("created_at", desc=True).limit(50).execute()
-    data = (r.data if r and hasattr(r, "data") else []) or []
-    if skills:
-        data = [p for p in data if p.get("skills") and any(s in (p.get("skills") or []) for s in skills)]
-    return jsonify({"items": data})
+    match = "all" if request.args.get("match") == "all" else "any"
+    rate_min = request.args.get("rate_min", type=float)
+    rate_max = request.args.get("rate_max", type=float)
+    sort = request.args.get("sort", "newest")
+    if sort not in SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORTS)}"}), 400
+    limit = page_limit(request.args.get("limit", type=int))
+    after = None
+    if request.args.get("cursor"):
+        after = decode_cursor(request.args["cursor"])
+        if after is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+    items, total, next_after = query_freelancers(skills=skills, match=match, rate_min=rate_min, rate_max=rate_max, sort=sort, limit=limit, after=after)
+    return jsonify({"items": items, "total": total, "next_cursor": encode_cursor(*next_after) if next_after else None})
 
 
 @bp.route("/me/portfolio", methods=["GET", "POST"])
@@ -80,6 +100,7 @@ def my_portfolio():
         "image_urls": data.get("image_urls") if isinstance(data.get("image_urls"), list) else [],
     }
     r = supabase.table("portfolio_items").insert(payload).execute()
+    invalidate(f"profile:{g.user_id}")
     return jsonify(r.data[0] if r.data else {})
 
 
@@ -93,6 +114,7 @@ def my_portfolio_item(item_id):
         return jsonify({"error": "Not found"}), 404
     if request.method == "DELETE":
         supabase.table("portfolio_items").delete().eq("id", item_id).eq("user_id", g.user_id).execute()
+        invalidate(f"profile:{g.user_id}")
         return jsonify({"ok": True})
     data = request.get_json() or {}
     allowed = {"title", "description", "link", "skills", "image_urls"}
@@ -106,28 +128,21 @@ def my_portfolio_item(item_id):
     if not payload:
         return jsonify({"error": "No valid fields"}), 400
     r = supabase.table("portfolio_items").update(payload).eq("id", item_id).eq("user_id", g.user_id).execute()
+    invalidate(f"profile:{g.user_id}")
     return jsonify(r.data[0] if r.data else {})
 
 
-def _fetch_page_content(url: str) -> str:
-    resp = requests.get(
-        url,
-        headers={"User-Agent": USER_AGENT},
-        timeout=15,
-        allow_redirects=True,
-    )
-    resp.raise_for_status()
-    text = resp.text
-    if len(text) > MAX_PAGE_BYTES:
-        text = text[:MAX_PAGE_BYTES] + "\n...[truncated]"
-    return text
+def _fetch_page_content(url: str):
+    """Reduced page text plus the canonical URL and content hash used as the extraction cache key."""
+    with track("page_fetch", "import"):
+        return fetch_page(url)
 
 
 def _extract_profile_with_openai(page_content: str) -> dict:
     if not OPENAI_API_KEY:
         return {"bio": "", "portfolio": []}
     client = OpenAI(api_key=OPENAI_API_KEY)
-    prompt = """Extract from this freelancer profile page (HTML or text from Upwork, Fiverr, LinkedIn, GitHub, etc.):
+    prompt = """Extract from this freelancer profile page (text reduced from HTML from Upwork, Fiverr, LinkedIn, GitHub, etc.):
 
 1) bio: A single string with the person's professional bio/summary. Use empty string if none found.
 2) portfolio: A JSON array of projects. Each project has: title (string), description (string), link (string URL or null), image (string image URL or null). Omit projects with no title.
@@ -136,14 +151,15 @@ Return only valid JSON, no markdown or explanation. Format:
 {"bio": "...", "portfolio": [{"title": "...", "description": "...", "link": "..." or null, "image": "..." or null}]}
 """
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You output only valid JSON."},
-                {"role": "user", "content": prompt + "\n\n---\n\n" + page_content[:80_000]},
-            ],
-            temperature=0.1,
-        )
+        with track("openai", "profile_extraction"):
+            completion = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You output only valid JSON."},
+                    {"role": "user", "content": prompt + "\n\n---\n\n" + page_content[:MAX_PROMPT_CHARS]},
+                ],
+                temperature=0.1,
+            )
         raw = (completion.choices[0].message.content or "").strip()
         raw = re.sub(r"^```\w*\n?", "", raw)
         raw = re.sub(r"\n?```\s*$", "", raw)
@@ -168,9 +184,15 @@ def import_from_link():
     if not url.startswith("http://") and not url.startswith("https://"):
         return jsonify({"error": "Invalid url"}), 400
     try:
-        content = _fetch_page_content(url)
+        page = _fetch_page_content(url)
     except requests.RequestException as e:
         print(e)
         return jsonify({"error": "Could not fetch URL", "detail": str(e)}), 400
-    result = _extract_profile_with_openai(content)
+    key = extraction_key(page)
+    result = extraction_cache.get(key)
+    if result is None:
+        result = _extract_profile_with_openai(page.text)
+        # Empty results are usually a failed or blocked extraction; let the next import retry.
+        if result["bio"] or result["portfolio"]:
+            extraction_cache.put(key, result)
     return jsonify(result)
@@ -1,34 +1,194 @@
+import html
+import logging
 from flask import Blueprint, request, jsonify, g
 from .auth_middleware import require_auth, require_role
 from .supabase_client import get_supabase
+from .pagination import all_of, decode_cursor, encode_cursor, keyset_filter, like_pattern, page_limit
+from .search import index_project, search_projects, unindex_project
+from .live_index import IndexNotReady
+from .response_cache import cached_response, invalidate
+from .responses import stream_json
+from . import recommend, similarity
 
 bp = Blueprint("projects", __name__)
+log = logging.getLogger(__name__)
 
 MIN_BUDGET = 1000
+TOTAL_MODES = ("exact", "planned", "estimated")
+LIST_COLUMNS = "*, profiles!client_id(full_name, company_name, username)"
+SUGGEST_LIMIT = 8
+
+
+def _search_response(supabase, search, skills, budget_min, budget_max, limit, offset):
+    """Ranked results from the search index, hydrated with one in_() query."""
+    hits, total = search_projects(search, skills=skills, budget_min=budget_min, budget_max=budget_max, limit=limit, offset=offset)
+    rows = {}
+    if hits:
+        r = supabase.table("projects").select(LIST_COLUMNS).in_("id", [h["id"] for h in hits]).eq("status", "open").execute()
+        rows = {str(p["id"]): p for p in r.data or []}
+    items = []
+    for h in hits:
+        p = rows.get(h["id"])
+        if p:
+            p["search"] = {"score": round(h["score"], 4), "highlight": h["highlight"]}
+            items.append(p)
+    next_cursor = encode_cursor("rank", offset + limit) if offset + limit < total else None
+    return jsonify({"items": items, "next_cursor": next_cursor, "total": total})
+
 
 @bp.route("", methods=["GET"])
 def list_projects():
     supabase = get_supabase(service_role=True)
-    q = supabase.table("projects").select("*, profiles!client_id(full_name, company_name, username)", count="exact").eq("status", "open").order("created_at", desc=True)
     skills = request.args.getlist("skills") or (request.args.get("skills") or "").split(",")
     skills = [s.strip() for s in skills if s.strip()]
     budget_min = request.args.get("budget_min", type=int)
     budget_max = request.args.get("budget_max", type=int)
     search = (request.args.get("q") or "").strip()
-    r = q.limit(50).execute()
-    items = r.data or []
+    limit = page_limit(request.args.get("limit", type=int))
+    cursor = request.args.get("cursor")
+    total_mode = request.args.get("total")
+    if total_mode not in TOTAL_MODES:
+        total_mode = None
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+    if search and request.args.get("sort", "relevance") == "relevance":
+        if after and after[0] != "rank":
+            return jsonify({"error": "Invalid cursor"}), 400
+        try:
+            return _search_response(supabase, search, skills, budget_min, budget_max, limit, int(after[1]) if after else 0)
+        except Exception as e:
+            # Fall back to the unranked database filter while the index loads or if search fails.
+            if not isinstance(e, IndexNotReady):
+                log.exception("Project search failed")
+            if after:
+                return jsonify({"error": "Search unavailable"}), 503
+    elif after and after[0] == "rank":
+        return jsonify({"error": "Invalid cursor"}), 400
+    # Counting only makes sense for the first page; later pages reuse the client's total.
+    count = total_mode if total_mode and not after else None
+    q = supabase.table("projects").select(LIST_COLUMNS, count=count).eq("status", "open")
+    or_groups = []
     if search:
-        search_lower = search.lower()
-        items = [p for p in items if search_lower in (p.get("title") or "").lower() or search_lower in (p.get("description") or "").lower()]
+        pattern = like_pattern(search)
+        or_groups.append(f"title.ilike.{pattern},description.ilike.{pattern}")
     if skills:
-        items = [p for p in items if p.get("skills") and any(s in (p.get("skills") or []) for s in skills)]
+        q = q.overlaps("skills", skills)
     if budget_min is not None:
-        items = [p for p in items if (p.get("budget") or 0) >= budget_min]
+        q = q.gte("budget", budget_min)
     if budget_max is not None:
-        items = [p for p in items if (p.get("budget") or 0) <= budget_max]
-    return jsonify({"items": items, "total": len(items)})
+        q = q.lte("budget", budget_max)
+    if after:
+        or_groups.append(keyset_filter("created_at", after[0], after[1]))
+    if or_groups:
+        q = q.or_(all_of(*or_groups))
+    r = q.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+    items = r.data or []
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+    return stream_json(items, tail=lambda: {"next_cursor": next_cursor, "total": r.count if count else None})
+
+@bp.route("/suggest", methods=["GET"])
+def suggest():
+    search = (request.args.get("q") or "").strip()
+    if not search:
+        return jsonify({"items": []})
+    try:
+        hits, _ = search_projects(search, limit=SUGGEST_LIMIT)
+    except IndexNotReady:
+        supabase = get_supabase(service_role=True)
+        r = supabase.table("projects").select("id, title").eq("status", "open").or_(f"title.ilike.{like_pattern(search)}").order("created_at", desc=True).limit(SUGGEST_LIMIT).execute()
+        return jsonify({"items": [{"id": p["id"], "title": p["title"], "highlight": html.escape(p["title"] or "")} for p in r.data or []]})
+    return jsonify({"items": [{"id": h["id"], "title": h["title"], "highlight": h["highlight"]["title"]} for h in hits]})
+
+@bp.route("/recommended", methods=["GET"])
+@require_auth
+@require_role("freelancer")
+def recommended_projects():
+    """Open projects ranked by skill fit with the freelancer's profile (or ?skills=)."""
+    skills = request.args.getlist("skills") or recommend.freelancer_skills(g.user_id)
+    supabase = get_supabase(service_role=True)
+    if skills is None:
+        r = supabase.table("profiles").select("skills").eq("id", g.user_id).maybe_single().execute()
+        skills = (r.data or {}).get("skills") if r else None
+    limit = page_limit(request.args.get("limit", type=int), default=20)
+    try:
+        matches = recommend.recommend_projects(skills or [], limit)
+    except IndexNotReady:
+        # Unranked until the matrix has loaded: newest open projects sharing a skill.
+        if not skills:
+            return jsonify({"items": []})
+        r = supabase.table("projects").select(LIST_COLUMNS).eq("status", "open").overlaps("skills", skills).order("created_at", desc=True).limit(limit).execute()
+        wanted = set(skills)
+        return jsonify({"items": [{**p, "match": {"score": None, "skills": [s for s in p.get("skills") or [] if s in wanted]}} for p in r.data or []]})
+    rows = {}
+    if matches:
+        r = supabase.table("projects").select(LIST_COLUMNS).in_("id", [m[0] for m in matches]).eq("status", "open").execute()
+        rows = {str(p["id"]): p for p in r.data or []}
+    items = []
+    for pid, score, matched, _ in matches:
+        p = rows.get(pid)
+        if p:
+            p["match"] = {"score": score, "skills": matched}
+            items.append(p)
+    return jsonify({"items": items})
+
+@bp.route("/<project_id>/suggested-freelancers", methods=["GET"])
+@require_auth
+@require_role("client")
+def suggested_freelancers(project_id):
+    """Freelancers ranked by skill fit with one of the client's projects."""
+    supabase = get_supabase(service_role=True)
+    r = supabase.table("projects").select("client_id, skills").eq("id", project_id).maybe_single().execute()
+    if not r or not r.data or r.data["client_id"] != g.user_id:
+        return jsonify({"error": "Forbidden"}), 403
+    limit = page_limit(request.args.get("limit", type=int), default=20)
+    skills = r.data.get("skills") or []
+    try:
+        matches = recommend.suggest_freelancers(skills, limit)
+    except IndexNotReady:
+        if not skills:
+            return jsonify({"items": []})
+        r = supabase.table("profiles").select(", ".join(recommend.FREELANCER_FIELDS)).eq("role", "freelancer").overlaps("skills", skills).order("created_at", desc=True).limit(limit).execute()
+        wanted = set(skills)
+        return jsonify({"items": [{**p, "match": {"score": None, "skills": [s for s in p.get("skills") or [] if s in wanted]}} for p in r.data or []]})
+    return jsonify({"items": [{**card, "match": {"score": score, "skills": matched}} for _, score, matched, card in matches]})
+
+@bp.route("/<project_id>/similar", methods=["GET"])
+def similar_projects(project_id):
+    """Open projects whose title and description read most like this one."""
+    supabase = get_supabase(service_role=True)
+    r = supabase.table("projects").select(similarity.INDEX_COLUMNS + ", skills").eq("id", project_id).maybe_single().execute()
+    if not r or not r.data:
+        return jsonify({"error": "Not found"}), 404
+    limit = page_limit(request.args.get("limit", type=int), default=10, maximum=50)
+    try:
+        hits = similarity.similar_projects(r.data, limit)
+    except IndexNotReady:
+        # Until the text index has loaded: newest open projects sharing a skill, unscored.
+        skills = r.data.get("skills") or []
+        if not skills:
+            return jsonify({"items": []})
+        rows_r = supabase.table("projects").select(LIST_COLUMNS).eq("status", "open").overlaps("skills", skills).neq("id", project_id).order("created_at", desc=True).limit(limit).execute()
+        return jsonify({"items": [{**p, "similarity": None} for p in rows_r.data or []]})
+    rows = {}
+    if hits:
+        rows_r = supabase.table("projects").select(LIST_COLUMNS).in_("id", [h["id"] for h in hits]).eq("status", "open").execute()
+        rows = {str(p["id"]): p for p in rows_r.data or []}
+    items = []
+    for h in hits:
+        p = rows.get(h["id"])
+        if p:
+            p["similarity"] = h["similarity"]
+            items.append(p)
+    return jsonify({"items": items})
 
 @bp.route("/<project_id>", methods=["GET"])
+@cached_response(lambda p: [f"project:{p['id']}", f"profile:{p.get('client_id')}"])
 def get_project(project_id):
     supabase = get_supabase(service_role=True)
     r = supabase.table("projects").select("*, profiles!client_id(full_name, company_name, username)").eq("id", project_id).maybe_single().execute()
@@ -65,7 +225,20 @@ def create_project():
         "status": "open",
     }
     r = supabase.table("projects").insert(payload).execute()
-    return jsonify(r.data[0] if r.data else {}), 201
+    if not r.data:
+        return jsonify({}), 201
+    project = r.data[0]
+    # Flag likely reposts before the new project joins the index it is checked against
+    # (null while the index is still loading).
+    try:
+        duplicates = similarity.possible_duplicates(project)
+    except Exception:
+        log.exception("Duplicate check failed for project %s", project.get("id"))
+        duplicates = None
+    index_project(project)
+    recommend.index_project(project)
+    similarity.index_project(project)
+    return jsonify({**project, "possible_duplicates": duplicates}), 201
 
 @bp.route("/<project_id>", methods=["PATCH"])
 @require_auth
@@ -85,6 +258,11 @@ def update_project(project_id):
     if not payload:
         return jsonify({"error": "No valid fields"}), 400
     r = supabase.table("projects").update(payload).eq("id", project_id).execute()
+    invalidate(f"project:{project_id}")
+    if r.data:
+        index_project(r.data[0])
+        recommend.index_project(r.data[0])
+        similarity.index_project(r.data[0])
     return jsonify(r.data[0] if r.data else {})
 
 @bp.route("/<project_id>", methods=["DELETE"])
@@ -99,6 +277,10 @@ def delete_project(project_id):
     if proposals.data and len(proposals.data) > 0:
         return jsonify({"error": "Cannot delete project with proposals"}), 400
     supabase.table("projects").delete().eq("id", project_id).execute()
+    invalidate(f"project:{project_id}")
+    unindex_project(project_id)
+    recommend.unindex_project(project_id)
+    similarity.unindex_project(project_id)
     return jsonify({"ok": True}), 200
 
 @bp.route("/<project_id>/close", methods=["POST"])
@@ -110,6 +292,10 @@ def close_project(project_id):
     if not existing.data or existing.data["client_id"] != g.user_id:
         return jsonify({"error": "Forbidden"}), 403
     r = supabase.table("projects").update({"status": "closed"}).eq("id", project_id).execute()
+    invalidate(f"project:{project_id}")
+    unindex_project(project_id)
+    recommend.unindex_project(project_id)
+    similarity.unindex_project(project_id)
     return jsonify(r.data[0] if r.data else {})
 
 @bp.route("/my", methods=["GET"])
@@ -1,9 +1,23 @@
 from flask import Blueprint, request, jsonify, g
-from .auth_middleware import require_auth, require_role
-from .supabase_client import get_supabase
+from .auth_middleware import require_auth, require_role, get_user_role
+from .supabase_client import get_supabase, iter_pages
+from .pagination import decode_cursor, encode_cursor, keyset_filter, page_limit
+from .responses import stream_json
+from .response_cache import invalidate
+from .search import unindex_project
+from . import recommend, similarity
 
 bp = Blueprint("proposals", __name__)
 
+SUMMARY_COLUMNS = "id, freelancer_id, status, proposed_budget, timeline, cover_letter_excerpt, interview_score, interview_passed, created_at, profiles!freelancer_id(full_name, title, username, avatar_url)"
+# sort -> (column, descending); every order ends in id for the keyset
+REVIEW_SORTS = {
+    "newest": ("created_at", True),
+    "score": ("interview_score", True),
+    "budget_asc": ("proposed_budget", False),
+    "budget_desc": ("proposed_budget", True),
+}
+
 @bp.route("", methods=["POST"])
 @require_auth
 @require_role("freelancer")
@@ -19,25 +33,21 @@ def create():
     if proposed_budget is None or int(proposed_budget) < 0:
         return jsonify({"error": "Valid proposed budget required"}), 400
     supabase = get_supabase(service_role=True)
-    # Must have passed interview for this project
-    interview = supabase.table("interviews").select("id, score, passed").eq("project_id", project_id).eq("freelancer_id", g.user_id).order("created_at", desc=True).limit(1).execute()
-    if not interview.data or not interview.data[0].get("passed"):
+    # Interview check, dedupe (unique on project_id, freelancer_id) and insert in one call
+    r = supabase.rpc("create_proposal", {
+        "p_project_id": project_id,
+        "p_freelancer_id": g.user_id,
+        "p_cover_letter": cover_letter,
+        "p_proposed_budget": int(proposed_budget),
+        "p_timeline": timeline,
+        "p_portfolio_item_ids": portfolio_item_ids,
+    }).execute()
+    res = (r.data if r and hasattr(r, "data") else None) or {}
+    if not res.get("ok"):
+        if res.get("error") == "duplicate":
+            return jsonify({"error": "You already submitted a proposal for this project"}), 400
         return jsonify({"error": "You must pass the AI interview before submitting a proposal"}), 400
-    existing = supabase.table("proposals").select("id").eq("project_id", project_id).eq("freelancer_id", g.user_id).execute()
-    if existing.data:
-        return jsonify({"error": "You already submitted a proposal for this project"}), 400
-    payload = {
-        "project_id": project_id,
-        "freelancer_id": g.user_id,
-        "cover_letter": cover_letter,
-        "proposed_budget": int(proposed_budget),
-        "timeline": timeline,
-        "portfolio_item_ids": portfolio_item_ids,
-        "interview_id": interview.data[0]["id"],
-        "status": "active",
-    }
-    r = supabase.table("proposals").insert(payload).execute()
-    return jsonify(r.data[0] if r.data else {}), 201
+    return jsonify(res.get("proposal") or {}), 201
 
 @bp.route("/my", methods=["GET"])
 @require_auth
@@ -60,8 +70,7 @@ def get_proposal(proposal_id):
         return jsonify({"error": "Not found"}), 404
     p = r.data
     if p["freelancer_id"] != g.user_id:
-        profile = supabase.table("profiles").select("role").eq("id", g.user_id).maybe_single().execute()
-        if not profile.data or profile.data.get("role") != "client" or p["projects"]["client_id"] != g.user_id:
+        if get_user_role(g.user_id) != "client" or p["projects"]["client_id"] != g.user_id:
             return jsonify({"error": "Forbidden"}), 403
     return jsonify(p)
 
@@ -70,14 +79,19 @@ def get_proposal(proposal_id):
 @require_role("client")
 def accept(proposal_id):
     supabase = get_supabase(service_role=True)
-    prop = supabase.table("proposals").select("*, projects(client_id)").eq("id", proposal_id).maybe_single().execute()
-    if not prop.data or prop.data["projects"]["client_id"] != g.user_id:
+    # Accepts, declines the project's other active proposals and starts the project atomically
+    r = supabase.rpc("accept_proposal", {"p_proposal_id": proposal_id, "p_client_id": g.user_id}).execute()
+    res = (r.data if r and hasattr(r, "data") else None) or {}
+    if not res.get("ok"):
+        if res.get("error") == "not_active":
+            return jsonify({"error": "Proposal no longer active"}), 400
         return jsonify({"error": "Forbidden"}), 403
-    if prop.data.get("status") != "active":
-        return jsonify({"error": "Proposal no longer active"}), 400
-    supabase.table("proposals").update({"status": "accepted"}).eq("id", proposal_id).execute()
-    supabase.table("projects").update({"status": "in_progress"}).eq("id", prop.data["project_id"]).execute()
-    return jsonify({"ok": True})
+    invalidate(f"project:{res['project_id']}")
+    # The project is in progress now: drop it from the open-project indexes.
+    unindex_project(res["project_id"])
+    recommend.unindex_project(res["project_id"])
+    similarity.unindex_project(res["project_id"])
+    return jsonify({"ok": True, "declined": res.get("declined", 0)})
 
 @bp.route("/<proposal_id>/decline", methods=["POST"])
 @require_auth
@@ -100,5 +114,34 @@ def list_by_project(project_id):
     proj = supabase.table("projects").select("client_id").eq("id", project_id).maybe_single().execute()
     if not proj.data or proj.data["client_id"] != g.user_id:
         return jsonify({"error": "Forbidden"}), 403
-    r = supabase.table("proposals").select("*, profiles!freelancer_id(full_name, title, username, avatar_url), interviews(score, passed, transcript)").eq("project_id", project_id).order("created_at", desc=True).execute()
-    return jsonify({"items": r.data or []})
+    if request.args.get("view") == "full":
+        rows = iter_pages(lambda: supabase.table("proposals").select("*, profiles!freelancer_id(full_name, title, username, avatar_url), interviews(score, passed, transcript)").eq("project_id", project_id).order("created_at", desc=True).order("id", desc=True), page_size=100)
+        return stream_json(rows)
+    # Summary rows only; transcripts and full cover letters come from GET /<proposal_id>.
+    sort = request.args.get("sort", "newest")
+    if sort not in REVIEW_SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(REVIEW_SORTS)}"}), 400
+    column, desc = REVIEW_SORTS[sort]
+    limit = page_limit(request.args.get("limit", type=int), default=20)
+    after = None
+    if request.args.get("cursor"):
+        # (sort, value, id): a cursor only continues the ordering that produced it.
+        after = decode_cursor(request.args["cursor"], size=3)
+        if after is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+        if after[0] != sort:
+            return jsonify({"error": f"Cursor was issued for sort={after[0]}"}), 400
+        after = after[1:]
+    q = supabase.table("proposals").select(SUMMARY_COLUMNS, count=None if after else "exact").eq("project_id", project_id)
+    status = request.args.get("status")
+    if status:
+        q = q.eq("status", status)
+    if after:
+        q = q.or_(keyset_filter(column, after[0], after[1], desc=desc))
+    r = q.order(column, desc=desc).order("id", desc=desc).limit(limit + 1).execute()
+    items = r.data or []
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(sort, items[-1][column], items[-1]["id"])
+    return jsonify({"items": items, "next_cursor": next_cursor, "total": None if after else r.count})
@@ -0,0 +1,149 @@
+"""Content-addressed cache of generated interview question sets.
+
+Sets are keyed by a hash of the normalized project skills, freelancer skills and
+PROMPT_VERSION, so applicants with the same skill mix share generated questions. Each key
+holds up to QUESTION_CACHE_VARIANTS sets: until that many exist, a lookup is a miss and the
+caller generates (and adds) a fresh set; after that, lookups sample one of them at random.
+An in-memory LRU sits in front of a persistent store (the interview_question_sets table).
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+
+PROMPT_VERSION = "v1"
+QUESTION_CACHE_SIZE = int(os.getenv("QUESTION_CACHE_SIZE", "2048"))
+QUESTION_CACHE_TTL = float(os.getenv("QUESTION_CACHE_TTL", str(7 * 24 * 3600)))
+QUESTION_CACHE_VARIANTS = int(os.getenv("QUESTION_CACHE_VARIANTS", "3"))
+QUESTION_CACHE_STORE = os.getenv("QUESTION_CACHE_STORE", "supabase")
+
+log = logging.getLogger(__name__)
+
+
+def _normalize(skills) -> list:
+    return sorted({s.strip().lower() for s in skills or [] if isinstance(s, str) and s.strip()})
+
+
+def cache_key(project_skills, freelancer_skills, version: str = PROMPT_VERSION) -> str:
+    raw = json.dumps([version, _normalize(project_skills), _normalize(freelancer_skills)], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SupabaseQuestionStore:
+    table = "interview_question_sets"
+
+    def get(self, key: str, limit: int, ttl: float) -> list:
+        """[(questions, stored_at epoch)] newest first, at most limit, younger than ttl."""
+        from .supabase_client import get_supabase
+        supabase = get_supabase(service_role=True)
+        since = (datetime.now(timezone.utc) - timedelta(seconds=ttl)).isoformat()
+        r = supabase.table(self.table).select("questions, created_at").eq("cache_key", key).gt("created_at", since).order("created_at", desc=True).limit(limit).execute()
+        out = []
+        for row in (r.data if r and hasattr(r, "data") else []) or []:
+            stored = datetime.fromisoformat(row["created_at"].replace("Z", "+00:00")).timestamp()
+            out.append((row["questions"], stored))
+        return out
+
+    def add(self, key: str, questions: list):
+        from .supabase_client import get_supabase
+        supabase = get_supabase(service_role=True)
+        supabase.table(self.table).insert({"cache_key": key, "prompt_version": PROMPT_VERSION, "questions": questions}).execute()
+
+
+class QuestionSetCache:
+    def __init__(self, maxsize: int = QUESTION_CACHE_SIZE, ttl: float = QUESTION_CACHE_TTL, variants: int = QUESTION_CACHE_VARIANTS, store=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self.store = store
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.store_errors = 0
+
+    def _fresh(self, sets: list) -> list:
+        cutoff = time.time() - self.ttl
+        return [s for s in sets if s[1] > cutoff]
+
+    def _sets(self, key: str):
+        """Cached sets for key and which tier answered ("memory", "store" or None)."""
+        with self._lock:
+            sets = self._data.get(key)
+            if sets is not None:
+                sets = self._fresh(sets)
+                self._data[key] = sets
+                self._data.move_to_end(key)
+                # Fewer than `variants` in memory: other workers may have added more to the store.
+                if len(sets) >= self.variants or self.store is None:
+                    return sets, "memory"
+        if self.store is None:
+            return [], None
+        try:
+            sets = self.store.get(key, self.variants, self.ttl)
+        except Exception:
+            log.exception("Reading question sets from the store failed")
+            self.store_errors += 1
+            return [], None
+        if sets:
+            self._remember(key, sets)
+        return sets, "store" if sets else None
+
+    def _remember(self, key: str, sets: list):
+        with self._lock:
+            self._data[key] = sets[: self.variants]
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get(self, key: str):
+        """A cached question set, or None if the caller should generate (and put) a new one."""
+        sets, tier = self._sets(key)
+        if len(sets) < self.variants:
+            self.misses += 1
+            return None
+        if tier == "memory":
+            self.memory_hits += 1
+        else:
+            self.store_hits += 1
+        return list(random.choice(sets)[0])
+
+    def put(self, key: str, questions: list):
+        entry = (list(questions), time.time())
+        with self._lock:
+            sets = self._fresh(self._data.get(key, []))
+            sets.insert(0, entry)
+        self._remember(key, sets)
+        self.fills += 1
+        if self.store is not None:
+            try:
+                self.store.add(key, entry[0])
+            except Exception:
+                log.exception("Saving a question set to the store failed")
+                self.store_errors += 1
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.store_hits + self.misses
+        with self._lock:
+            size = len(self._data)
+        return {
+            "keys": size,
+            "maxsize": self.maxsize,
+            "variants": self.variants,
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "fills": self.fills,
+            "store_errors": self.store_errors,
+            "hit_rate": (self.memory_hits + self.store_hits) / lookups if lookups else 0.0,
+        }
+
+
+question_cache = QuestionSetCache(store=SupabaseQuestionStore() if QUESTION_CACHE_STORE == "supabase" else None)
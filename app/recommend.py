@@ -0,0 +1,243 @@
+"""Skill-based recommendations: open projects for a freelancer, freelancers for a project.
+
+Each side (open projects, freelancers) is a sparse skill-incidence matrix kept as one NumPy
+array of row slots per skill. A query is an IDF-weighted cosine between the query's skills and
+every row: the posting arrays of the query's skills are scattered into a score vector with
+np.add.at, divided by the precomputed row norms, and the top k come from np.argpartition, so
+the work is proportional to the postings touched rather than to the number of rows. IDF is
+taken over the side being searched, so skills every freelancer lists count for little.
+Rows are updated in place on writes, with their norm computed from the current IDFs; all norms
+are recomputed lazily once enough writes have shifted the IDFs.
+"""
+import math
+import os
+import threading
+
+import numpy as np
+
+from .live_index import IndexNotReady, LiveIndex
+
+RECOMMEND_RESYNC_SECONDS = float(os.getenv("RECOMMEND_RESYNC_SECONDS", "600"))
+# Norms are refreshed once this fraction of rows has changed since the last refresh.
+NORM_REFRESH_RATIO = 0.01
+FREELANCER_FIELDS = ("id", "full_name", "title", "skills", "hourly_rate", "avatar_url", "username")
+INITIAL_SLOTS = 1024
+
+
+def _skills(row) -> list:
+    return sorted({s.strip().lower() for s in (row.get("skills") or []) if isinstance(s, str) and s.strip()})
+
+
+class SkillMatrix:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = []
+        self._by_id = {}
+        self._payloads = []
+        self._row_skills = []
+        self._free = []
+        self._norms = np.zeros(INITIAL_SLOTS, dtype=np.float32)
+        self._postings = {}  # skill -> set of slots
+        self._arrays = {}  # skill -> np.int32 array of slots, rebuilt after the set changes
+        self._count = 0
+        self._changed = 0
+        self._norms_stale = True
+
+    def __len__(self):
+        return self._count
+
+    def _grow(self, size: int):
+        n = len(self._norms)
+        if size > n:
+            self._norms = np.concatenate([self._norms, np.zeros(max(size, n * 2) - n, dtype=np.float32)])
+
+    def upsert(self, row_id, skills: list, payload: dict | None = None):
+        rid = str(row_id)
+        with self._lock:
+            slot = self._by_id.get(rid)
+            if slot is None:
+                slot = self._free.pop() if self._free else len(self._ids)
+                if slot == len(self._ids):
+                    self._ids.append(rid)
+                    self._payloads.append(None)
+                    self._row_skills.append(())
+                    self._grow(slot + 1)
+                self._ids[slot] = rid
+                self._by_id[rid] = slot
+                self._count += 1
+            else:
+                self._unpost(slot)
+            self._payloads[slot] = payload
+            self._row_skills[slot] = tuple(skills)
+            for skill in skills:
+                self._postings.setdefault(skill, set()).add(slot)
+                self._arrays.pop(skill, None)
+            self._norms[slot] = math.sqrt(sum(self.idf(skill) ** 2 for skill in skills))
+            self._touch()
+
+    def remove(self, row_id):
+        with self._lock:
+            slot = self._by_id.pop(str(row_id), None)
+            if slot is None:
+                return
+            self._unpost(slot)
+            self._norms[slot] = 0
+            self._payloads[slot] = None
+            self._row_skills[slot] = ()
+            self._free.append(slot)
+            self._count -= 1
+            self._touch()
+
+    def _unpost(self, slot: int):
+        for skill in self._row_skills[slot]:
+            slots = self._postings.get(skill)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self._postings[skill]
+            self._arrays.pop(skill, None)
+
+    def _touch(self):
+        self._changed += 1
+        if self._changed > max(1, self._count * NORM_REFRESH_RATIO):
+            self._norms_stale = True
+
+    def _postings_array(self, skill: str):
+        arr = self._arrays.get(skill)
+        if arr is None:
+            slots = self._postings.get(skill)
+            if not slots:
+                return None
+            arr = self._arrays[skill] = np.fromiter(slots, dtype=np.int32, count=len(slots))
+        return arr
+
+    def idf(self, skill: str) -> float:
+        """Smoothed inverse document frequency of skill among this matrix's rows."""
+        return math.log((1 + self._count) / (1 + len(self._postings.get(skill, ())))) + 1
+
+    def _refresh_norms(self):
+        norms = np.zeros(len(self._norms), dtype=np.float32)
+        for skill in self._postings:
+            np.add.at(norms, self._postings_array(skill), self.idf(skill) ** 2)
+        self._norms = np.sqrt(norms)
+        self._changed = 0
+        self._norms_stale = False
+
+    def skills_of(self, row_id):
+        with self._lock:
+            slot = self._by_id.get(str(row_id))
+            return list(self._row_skills[slot]) if slot is not None else None
+
+    def top(self, skills: list, k: int = 20, exclude=()) -> list:
+        """[(id, score, matched skills, payload)] of the k rows most similar to skills, best first."""
+        skills = _skills({"skills": skills})
+        with self._lock:
+            if not skills or not self._count:
+                return []
+            if self._norms_stale:
+                self._refresh_norms()
+            n = len(self._ids)
+            dots = np.zeros(n, dtype=np.float32)
+            query_norm = 0.0
+            for skill in skills:
+                w = self.idf(skill)
+                query_norm += w * w
+                arr = self._postings_array(skill)
+                if arr is not None:
+                    np.add.at(dots, arr, w * w)
+            for rid in exclude:
+                slot = self._by_id.get(str(rid))
+                if slot is not None:
+                    dots[slot] = 0
+            candidates = np.flatnonzero(dots)
+            if not len(candidates):
+                return []
+            scores = dots[candidates] / (math.sqrt(query_norm) * self._norms[candidates])
+            if len(candidates) > k:
+                part = np.argpartition(-scores, k - 1)[:k]
+                candidates, scores = candidates[part], scores[part]
+            order = np.lexsort((candidates, -scores))
+            wanted = set(skills)
+            return [
+                (self._ids[s], round(float(min(scores[i], 1.0)), 4), [x for x in self._row_skills[s] if x in wanted], self._payloads[s])
+                for i, s in ((i, int(candidates[i])) for i in order)
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"rows": self._count, "skills": len(self._postings), "postings": sum(len(v) for v in self._postings.values())}
+
+
+class ProjectMatrix(SkillMatrix):
+    def upsert(self, row: dict):
+        if (row.get("status") or "open") != "open":
+            self.remove(row["id"])
+            return
+        super().upsert(row["id"], _skills(row))
+
+
+class FreelancerMatrix(SkillMatrix):
+    def upsert(self, row: dict):
+        if (row.get("role") or "freelancer") != "freelancer":
+            self.remove(row["id"])
+            return
+        super().upsert(row["id"], _skills(row), {k: row[k] for k in FREELANCER_FIELDS if k in row})
+
+
+def _load_projects(matrix):
+    from .supabase_client import get_supabase, iter_pages
+    supabase = get_supabase(service_role=True)
+    for row in iter_pages(lambda: supabase.table("projects").select("id, skills, status").eq("status", "open").order("id")):
+        matrix.upsert(row)
+
+
+def _load_freelancers(matrix):
+    from .supabase_client import get_supabase, iter_pages
+    supabase = get_supabase(service_role=True)
+    columns = ", ".join(FREELANCER_FIELDS + ("role",))
+    for row in iter_pages(lambda: supabase.table("profiles").select(columns).eq("role", "freelancer").order("id")):
+        matrix.upsert(row)
+
+
+project_matrix = LiveIndex(ProjectMatrix, _load_projects, RECOMMEND_RESYNC_SECONDS, "project recommendations")
+freelancer_matrix = LiveIndex(FreelancerMatrix, _load_freelancers, RECOMMEND_RESYNC_SECONDS, "freelancer recommendations")
+
+
+def index_project(row: dict):
+    """Refresh a project's skills after a write (projects that are not open are dropped)."""
+    if row and row.get("id"):
+        project_matrix.apply("upsert", row)
+
+
+def unindex_project(project_id):
+    project_matrix.apply("remove", project_id)
+
+
+def index_freelancer(row: dict):
+    if row and row.get("id") and "skills" in row:
+        freelancer_matrix.apply("upsert", row)
+
+
+def recommend_projects(skills: list, k: int = 20, exclude=()) -> list:
+    return project_matrix.get().top(skills, k, exclude)
+
+
+def suggest_freelancers(skills: list, k: int = 20, exclude=()) -> list:
+    return freelancer_matrix.get().top(skills, k, exclude)
+
+
+def freelancer_skills(freelancer_id):
+    """Skills of a freelancer from the matrix, or None if they are not indexed (or it is loading)."""
+    try:
+        return freelancer_matrix.get().skills_of(freelancer_id)
+    except IndexNotReady:
+        return None
+
+
+def stats():
+    out = {}
+    for name, live in (("projects", project_matrix), ("freelancers", freelancer_matrix)):
+        index = live.peek()
+        if index is not None:
+            out[name] = index.stats()
+    return out or None
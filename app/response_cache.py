@@ -0,0 +1,249 @@
+"""Response cache for public read endpoints, with strong ETags and tag-based invalidation.
+
+@cached_response stores successful JSON responses keyed by path and query string, together
+with the tags returned by its tags function (for example "project:<id>", "profile:<id>").
+Write paths call invalidate(*tags) to drop every entry carrying any of those tags. Every
+cached response carries a strong ETag; a matching If-None-Match gets a 304 without touching
+the view. RESPONSE_CACHE_BACKEND=memory (default) keeps a per-process LRU, so other worker
+processes see invalidations only after RESPONSE_CACHE_TTL; RESPONSE_CACHE_BACKEND=redis
+shares entries and invalidations through REDIS_URL.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import make_response, request
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "0"))
+REDIS_URL = os.getenv("REDIS_URL")
+
+log = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (entry, tags, expires_at)
+        self._tags = {}  # tag -> set(keys)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[2] < time.time():
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key: str, entry: dict, tags, ttl: float):
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (entry, tuple(tags), time.time() + ttl)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+
+    def _drop(self, key: str):
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        for tag in item[1]:
+            keys = self._tags.get(tag)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class RedisBackend:
+    prefix = "freefreelancer:rc:"
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the redis package") from e
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        raw = self._redis.get(self.prefix + "k:" + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, entry: dict, tags, ttl: float):
+        pipe = self._redis.pipeline()
+        pipe.set(self.prefix + "k:" + key, json.dumps(entry), ex=max(1, int(ttl)))
+        for tag in tags:
+            pipe.sadd(self.prefix + "t:" + tag, key)
+            pipe.expire(self.prefix + "t:" + tag, max(1, int(ttl)))
+        pipe.execute()
+
+    def invalidate(self, tags):
+        for tag in tags:
+            keys = self._redis.smembers(self.prefix + "t:" + tag)
+            pipe = self._redis.pipeline()
+            for key in keys:
+                pipe.delete(self.prefix + "k:" + key.decode())
+            pipe.delete(self.prefix + "t:" + tag)
+            pipe.execute()
+
+    def size(self) -> int:
+        return -1
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: float = RESPONSE_CACHE_TTL, max_age: int = RESPONSE_CACHE_MAX_AGE):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.errors = 0
+        self.generation = 0
+
+    def cache_control(self) -> str:
+        # max-age=0 keeps clients revalidating, which is a cheap 304 while the entry is cached.
+        return f"public, max-age={self.max_age}, must-revalidate"
+
+    def respond(self, entry: dict):
+        if _etag_matches(entry["etag"]):
+            self.not_modified += 1
+            resp = make_response("", 304)
+        else:
+            resp = make_response(entry["body"], 200)
+            resp.headers["Content-Type"] = entry["content_type"]
+        resp.headers["ETag"] = entry["etag"]
+        resp.headers["Cache-Control"] = self.cache_control()
+        return resp
+
+    def get(self, key: str):
+        try:
+            entry = self.backend.get(key)
+        except Exception:
+            log.exception("Response cache get failed")
+            self.errors += 1
+            return None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key: str, entry: dict, tags):
+        try:
+            self.backend.set(key, entry, tags, self.ttl)
+        except Exception:
+            log.exception("Response cache set failed")
+            self.errors += 1
+
+    def invalidate(self, *tags):
+        tags = [t for t in tags if t]
+        if not tags:
+            return
+        self.invalidations += 1
+        self.generation += 1
+        try:
+            self.backend.invalidate(tags)
+        except Exception:
+            log.exception("Response cache invalidation failed")
+            self.errors += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": self.backend.size() if hasattr(self.backend, "size") else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _etag_matches(etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, and compression weakens our ETags (W/"...").
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if RESPONSE_CACHE_BACKEND == "redis":
+                    if not REDIS_URL:
+                        raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires REDIS_URL")
+                    backend = RedisBackend(REDIS_URL)
+                else:
+                    backend = MemoryBackend()
+                _cache = ResponseCache(backend)
+    return _cache
+
+
+def invalidate(*tags):
+    """Drop cached responses tagged with any of tags. Never raises into the write path."""
+    try:
+        get_cache().invalidate(*tags)
+    except Exception:
+        log.exception("Invalidating cached responses failed")
+
+
+def cached_response(tags):
+    """Cache a view's 200 JSON responses. tags(data) returns the invalidation tags for the body."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            key = request.full_path
+            entry = cache.get(key)
+            if entry is not None:
+                return cache.respond(entry)
+            generation = cache.generation
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or not resp.is_json:
+                return resp
+            body = resp.get_data()
+            entry = {"body": body.decode("utf-8"), "etag": make_etag(body), "content_type": resp.headers.get("Content-Type", "application/json")}
+            # A write invalidated while the view ran: serve this body but don't cache what may be stale.
+            if cache.generation == generation:
+                cache.set(key, entry, tags(resp.get_json()))
+            return cache.respond(entry)
+        return wrapper
+    return decorator
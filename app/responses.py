@@ -0,0 +1,166 @@
+"""Response encoding: orjson JSON provider, negotiated gzip/brotli compression and streamed JSON lists.
+
+init_app() installs OrjsonProvider (so jsonify and request.get_json use orjson) and an
+after_request hook that compresses responses of at least COMPRESS_MIN_BYTES when the client
+accepts br (if the brotli package is installed) or gzip. Streamed responses are compressed
+incrementally, chunk by chunk; Server-Sent Events are never compressed. stream_json() writes
+a {"items": [...]} style object as it iterates, so a list endpoint never holds the whole
+serialized body in memory.
+"""
+import gzip
+import os
+import zlib
+
+import orjson
+from flask import Response, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", str(16 * 1024)))
+COMPRESSIBLE = ("application/json", "text/")
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps_bytes(obj) -> bytes:
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def stream_json(items, key: str = "items", head: dict | None = None, tail=None, status: int = 200) -> Response:
+    """Stream {**head, key: [items...], **tail()} as items are iterated.
+
+    tail is a callable evaluated after the last item, for fields that depend on the iteration
+    (cursors, has_more). Items are serialized one at a time and flushed in STREAM_CHUNK_BYTES
+    chunks, so memory stays flat and the first bytes leave before the last row is fetched.
+    """
+    def generate():
+        buf = bytearray(b"{")
+        for k, v in (head or {}).items():
+            buf += dumps_bytes(k) + b":" + dumps_bytes(v) + b","
+        buf += dumps_bytes(key) + b":["
+        first = True
+        for item in items:
+            if not first:
+                buf += b","
+            first = False
+            buf += dumps_bytes(item)
+            if len(buf) >= STREAM_CHUNK_BYTES:
+                yield bytes(buf)
+                buf.clear()
+        buf += b"]"
+        for k, v in (tail() if tail else {}).items():
+            buf += b"," + dumps_bytes(k) + b":" + dumps_bytes(v)
+        buf += b"}\n"
+        yield bytes(buf)
+
+    return Response(stream_with_context(generate()), status=status, mimetype="application/json")
+
+
+def _accepted(header: str) -> dict:
+    out = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            out[name.strip().lower()] = q
+    return out
+
+
+def choose_encoding(header: str):
+    accepted = _accepted(header)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _compressor(encoding: str):
+    """(compress(chunk), flush()) for incremental compression of a streamed body."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        return c.process, lambda: c.flush() + c.finish()
+    c = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return (lambda chunk: c.compress(chunk) + c.flush(zlib.Z_SYNC_FLUSH)), c.flush
+
+
+def compress_response(response: Response) -> Response:
+    if response.status_code < 200 or response.status_code in (204, 206, 304) or request.method == "HEAD":
+        return response
+    if "Content-Encoding" in response.headers or not response.mimetype.startswith(COMPRESSIBLE):
+        return response
+    if response.mimetype == "text/event-stream":
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        compress, flush = _compressor(encoding)
+        chunks = response.response
+
+        def generate():
+            try:
+                for chunk in chunks:
+                    out = compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                    if out:
+                        yield out
+                yield flush()
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+
+        response.response = generate()
+        response.headers.pop("Content-Length", None)
+    else:
+        if response.direct_passthrough:
+            return response
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_BYTES:
+            return response
+        if encoding == "br":
+            body = brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+        else:
+            body = gzip.compress(body, COMPRESS_GZIP_LEVEL)
+        response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    # The encoded body differs byte-wise from the identity one, so a strong validator becomes weak.
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        response.headers["ETag"] = "W/" + etag
+    return response
+
+
+def init_app(app):
+    app.json = OrjsonProvider(app)
+    app.after_request(compress_response)
@@ -0,0 +1,357 @@
+"""Ranked full-text search over open projects.
+
+Two interchangeable backends share one interface (upsert / remove / search / __len__):
+MemorySearchBackend, a pure-Python inverted index with BM25F-style ranking, and
+SqliteSearchBackend, which uses SQLite FTS5 and its bm25(). Neither needs a live
+database, so both can be driven directly from benchmarks.
+
+The process-wide index is loaded from Supabase in the background (at app start, or on first
+use) and then kept current by index_project / unindex_project calls from the project write
+handlers; until it is ready search_projects raises IndexNotReady and callers use the database.
+A periodic background resync (SEARCH_RESYNC_SECONDS) picks up writes made by other worker
+processes.
+"""
+import heapq
+import html
+import math
+import os
+import re
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from .live_index import LiveIndex
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "memory")
+SEARCH_RESYNC_SECONDS = float(os.getenv("SEARCH_RESYNC_SECONDS", "600"))
+INDEX_COLUMNS = "id, title, description, skills, deliverables, budget, status, created_at"
+FIELD_WEIGHTS = {"title": 3.0, "skills": 2.5, "deliverables": 1.0, "description": 1.0}
+K1 = 1.2
+B = 0.75
+MAX_PREFIX_EXPANSIONS = 50
+MIN_PREFIX_LEN = 2
+SNIPPET_TOKENS = 24
+STOPWORDS = frozenset("a an and are as at be by for from in is it of on or the to with".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+[+#]*", re.IGNORECASE)
+
+
+def _as_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return " ".join(_as_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_as_text(v) for v in value)
+    return str(value)
+
+
+def tokenize(text: str) -> list:
+    return [t for t in (m.lower() for m in _TOKEN_RE.findall(text or "")) if t not in STOPWORDS]
+
+
+def parse_query(query: str, prefix: bool = True):
+    """Split a query into (terms, prefix). The trailing partial word is a prefix for typeahead."""
+    query = query or ""
+    raw = [m.lower() for m in _TOKEN_RE.findall(query)]
+    partial = None
+    if prefix and raw and query[-1:].isalnum():
+        partial = raw.pop()
+        if len(partial) < MIN_PREFIX_LEN:
+            partial = None if raw else partial
+    terms = []
+    for t in raw:
+        if t not in STOPWORDS and t not in terms:
+            terms.append(t)
+    return terms, partial
+
+
+def highlight(text: str, terms, prefix=None, window: int | None = None) -> str:
+    """HTML-escaped text with matching tokens wrapped in <mark>; cut to the best window if given."""
+    text = text or ""
+    tokens = [(m.start(), m.end(), m.group().lower()) for m in _TOKEN_RE.finditer(text)]
+    hits = [t in terms or (prefix is not None and t.startswith(prefix)) for _, _, t in tokens]
+    start, end = 0, len(text)
+    lead = trail = ""
+    if window and len(tokens) > window:
+        best, best_i = -1, 0
+        running = sum(hits[:window])
+        for i in range(len(tokens) - window + 1):
+            if i:
+                running += hits[i + window - 1] - hits[i - 1]
+            if running > best:
+                best, best_i = running, i
+        start = tokens[best_i][0]
+        end = tokens[best_i + window - 1][1]
+        lead = "… " if best_i else ""
+        trail = " …" if best_i + window < len(tokens) else ""
+    out, pos = [], start
+    for (s, e, _), hit in zip(tokens, hits):
+        if not hit or s < start or e > end:
+            continue
+        out.append(html.escape(text[pos:s]))
+        out.append("<mark>" + html.escape(text[s:e]) + "</mark>")
+        pos = e
+    out.append(html.escape(text[pos:end]))
+    return lead + "".join(out) + trail
+
+
+class _Doc:
+    __slots__ = ("id", "title", "description", "skills", "budget", "created_at", "tf", "length")
+
+    def __init__(self, row: dict):
+        self.id = str(row["id"])
+        self.title = row.get("title") or ""
+        self.description = row.get("description") or ""
+        self.skills = frozenset(row.get("skills") or [])
+        self.budget = row.get("budget") or 0
+        self.created_at = row.get("created_at") or ""
+        tf = {}
+        length = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(_as_text(row.get(field))):
+                tf[term] = tf.get(term, 0.0) + weight
+                length += weight
+        self.tf = tf
+        self.length = length
+
+    def matches(self, skills, budget_min, budget_max) -> bool:
+        if skills and self.skills.isdisjoint(skills):
+            return False
+        if budget_min is not None and self.budget < budget_min:
+            return False
+        if budget_max is not None and self.budget > budget_max:
+            return False
+        return True
+
+
+class MemorySearchBackend:
+    """Inverted index: term -> {project_id: field-weighted tf}, plus a sorted vocabulary for prefixes."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._postings = {}
+        self._vocab = []
+        self._total_len = 0.0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def upsert(self, row: dict):
+        doc = _Doc(row)
+        with self._lock:
+            self._remove(doc.id)
+            if (row.get("status") or "open") != "open":
+                return
+            self._docs[doc.id] = doc
+            self._total_len += doc.length
+            for term, tf in doc.tf.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = {}
+                    insort(self._vocab, term)
+                posting[doc.id] = tf
+
+    def remove(self, project_id):
+        with self._lock:
+            self._remove(str(project_id))
+
+    def _remove(self, project_id: str):
+        doc = self._docs.pop(project_id, None)
+        if doc is None:
+            return
+        self._total_len -= doc.length
+        for term in doc.tf:
+            posting = self._postings[term]
+            del posting[project_id]
+            if not posting:
+                del self._postings[term]
+                del self._vocab[bisect_left(self._vocab, term)]
+
+    def _expand(self, prefix: str) -> list:
+        out = []
+        i = bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix) and len(out) < MAX_PREFIX_EXPANSIONS:
+            out.append(self._vocab[i])
+            i += 1
+        return out
+
+    def search(self, query: str, skills=None, budget_min=None, budget_max=None, limit: int = 20, offset: int = 0, prefix: bool = True):
+        """Return (hits, total). Every query word must match; the last word may match as a prefix."""
+        terms, partial = parse_query(query, prefix)
+        groups = [[t] for t in terms]
+        with self._lock:
+            if partial is not None:
+                groups.append(self._expand(partial))
+            if not groups or not self._docs:
+                return [], 0
+            n = len(self._docs)
+            avg_len = self._total_len / n or 1.0
+            # Rarest group first so the running intersection stays small.
+            groups.sort(key=lambda grp: sum(len(self._postings.get(t, ())) for t in grp))
+            scores = None
+            for grp in groups:
+                grp_scores = {}
+                for term in grp:
+                    posting = self._postings.get(term)
+                    if not posting:
+                        continue
+                    idf = math.log(1.0 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for pid, tf in posting.items():
+                        if scores is not None and pid not in scores:
+                            continue
+                        norm = K1 * (1.0 - B + B * self._docs[pid].length / avg_len)
+                        s = idf * tf * (K1 + 1.0) / (tf + norm)
+                        if s > grp_scores.get(pid, 0.0):
+                            grp_scores[pid] = s
+                if scores is None:
+                    scores = grp_scores
+                else:
+                    scores = {pid: scores[pid] + s for pid, s in grp_scores.items()}
+                if not scores:
+                    return [], 0
+            skills = set(skills) if skills else None
+            docs = self._docs
+            matched = [(s, docs[pid]) for pid, s in scores.items() if docs[pid].matches(skills, budget_min, budget_max)]
+        top = heapq.nlargest(offset + limit, matched, key=lambda x: (x[0], x[1].created_at))[offset:]
+        hits = [{
+            "id": doc.id,
+            "score": score,
+            "title": doc.title,
+            "highlight": {
+                "title": highlight(doc.title, terms, partial),
+                "description": highlight(doc.description, terms, partial, SNIPPET_TOKENS),
+            },
+        } for score, doc in top]
+        return hits, len(matched)
+
+
+_HL_OPEN, _HL_CLOSE = "\x02", "\x03"
+
+
+def _fts_markup(text: str) -> str:
+    return html.escape(text or "").replace(_HL_OPEN, "<mark>").replace(_HL_CLOSE, "</mark>")
+
+
+class SqliteSearchBackend:
+    """SQLite FTS5 index with bm25() ranking. Column weights mirror FIELD_WEIGHTS."""
+
+    def __init__(self, path: str = ":memory:"):
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS project_meta (
+                doc INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, budget INTEGER, created_at TEXT, title TEXT
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS project_fts USING fts5(
+                title, skills, deliverables, description,
+                tokenize = "unicode61 remove_diacritics 2 tokenchars '+#'"
+            );
+            CREATE TABLE IF NOT EXISTS project_skill (
+                skill TEXT NOT NULL, doc INTEGER NOT NULL, PRIMARY KEY (skill, doc)
+            ) WITHOUT ROWID;
+        """)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM project_meta").fetchone()[0]
+
+    def upsert(self, row: dict):
+        with self._lock, self._conn:
+            self._remove(str(row["id"]))
+            if (row.get("status") or "open") != "open":
+                return
+            cur = self._conn.execute(
+                "INSERT INTO project_meta (id, budget, created_at, title) VALUES (?, ?, ?, ?)",
+                (str(row["id"]), row.get("budget") or 0, row.get("created_at") or "", row.get("title") or ""),
+            )
+            doc = cur.lastrowid
+            self._conn.execute(
+                "INSERT INTO project_fts (rowid, title, skills, deliverables, description) VALUES (?, ?, ?, ?, ?)",
+                (doc, row.get("title") or "", _as_text(row.get("skills")), _as_text(row.get("deliverables")), row.get("description") or ""),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO project_skill (skill, doc) VALUES (?, ?)",
+                [(s, doc) for s in (row.get("skills") or [])],
+            )
+
+    def remove(self, project_id):
+        with self._lock, self._conn:
+            self._remove(str(project_id))
+
+    def _remove(self, project_id: str):
+        found = self._conn.execute("SELECT doc FROM project_meta WHERE id = ?", (project_id,)).fetchone()
+        if not found:
+            return
+        self._conn.execute("DELETE FROM project_fts WHERE rowid = ?", found)
+        self._conn.execute("DELETE FROM project_skill WHERE doc = ?", found)
+        self._conn.execute("DELETE FROM project_meta WHERE doc = ?", found)
+
+    def search(self, query: str, skills=None, budget_min=None, budget_max=None, limit: int = 20, offset: int = 0, prefix: bool = True):
+        terms, partial = parse_query(query, prefix)
+        parts = [f'"{t}"' for t in terms]
+        if partial is not None:
+            parts.append(f'"{partial}"*')
+        if not parts:
+            return [], 0
+        where = ["project_fts MATCH ?"]
+        args = [" AND ".join(parts)]
+        if skills:
+            where.append(f"m.doc IN (SELECT doc FROM project_skill WHERE skill IN ({','.join('?' * len(skills))}))")
+            args.extend(skills)
+        if budget_min is not None:
+            where.append("m.budget >= ?")
+            args.append(budget_min)
+        if budget_max is not None:
+            where.append("m.budget <= ?")
+            args.append(budget_max)
+        base = "FROM project_fts JOIN project_meta m ON m.doc = project_fts.rowid WHERE " + " AND ".join(where)
+        weights = ", ".join(str(w) for w in FIELD_WEIGHTS.values())
+        with self._lock:
+            total = self._conn.execute("SELECT count(*) " + base, args).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT m.id, -bm25(project_fts, {weights}) AS score, m.title, "
+                f"highlight(project_fts, 0, '{_HL_OPEN}', '{_HL_CLOSE}'), "
+                f"snippet(project_fts, 3, '{_HL_OPEN}', '{_HL_CLOSE}', '…', {SNIPPET_TOKENS}) "
+                + base + " ORDER BY score DESC, m.created_at DESC LIMIT ? OFFSET ?",
+                args + [limit, offset],
+            ).fetchall()
+        hits = [{
+            "id": pid,
+            "score": score,
+            "title": title,
+            "highlight": {"title": _fts_markup(hl_title), "description": _fts_markup(snip)},
+        } for pid, score, title, hl_title, snip in rows]
+        return hits, total
+
+
+def _new_backend():
+    if SEARCH_BACKEND == "sqlite":
+        return SqliteSearchBackend()
+    return MemorySearchBackend()
+
+
+def _load(backend):
+    from .supabase_client import get_supabase, iter_pages
+    supabase = get_supabase(service_role=True)
+    for row in iter_pages(lambda: supabase.table("projects").select(INDEX_COLUMNS).eq("status", "open").order("id")):
+        backend.upsert(row)
+
+
+project_index = LiveIndex(_new_backend, _load, SEARCH_RESYNC_SECONDS, "project search")
+
+
+def index_project(row: dict):
+    """Add or refresh a project (closed projects are dropped). No-op until the index has loaded."""
+    if row and row.get("id"):
+        project_index.apply("upsert", row)
+
+
+def unindex_project(project_id):
+    project_index.apply("remove", project_id)
+
+
+def search_projects(query: str, **kwargs):
+    return project_index.get().search(query, **kwargs)
@@ -0,0 +1,141 @@
+"""Per-process admission control and graceful drain for production serving.
+
+Under gunicorn's gevent worker (gunicorn.conf.py) every request is a greenlet, so a blocked
+upstream call costs a little memory rather than a thread. These limits keep one process from
+taking on more than it can finish: at most MAX_IN_FLIGHT_REQUESTS ordinary requests and
+MAX_SSE_STREAMS event streams at a time. A request that cannot get a slot within
+ADMISSION_WAIT_SECONDS gets a 503 with Retry-After, rather than piling onto the upstream
+connection pools. A slot is held until the response body has been sent, so streamed lists
+count too.
+
+begin_drain() (called by gunicorn.conf.py on SIGTERM, DRAIN_SECONDS before the worker stops
+listening) makes /healthz report 503, turns new requests away with Connection: close and wakes
+open event streams so they end at once; the worker can then exit within its graceful
+timeout. shutdown() then lets background job and scoring work already running finish.
+"""
+import logging
+import os
+import threading
+
+from flask import g, jsonify, request
+
+MAX_IN_FLIGHT_REQUESTS = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", "0"))  # 0 = no limit
+MAX_SSE_STREAMS = int(os.getenv("MAX_SSE_STREAMS", "0"))
+ADMISSION_WAIT_SECONDS = float(os.getenv("ADMISSION_WAIT_SECONDS", "0.5"))
+STREAM_ENDPOINTS = frozenset({"messages.stream"})
+EXEMPT_ENDPOINTS = frozenset({"healthz", "metrics"})
+
+log = logging.getLogger(__name__)
+
+
+class Limiter:
+    """Counting semaphore that also reports how many slots are taken and how many were refused."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._slots = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+
+    def acquire(self, timeout: float) -> bool:
+        if self._slots is not None and not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"limit": self.limit, "in_flight": self.in_flight, "peak": self.peak, "rejected": self.rejected}
+
+
+requests_limiter = Limiter(MAX_IN_FLIGHT_REQUESTS)
+streams_limiter = Limiter(MAX_SSE_STREAMS)
+_draining = threading.Event()
+
+
+def draining() -> bool:
+    return _draining.is_set()
+
+
+def begin_drain():
+    _draining.set()
+    from . import events
+    if events._hub is not None:
+        events._hub.close_all()
+
+
+def _unavailable(message: str):
+    resp = jsonify({"error": message})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = "1"
+    return resp
+
+
+def _before_request():
+    if request.endpoint in EXEMPT_ENDPOINTS:
+        return None
+    if draining():
+        resp = _unavailable("Server is restarting")
+        resp.headers["Connection"] = "close"
+        return resp
+    limiter = streams_limiter if request.endpoint in STREAM_ENDPOINTS else requests_limiter
+    if not limiter.acquire(ADMISSION_WAIT_SECONDS):
+        return _unavailable("Server busy")
+    g._admission = limiter
+    return None
+
+
+def _after_request(response):
+    # Teardown runs as soon as the view returns; hold the slot until the body has been sent.
+    limiter = g.pop("_admission", None)
+    if limiter is not None:
+        response.call_on_close(limiter.release)
+    return response
+
+
+def _teardown_request(exc=None):
+    limiter = g.pop("_admission", None)  # only left here when the view raised
+    if limiter is not None:
+        limiter.release()
+
+
+def healthz():
+    if draining():
+        return _unavailable("draining")
+    return jsonify({"ok": True})
+
+
+def shutdown(wait: bool = True):
+    """Let running background jobs and scoring batches finish. Work still queued is picked up
+    again by the stale checks in the interview status endpoint."""
+    from . import jobs, scoring
+    begin_drain()
+    for component in (jobs._queue, scoring._pipeline):
+        if component is not None:
+            try:
+                component.shutdown(wait=wait)
+            except Exception:
+                log.exception("Shutting down %s failed", type(component).__name__)
+
+
+def stats() -> dict:
+    return {"requests": requests_limiter.stats(), "streams": streams_limiter.stats()}
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/healthz", "healthz", healthz)
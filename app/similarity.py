@@ -0,0 +1,242 @@
+"""Similar projects and near-duplicate postings from project title and description text.
+
+Each open project keeps two local representations, with no embedding service involved:
+
+- a MinHash signature over word 3-gram shingles, bucketed by LSH bands. Projects sharing a
+  band bucket are near-duplicate candidates, so duplicate checks touch a few buckets and
+  never scan the whole index.
+- a hashed term-frequency vector (term -> crc32 feature) plus document frequencies per
+  feature, so TF-IDF cosine similarity can be computed for any candidate with current IDFs.
+
+similar() ranks the LSH candidates together with projects sharing the query's most
+distinctive terms (rarest first, capped at MAX_CANDIDATES), so it stays sublinear for
+loosely related projects too. Like the search index, it is a LiveIndex kept current by the project write
+handlers.
+"""
+import heapq
+import math
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from .live_index import LiveIndex
+from .search import tokenize
+
+SIMILARITY_RESYNC_SECONDS = float(os.getenv("SIMILARITY_RESYNC_SECONDS", "600"))
+INDEX_COLUMNS = "id, client_id, title, description, status, created_at"
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard collide in at least one band
+ROWS = NUM_PERM // BANDS
+FEATURE_BITS = 20
+TITLE_WEIGHT = 2
+TOP_TERMS = 8
+MAX_CANDIDATES = 200
+# Cached document norms are dropped once the index size drifts this much (IDFs have moved).
+NORM_REFRESH_RATIO = 0.01
+DUPLICATE_JACCARD = 0.6
+DUPLICATE_COSINE = 0.85
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20261017)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+_EMPTY = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+
+
+def _crc(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def minhash(tokens: list) -> np.ndarray:
+    """MinHash signature of the token list's word shingles (all permutations at once)."""
+    n = SHINGLE_SIZE if len(tokens) >= SHINGLE_SIZE else 1
+    shingles = {" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+    if not shingles:
+        return _EMPTY
+    x = np.fromiter((_crc(s) % _PRIME for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def _bands(signature: np.ndarray) -> list:
+    return [(b, signature[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+
+def _features(title: str, description: str) -> dict:
+    tf = {}
+    for tokens, weight in ((tokenize(title), TITLE_WEIGHT), (tokenize(description), 1)):
+        for t in tokens:
+            f = _crc(t) & ((1 << FEATURE_BITS) - 1)
+            tf[f] = tf.get(f, 0) + weight
+    return tf
+
+
+class _Doc:
+    __slots__ = ("id", "client_id", "title", "created_at", "signature", "tf")
+
+    def __init__(self, row: dict):
+        self.id = str(row["id"])
+        self.client_id = row.get("client_id")
+        self.title = row.get("title") or ""
+        self.created_at = row.get("created_at") or ""
+        title, description = row.get("title") or "", row.get("description") or ""
+        self.signature = minhash(tokenize(f"{title} {description}"))
+        self.tf = _features(title, description)
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._buckets = {}  # (band, band bytes) -> set of ids
+        self._postings = {}  # feature -> set of ids
+        self._norms = {}  # id -> TF-IDF norm at _norms_size
+        self._norms_size = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def upsert(self, row: dict):
+        doc = _Doc(row)
+        with self._lock:
+            self._remove(doc.id)
+            if (row.get("status") or "open") != "open":
+                return
+            self._docs[doc.id] = doc
+            for key in _bands(doc.signature):
+                self._buckets.setdefault(key, set()).add(doc.id)
+            for f in doc.tf:
+                self._postings.setdefault(f, set()).add(doc.id)
+
+    def remove(self, project_id):
+        with self._lock:
+            self._remove(str(project_id))
+
+    def _remove(self, project_id: str):
+        doc = self._docs.pop(project_id, None)
+        if doc is None:
+            return
+        self._norms.pop(project_id, None)
+        for key in _bands(doc.signature):
+            ids = self._buckets.get(key)
+            if ids is not None:
+                ids.discard(project_id)
+                if not ids:
+                    del self._buckets[key]
+        for f in doc.tf:
+            ids = self._postings.get(f)
+            if ids is not None:
+                ids.discard(project_id)
+                if not ids:
+                    del self._postings[f]
+
+    def _idf(self, feature: int) -> float:
+        return math.log((1 + len(self._docs)) / (1 + len(self._postings.get(feature, ())))) + 1
+
+    def _weight(self, feature: int, count: int) -> float:
+        return (1 + math.log(count)) * self._idf(feature)
+
+    def _norm(self, doc: _Doc) -> float:
+        norm = self._norms.get(doc.id)
+        if norm is None:
+            norm = self._norms[doc.id] = math.sqrt(sum(self._weight(f, c) ** 2 for f, c in doc.tf.items())) or 1.0
+        return norm
+
+    def _lsh_candidates(self, signature: np.ndarray) -> set:
+        out = set()
+        for key in _bands(signature):
+            out |= self._buckets.get(key, set())
+        return out
+
+    def _ranked(self, doc: _Doc, k: int, exclude: set, with_terms: bool) -> list:
+        if abs(len(self._docs) - self._norms_size) > max(1, self._norms_size * NORM_REFRESH_RATIO):
+            self._norms = {}
+            self._norms_size = len(self._docs)
+        candidates = self._lsh_candidates(doc.signature) - exclude
+        vec = {f: self._weight(f, c) for f, c in doc.tf.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        if with_terms:
+            # The query's most distinctive terms, rarest posting list first, up to MAX_CANDIDATES.
+            terms = heapq.nlargest(TOP_TERMS, vec, key=vec.get)
+            for f in sorted(terms, key=lambda f: len(self._postings.get(f, ()))):
+                for pid in self._postings.get(f, ()):
+                    if len(candidates) >= MAX_CANDIDATES:
+                        break
+                    if pid not in exclude:
+                        candidates.add(pid)
+        scored = []
+        for pid in candidates:
+            other = self._docs.get(pid)
+            if other is None:
+                continue
+            dot = sum(w * self._weight(f, other.tf[f]) for f, w in vec.items() if f in other.tf)
+            cosine = dot / (norm * self._norm(other))
+            jaccard = float(np.mean(doc.signature == other.signature))
+            if cosine > 0:
+                scored.append((cosine, jaccard, other))
+        return heapq.nlargest(k, scored, key=lambda x: (x[0], x[2].created_at))
+
+    def similar(self, row: dict, k: int = 10) -> list:
+        """[{id, title, similarity, overlap}] of the k open projects closest to row's text."""
+        doc = _Doc(row)
+        with self._lock:
+            top = self._ranked(doc, k, {doc.id}, with_terms=True)
+        return [{"id": o.id, "title": o.title, "similarity": round(c, 4), "overlap": round(j, 4)} for c, j, o in top]
+
+    def duplicates(self, row: dict, k: int = 5) -> list:
+        """Open projects that look like reposts of row: LSH candidates above either threshold."""
+        doc = _Doc(row)
+        with self._lock:
+            top = self._ranked(doc, k, {doc.id}, with_terms=False)
+        return [{
+            "id": o.id,
+            "title": o.title,
+            "similarity": round(c, 4),
+            "overlap": round(j, 4),
+            "same_client": o.client_id is not None and o.client_id == doc.client_id,
+        } for c, j, o in top if j >= DUPLICATE_JACCARD or c >= DUPLICATE_COSINE]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"projects": len(self._docs), "buckets": len(self._buckets), "features": len(self._postings)}
+
+
+def _load(index):
+    from .supabase_client import get_supabase, iter_pages
+    supabase = get_supabase(service_role=True)
+    for row in iter_pages(lambda: supabase.table("projects").select(INDEX_COLUMNS).eq("status", "open").order("id")):
+        index.upsert(row)
+
+
+similarity_index = LiveIndex(SimilarityIndex, _load, SIMILARITY_RESYNC_SECONDS, "project similarity")
+
+
+def index_project(row: dict):
+    """Add or refresh a project's text (projects that are not open are dropped)."""
+    if row and row.get("id"):
+        similarity_index.apply("upsert", row)
+
+
+def unindex_project(project_id):
+    similarity_index.apply("remove", project_id)
+
+
+def similar_projects(row: dict, k: int = 10) -> list:
+    return similarity_index.get().similar(row, k)
+
+
+def possible_duplicates(row: dict, k: int = 5) -> list | None:
+    """Likely reposts of row, or None when the index has not loaded yet (the check is skipped
+    rather than holding up the write)."""
+    index = similarity_index.peek()
+    if index is None:
+        similarity_index.warm()
+        return None
+    return index.duplicates(row, k)
+
+
+def stats():
+    index = similarity_index.peek()
+    return index.stats() if index is not None else None
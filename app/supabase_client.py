@@ -1,14 +1,164 @@
+"""Supabase clients, one per role, sharing nothing but configuration.
+
+Each role (anon, service) gets its own client built lazily under a lock, backed by its own
+httpx connection pool so concurrent requests from every blueprint reuse warm keep-alive
+connections. Pool size and timeouts come from SUPABASE_POOL_SIZE, SUPABASE_KEEPALIVE,
+SUPABASE_KEEPALIVE_EXPIRY, SUPABASE_TIMEOUT and SUPABASE_CONNECT_TIMEOUT. Requests go through
+a counting transport whose numbers are exposed by client_stats(), and each request is
+recorded in app.metrics by table and operation. set_client_factory()
+replaces client construction (for example with an in-memory fake).
+"""
 import os
+import threading
+import time
+
+import httpx
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
+
+from .metrics import observe_upstream
+
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+SUPABASE_KEEPALIVE = int(os.getenv("SUPABASE_KEEPALIVE", str(SUPABASE_POOL_SIZE)))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3"))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "false").lower() in ("1", "true", "yes")
+
+def _operation(request: httpx.Request):
+    """(operation, table or function) for a PostgREST request, e.g. ("select", "projects")."""
+    parts = request.url.path.rstrip("/").split("/")
+    if len(parts) >= 2 and parts[-2] == "rpc":
+        return "rpc", parts[-1]
+    method = request.method
+    if method == "POST":
+        op = "upsert" if "merge-duplicates" in request.headers.get("Prefer", "") else "insert"
+    else:
+        op = {"GET": "select", "HEAD": "count", "PATCH": "update", "DELETE": "delete"}.get(method, method.lower())
+    return op, parts[-1] if parts else ""
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """HTTPTransport that counts requests, in-flight requests, errors, new connections and how
+    many completed responses came over a reused connection."""
+
+    def __init__(self, role: str, **kwargs):
+        super().__init__(**kwargs)
+        self.role = role
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.responses = 0
+        self.reused = 0
+
+    def _trace(self, inner, opened):
+        def trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                opened.append(True)
+                with self._lock:
+                    self.connections_opened += 1
+            if inner:
+                inner(event_name, info)
+        return trace
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        opened = []
+        request.extensions["trace"] = self._trace(request.extensions.get("trace"), opened)
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = super().handle_request(request)
+            ok = response.status_code < 400
+            with self._lock:
+                self.responses += 1
+                if not opened:
+                    self.reused += 1
+            return response
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            operation, target = _operation(request)
+            observe_upstream("supabase", operation, target, time.perf_counter() - start, ok)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "requests": self.requests,
+                "errors": self.errors,
+                "connections_opened": self.connections_opened,
+                "reuse_rate": self.reused / self.responses if self.responses else 0.0,
+            }
+
+
+def _build_client(role: str) -> Client:
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY") if role == "service" else os.getenv("SUPABASE_ANON_KEY")
+    if not url or not key:
+        raise RuntimeError("SUPABASE_URL and SUPABASE keys must be set")
+    transport = CountingTransport(
+        role,
+        http2=SUPABASE_HTTP2,
+        limits=httpx.Limits(max_connections=SUPABASE_POOL_SIZE, max_keepalive_connections=SUPABASE_KEEPALIVE, keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY),
+    )
+    http = httpx.Client(transport=transport, timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT), follow_redirects=True)
+    client = create_client(url, key, options=SyncClientOptions(httpx_client=http, postgrest_client_timeout=SUPABASE_TIMEOUT))
+    client.postgrest  # build the lazily created PostgREST client here, under the lock
+    _transports[role] = transport
+    return client
+
+
+_clients = {}
+_transports = {}  # role -> CountingTransport, filled by _build_client
+_lock = threading.Lock()
+_factory = None
 
-_client: Client | None = None
 
 def get_supabase(service_role: bool = False) -> Client:
-    global _client
-    if _client is None:
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_KEY") if service_role else os.getenv("SUPABASE_ANON_KEY")
-        if not url or not key:
-            raise RuntimeError("SUPABASE_URL and SUPABASE keys must be set")
-        _client = create_client(url, key)
-    return _client
+    role = "service" if service_role else "anon"
+    client = _clients.get(role)
+    if client is None:
+        with _lock:
+            client = _clients.get(role)
+            if client is None:
+                client = (_factory or _build_client)(role)
+                _clients[role] = client
+    return client
+
+
+def set_client_factory(factory=None):
+    """Build clients with factory(role) instead of the real Supabase client; None restores it."""
+    global _factory
+    with _lock:
+        _factory = factory
+        _clients.clear()
+        _transports.clear()
+
+
+def client_stats() -> dict:
+    with _lock:
+        return {role: t.stats() for role, t in _transports.items()}
+
+
+def iter_pages(build_query, page_size: int = 1000):
+    """Yield every row of build_query() (a fresh, ordered query each call) page by page."""
+    start = 0
+    while True:
+        r = build_query().range(start, start + page_size - 1).execute()
+        rows = (r.data if r and hasattr(r, "data") else []) or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        start += page_size
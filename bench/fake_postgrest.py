@@ -0,0 +1,616 @@
+"""In-memory stand-in for the Supabase client, covering the PostgREST subset this app uses.
+
+FakeSupabase().table(name) supports select (columns, "*", embeds such as projects(title),
+profiles!client_id(...) and reverse one-to-many embeds, count=), eq/neq/gt/gte/lt/lte,
+in_, is_, ilike, overlaps, or_ (nested and()/or() logic trees, quoted values), order,
+limit, range, single/maybe_single, insert, upsert, update and delete. rpc() runs the Python
+versions of the SQL functions in supabase/migrations registered in RPCS.
+
+Every execute() is one simulated round trip: it sleeps for the configured latency, is
+counted per request context (round_trips(); calls fanned out through app.parallel run in
+copies of the caller's context and count towards it) and is reported to app.metrics like a real call.
+"""
+import contextvars
+import copy
+import functools
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from postgrest.exceptions import APIError
+
+from app.metrics import observe_upstream
+
+# Reverse embeds whose foreign key is not <singular parent>_id.
+REVERSE_FK = {("message_threads", "messages"): "thread_id", ("profiles", "portfolio_items"): "user_id"}
+UNIQUE = {"interview_answers": [("interview_id", "idx")], "proposals": [("project_id", "freelancer_id")]}
+DEFAULTS = {
+    "message_threads": {"client_unread": 0, "freelancer_unread": 0},
+    "interviews": {"answer_count": 0, "scoring_queued_at": None, "scoring_requeues": 0},
+    "messages": {"read_at": None},
+}
+INDEXED_SUFFIX = "_id"
+EXCERPT_CHARS = 280
+# Generated columns, recomputed on every insert/update.
+GENERATED = {"proposals": lambda row: {"cover_letter_excerpt": (row.get("cover_letter") or "")[:EXCERPT_CHARS]}}
+# AFTER INSERT triggers (supabase/migrations), by table; defined with the SQL functions below.
+AFTER_INSERT = {}
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _singular(name: str) -> str:
+    return name[:-1] if name.endswith("s") else name
+
+
+def _split_top(s: str, sep: str = ","):
+    """Split on sep outside parentheses and double quotes."""
+    out, depth, buf, quoted, escape = [], 0, [], False, False
+    for ch in s:
+        if escape:
+            buf.append(ch)
+            escape = False
+            continue
+        if ch == "\\" and quoted:
+            buf.append(ch)
+            escape = True
+            continue
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            out.append("".join(buf))
+            buf = []
+        else:
+            buf.append(ch)
+    if buf:
+        out.append("".join(buf))
+    return [p.strip() for p in out if p.strip()]
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def _coerce(row_value, value):
+    """Bring a filter value (often a string from the URL syntax) to the row value's type."""
+    if isinstance(value, str):
+        if value == "null":
+            return None
+        if isinstance(row_value, bool):
+            return value.lower() == "true"
+        if isinstance(row_value, (int, float)):
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    if isinstance(value, bool) and isinstance(row_value, str):
+        return str(value).lower()
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(row_value, str):
+        return str(value)
+    return value
+
+
+@functools.lru_cache(maxsize=1024)
+def _like(pattern: str, case_insensitive: bool = True):
+    out, escape = [], False
+    for ch in pattern:
+        if escape:
+            out.append(re.escape(ch))
+            escape = False
+        elif ch == "\\":
+            escape = True
+        elif ch in "*%":
+            out.append(".*")
+        elif ch == "_":
+            out.append(".")
+        else:
+            out.append(re.escape(ch))
+    return re.compile("^" + "".join(out) + "$", re.S | (re.I if case_insensitive else 0))
+
+
+def _compare(op: str, row_value, value) -> bool:
+    if op == "is":
+        v = _unquote(value) if isinstance(value, str) else value
+        if v in (None, "null"):
+            return row_value is None
+        return row_value is (str(v).lower() == "true")
+    if op == "in":
+        return any(row_value == _coerce(row_value, v) for v in value)
+    if op in ("like", "ilike"):
+        return isinstance(row_value, str) and bool(_like(value, op == "ilike").match(row_value))
+    if op == "ov":
+        return bool(set(row_value or []) & set(value))
+    if op == "cs":
+        return set(value) <= set(row_value or [])
+    value = _coerce(row_value, value)
+    if op == "eq":
+        return row_value == value
+    if op == "neq":
+        return row_value is not None and row_value != value
+    if row_value is None or value is None:
+        return False
+    try:
+        return {"gt": row_value > value, "gte": row_value >= value, "lt": row_value < value, "lte": row_value <= value}[op]
+    except TypeError:
+        return False
+
+
+def _parse_condition(cond: str):
+    """One PostgREST logic-tree node: and(...), or(...), not.<op>.<v> or <col>.<op>.<value>."""
+    for kind in ("and", "or"):
+        if cond.startswith(kind + "(") and cond.endswith(")"):
+            parts = [_parse_condition(c) for c in _split_top(cond[len(kind) + 1:-1])]
+            return (lambda row: all(p(row) for p in parts)) if kind == "and" else (lambda row: any(p(row) for p in parts))
+    col, op, value = cond.split(".", 2)
+    negate = False
+    if op == "not":
+        negate = True
+        op, value = value.split(".", 1)
+    if op == "in":
+        value = [_unquote(v) for v in _split_top(value.strip("()"))]
+    else:
+        value = _unquote(value)
+    pred = lambda row: _compare(op, row.get(col), value)
+    return (lambda row: not pred(row)) if negate else pred
+
+
+def parse_or(expr: str):
+    return _parse_condition(f"or({expr})")
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_select(columns: str):
+    """((kind, name, fk_hint, subselect), ...) where kind is "col", "star" or "embed"."""
+    out = []
+    for item in _split_top(columns or "*"):
+        if item == "*":
+            out.append(("star", None, None, None))
+        elif "(" in item:
+            head, sub = item.split("(", 1)
+            rel, _, hint = head.partition("!")
+            out.append(("embed", rel.strip(), hint.strip() or None, sub[:-1]))
+        else:
+            out.append(("col", item.split(":")[-1].strip(), None, None))
+    return tuple(out)
+
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables = {}  # table -> {id: row}
+        self.indexes = {}  # (table, column) -> {value: set(ids)}
+        self.lock = threading.RLock()
+        self.rpcs = dict(RPCS)
+        self._trips = contextvars.ContextVar(f"fake_db_trips_{id(self)}", default=None)
+        self.total_round_trips = 0
+
+    # --- storage ---------------------------------------------------------------------------
+    def rows(self, table: str) -> dict:
+        return self.tables.setdefault(table, {})
+
+    def _index(self, table: str, column: str) -> dict:
+        key = (table, column)
+        idx = self.indexes.get(key)
+        if idx is None:
+            idx = self.indexes[key] = {}
+            for rid, row in self.rows(table).items():
+                idx.setdefault(row.get(column), set()).add(rid)
+        return idx
+
+    def _reindex(self, table: str, rid, old: dict | None, new: dict | None):
+        for (t, column), idx in self.indexes.items():
+            if t != table:
+                continue
+            if old is not None:
+                ids = idx.get(old.get(column))
+                if ids:
+                    ids.discard(rid)
+            if new is not None:
+                idx.setdefault(new.get(column), set()).add(rid)
+
+    def load(self, table: str, rows):
+        """Bulk-load seed rows (no round trip, no defaults beyond id)."""
+        with self.lock:
+            store = self.rows(table)
+            for row in rows:
+                row = dict(row)
+                row.setdefault("id", str(uuid.uuid4()))
+                store[row["id"]] = row
+                self._reindex(table, row["id"], None, row)
+
+    def insert_row(self, table: str, row: dict, upsert_on=None) -> dict:
+        row = {**DEFAULTS.get(table, {}), **row}
+        if table in GENERATED:
+            row.update(GENERATED[table](row))
+        ts = now_iso()
+        row.setdefault("created_at", ts)
+        if table == "message_threads":
+            row.setdefault("updated_at", ts)
+        store = self.rows(table)
+        for cols in ([tuple(upsert_on)] if upsert_on else []) + UNIQUE.get(table, []):
+            match = self.find(table, {c: row.get(c) for c in cols})
+            if match:
+                if upsert_on and tuple(cols) == tuple(upsert_on):
+                    return self.update_row(table, match[0]["id"], row)
+                raise APIError({"message": f"duplicate key value violates unique constraint on {table} {cols}", "code": "23505", "hint": None, "details": None})
+        row.setdefault("id", str(uuid.uuid4()))
+        if row["id"] in store and upsert_on:
+            return self.update_row(table, row["id"], row)
+        store[row["id"]] = row
+        self._reindex(table, row["id"], None, row)
+        if table in AFTER_INSERT:
+            AFTER_INSERT[table](self, row)
+        return row
+
+    def update_row(self, table: str, rid, changes: dict) -> dict:
+        store = self.rows(table)
+        old = store[rid]
+        new = {**old, **changes}
+        if table in GENERATED:
+            new.update(GENERATED[table](new))
+        store[rid] = new
+        self._reindex(table, rid, old, new)
+        return new
+
+    def delete_row(self, table: str, rid) -> dict:
+        old = self.rows(table).pop(rid)
+        self._reindex(table, rid, old, None)
+        return old
+
+    def find(self, table: str, equals: dict) -> list:
+        """Rows of table whose columns equal every value in equals (uses the id/*_id indexes)."""
+        store = self.rows(table)
+        candidates = None
+        for col, value in equals.items():
+            if col == "id":
+                candidates = [value] if value in store else []
+                break
+            if col.endswith(INDEXED_SUFFIX):
+                candidates = list(self._index(table, col).get(value, ()))
+                break
+        rows = store.values() if candidates is None else [store[c] for c in candidates if c in store]
+        return [r for r in rows if all(r.get(c) == v for c, v in equals.items())]
+
+    # --- round trips -----------------------------------------------------------------------
+    def round_trip(self, operation: str, target: str):
+        start = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            counter = self._trips.get()
+            if counter is not None:
+                counter[0] += 1
+            self.total_round_trips += 1
+        return start
+
+    def finish(self, operation: str, target: str, start: float, ok: bool = True):
+        observe_upstream("supabase", operation, target, time.perf_counter() - start, ok)
+
+    def reset_round_trips(self):
+        self._trips.set([0])
+
+    def round_trips(self) -> int:
+        counter = self._trips.get()
+        return counter[0] if counter else 0
+
+    # --- projection ------------------------------------------------------------------------
+    def project(self, table: str, row: dict, columns: str) -> dict:
+        out = {}
+        for kind, name, hint, sub in _parse_select(columns):
+            if kind == "star":
+                out.update(row)
+            elif kind == "col":
+                out[name] = row.get(name)
+            else:
+                out[name] = self._embed(table, row, name, hint, sub)
+        return out
+
+    def _embed(self, table: str, row: dict, rel: str, hint, sub: str):
+        fk = hint or f"{_singular(rel)}_id"
+        if fk in row:
+            target = self.rows(rel).get(row.get(fk))
+            return self.project(rel, target, sub) if target else None
+        back = REVERSE_FK.get((table, rel)) or f"{_singular(table)}_id"
+        return [self.project(rel, r, sub) for r in self.find(rel, {back: row["id"]})]
+
+
+class Query:
+    def __init__(self, db: FakeDatabase, table: str):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.columns = "*"
+        self.count = None
+        self.payload = None
+        self.on_conflict = None
+        self.filters = []  # (column, op, value) or ("__or__", predicate)
+        self.orders = []
+        self.limit_n = None
+        self.offset = 0
+        self.single_mode = None
+
+    # --- verbs -------------------------------------------------------------------------------
+    def select(self, columns: str = "*", count=None, head=None):
+        self.columns, self.count = columns, count
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = "", **kwargs):
+        self.op, self.payload = "upsert", payload
+        self.on_conflict = [c.strip() for c in on_conflict.split(",") if c.strip()] or None
+        return self
+
+    def update(self, payload, **kwargs):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self, **kwargs):
+        self.op = "delete"
+        return self
+
+    # --- filters -----------------------------------------------------------------------------
+    def _filter(self, column, op, value):
+        self.filters.append((column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", list(values))
+
+    def is_(self, column, value):
+        return self._filter(column, "is", "null" if value is None else str(value).lower())
+
+    def ilike(self, column, pattern):
+        return self._filter(column, "ilike", pattern)
+
+    def like(self, column, pattern):
+        return self._filter(column, "like", pattern)
+
+    def overlaps(self, column, values):
+        return self._filter(column, "ov", list(values))
+
+    def contains(self, column, values):
+        return self._filter(column, "cs", list(values))
+
+    def or_(self, expr: str, reference_table=None):
+        self.filters.append(("__or__", parse_or(expr), None))
+        return self
+
+    # --- modifiers ---------------------------------------------------------------------------
+    def order(self, column, desc: bool = False, nullsfirst=None, foreign_table=None, **kwargs):
+        if foreign_table:
+            return self  # embedded rows keep insertion order
+        self.orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, n: int, **kwargs):
+        self.limit_n = n
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self.offset, self.limit_n = start, end - start + 1
+        return self
+
+    def single(self):
+        self.single_mode = "single"
+        return self
+
+    def maybe_single(self):
+        self.single_mode = "maybe"
+        return self
+
+    # --- execution ---------------------------------------------------------------------------
+    def _matches(self, row) -> bool:
+        for column, op, value in self.filters:
+            if column == "__or__":
+                if not op(row):
+                    return False
+            elif not _compare(op, row.get(column), value):
+                return False
+        return True
+
+    def _candidates(self) -> list:
+        equals = {c: v for c, op, v in self.filters if op == "eq" and c != "__or__" and (c == "id" or c.endswith(INDEXED_SUFFIX))}
+        if equals:
+            col, value = next(iter(equals.items()))
+            return [r for r in self.db.find(self.table, {col: value}) if self._matches(r)]
+        return [r for r in self.db.rows(self.table).values() if self._matches(r)]
+
+    def _sorted(self, rows: list) -> list:
+        for column, desc, nulls_first in reversed(self.orders):
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=desc)
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    def execute(self):
+        op = self.op
+        start = self.db.round_trip(op, self.table)
+        ok = False
+        try:
+            with self.db.lock:
+                data, count = self._run()
+            data = copy.deepcopy(data)
+            ok = True
+        finally:
+            self.db.finish(op, self.table, start, ok)
+        if self.single_mode:
+            if len(data) > 1:
+                raise APIError({"message": "Cannot coerce the result to a single JSON object", "code": "406", "hint": None, "details": "The result contains more than one row."})
+            if not data:
+                if self.single_mode == "maybe":
+                    return None
+                raise APIError({"message": "Cannot coerce the result to a single JSON object", "code": "406", "hint": None, "details": "The result contains 0 rows"})
+            return SimpleNamespace(data=data[0], count=count)
+        return SimpleNamespace(data=data, count=count)
+
+    def _run(self):
+        db = self.db
+        if self.op in ("insert", "upsert"):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            rows = [db.insert_row(self.table, dict(p), self.on_conflict if self.op == "upsert" else None) for p in payload]
+            return [dict(r) for r in rows], None
+        rows = self._candidates()
+        if self.op == "update":
+            return [dict(db.update_row(self.table, r["id"], self.payload)) for r in rows], None
+        if self.op == "delete":
+            return [dict(db.delete_row(self.table, r["id"])) for r in rows], None
+        rows = self._sorted(rows)
+        count = len(rows) if self.count else None
+        end = None if self.limit_n is None else self.offset + self.limit_n
+        rows = rows[self.offset:end]
+        return [db.project(self.table, r, self.columns) for r in rows], count
+
+
+class RpcCall:
+    def __init__(self, db: FakeDatabase, name: str, params: dict):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        start = self.db.round_trip("rpc", self.name)
+        ok = False
+        try:
+            fn = self.db.rpcs.get(self.name)
+            if fn is None:
+                raise APIError({"message": f"Could not find the function public.{self.name}", "code": "PGRST202", "hint": None, "details": None})
+            with self.db.lock:
+                data = copy.deepcopy(fn(self.db, **self.params))
+            ok = True
+        finally:
+            self.db.finish("rpc", self.name, start, ok)
+        return SimpleNamespace(data=data, count=None)
+
+
+class FakeSupabase:
+    """Drop-in for supabase.Client as far as this app is concerned: table(), from_(), rpc()."""
+
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+
+    def table(self, name: str) -> Query:
+        return Query(self.db, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: dict | None = None, **kwargs) -> RpcCall:
+        return RpcCall(self.db, name, params or {})
+
+
+# --- SQL functions (supabase/migrations), in Python --------------------------------------------
+
+def _messages_bump_thread_unread(db, message):
+    thread = db.rows("message_threads").get(message["thread_id"])
+    if not thread:
+        return
+    sender = message["sender_id"]
+    db.update_row("message_threads", thread["id"], {
+        "updated_at": message["created_at"],
+        "client_unread": thread.get("client_unread", 0) + (0 if thread["client_id"] == sender else 1),
+        "freelancer_unread": thread.get("freelancer_unread", 0) + (0 if thread["freelancer_id"] == sender else 1),
+    })
+
+
+def _mark_thread_read(db, p_thread_id, p_reader_id):
+    ts = now_iso()
+    for m in db.find("messages", {"thread_id": p_thread_id}):
+        if m.get("sender_id") != p_reader_id and m.get("read_at") is None:
+            db.update_row("messages", m["id"], {"read_at": ts})
+    thread = db.rows("message_threads").get(p_thread_id)
+    if thread:
+        db.update_row("message_threads", p_thread_id, {
+            "client_unread": 0 if thread["client_id"] == p_reader_id else thread.get("client_unread", 0),
+            "freelancer_unread": 0 if thread["freelancer_id"] == p_reader_id else thread.get("freelancer_unread", 0),
+        })
+    return ts
+
+
+def _append_interview_answer(db, p_interview_id, p_freelancer_id, p_answer, p_expected_index=None):
+    inv = db.rows("interviews").get(p_interview_id)
+    if not inv or inv.get("freelancer_id") != p_freelancer_id or inv.get("status") != "in_progress":
+        return {"ok": False, "error": "not_in_progress"}
+    count, total = inv.get("answer_count") or 0, len(inv.get("questions") or [])
+    if count >= total:
+        return {"ok": False, "error": "complete", "answer_count": count, "question_count": total}
+    if p_expected_index is not None and p_expected_index != count:
+        return {"ok": False, "error": "stale", "answer_count": count, "question_count": total}
+    db.insert_row("interview_answers", {"interview_id": p_interview_id, "idx": count, "answer": p_answer})
+    done = count + 1 >= total
+    db.update_row("interviews", p_interview_id, {
+        "answer_count": count + 1,
+        "status": "scoring" if done else inv["status"],
+        "scoring_queued_at": now_iso() if done else inv.get("scoring_queued_at"),
+    })
+    return {"ok": True, "index": count, "answer_count": count + 1, "question_count": total}
+
+
+def _create_proposal(db, p_project_id, p_freelancer_id, p_cover_letter, p_proposed_budget, p_timeline, p_portfolio_item_ids):
+    interviews = sorted(db.find("interviews", {"project_id": p_project_id, "freelancer_id": p_freelancer_id}), key=lambda r: r.get("created_at") or "")
+    if not interviews or not interviews[-1].get("passed"):
+        return {"ok": False, "error": "interview_required"}
+    if db.find("proposals", {"project_id": p_project_id, "freelancer_id": p_freelancer_id}):
+        return {"ok": False, "error": "duplicate"}
+    row = db.insert_row("proposals", {
+        "project_id": p_project_id, "freelancer_id": p_freelancer_id, "cover_letter": p_cover_letter,
+        "proposed_budget": p_proposed_budget, "timeline": p_timeline, "portfolio_item_ids": p_portfolio_item_ids,
+        "interview_id": interviews[-1]["id"], "status": "active",
+        "interview_score": interviews[-1].get("score") or 0, "interview_passed": True,
+    })
+    return {"ok": True, "proposal": row}
+
+
+def _accept_proposal(db, p_proposal_id, p_client_id):
+    prop = db.rows("proposals").get(p_proposal_id)
+    project = db.rows("projects").get(prop["project_id"]) if prop else None
+    if not project or project.get("client_id") != p_client_id:
+        return {"ok": False, "error": "forbidden"}
+    if prop.get("status") != "active":
+        return {"ok": False, "error": "not_active"}
+    db.update_row("proposals", p_proposal_id, {"status": "accepted"})
+    declined = 0
+    for other in db.find("proposals", {"project_id": project["id"], "status": "active"}):
+        db.update_row("proposals", other["id"], {"status": "declined"})
+        declined += 1
+    db.update_row("projects", project["id"], {"status": "in_progress"})
+    return {"ok": True, "project_id": project["id"], "declined": declined}
+
+
+AFTER_INSERT["messages"] = _messages_bump_thread_unread
+
+RPCS = {
+    "mark_thread_read": _mark_thread_read,
+    "append_interview_answer": _append_interview_answer,
+    "create_proposal": _create_proposal,
+    "accept_proposal": _accept_proposal,
+}
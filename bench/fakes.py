@@ -0,0 +1,78 @@
+"""Stand-ins for Firebase token verification and the OpenAI chat API, and install() to wire
+them (plus the fake Supabase client) into the app."""
+import hashlib
+import json
+import re
+import time
+from types import SimpleNamespace
+
+from app import auth_middleware, interviews, profiles, scoring, supabase_client
+from .fake_postgrest import FakeSupabase
+
+TOKEN_PREFIX = "bench:"
+
+
+def token_for(uid: str) -> str:
+    return TOKEN_PREFIX + uid
+
+
+class FakeVerifier:
+    """verify_id_token replacement: "bench:<uid>" is a valid token for uid, anything else raises."""
+
+    def __init__(self, latency: float = 0.0, ttl: float = 3600):
+        self.latency = latency
+        self.ttl = ttl
+        self.calls = 0
+
+    def __call__(self, token: str, *args, **kwargs) -> dict:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if not token.startswith(TOKEN_PREFIX):
+            raise ValueError("invalid token")
+        return {"uid": token[len(TOKEN_PREFIX):], "exp": time.time() + self.ttl}
+
+
+class FakeLLM:
+    """Just enough of openai.OpenAI for this app: chat.completions.create with canned answers
+    (questions, single or batched scores, profile extraction) after a fixed latency."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _reply(self, prompt: str) -> str:
+        digest = lambda s: int(hashlib.sha256(s.encode("utf-8")).hexdigest()[:8], 16)
+        if "interview questions" in prompt:
+            return "\n".join(f"Question {i + 1} about {prompt[-40:].strip()}?" for i in range(5))
+        m = re.search(r"Transcripts \(JSON array of (\d+) strings\):\n(.*)", prompt, re.S)
+        if m:
+            return json.dumps([55 + digest(t) % 45 for t in json.loads(m.group(2))])
+        if "freelancer profile page" in prompt:
+            return json.dumps({"bio": "Full-stack developer.", "portfolio": [{"title": "Shop", "description": "E-commerce site", "link": None, "image": None}]})
+        return ""
+
+    def create(self, model=None, messages=(), **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "\n".join(m.get("content") or "" for m in messages)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self._reply(prompt)))])
+
+
+def install(db, verifier: FakeVerifier, llm: FakeLLM, scoring_batch_wait: float | None = None):
+    """Route the app's Supabase, Firebase and OpenAI calls to the fakes. Call before create_app()."""
+    from firebase_admin import auth as firebase_auth
+    fake = FakeSupabase(db)
+    supabase_client.set_client_factory(lambda role: fake)
+    auth_middleware._firebase_app = object()  # skip credential discovery
+    firebase_auth.verify_id_token = verifier
+    interviews._get_openai = lambda: llm
+    profiles.OPENAI_API_KEY = profiles.OPENAI_API_KEY or "bench"
+    profiles.OpenAI = lambda **kwargs: llm
+    kwargs = {} if scoring_batch_wait is None else {"batch_wait": scoring_batch_wait}
+    scoring.set_pipeline(scoring.ScoringPipeline(scoring.OpenAIScorer(lambda: llm), **kwargs))
+    auth_middleware.invalidate_token_cache()
+    auth_middleware.invalidate_role()
+    return fake
@@ -0,0 +1,197 @@
+"""Benchmark runner: seeds the fake database, runs scenarios on a thread pool against the Flask
+app, and reports latency percentiles, throughput and Supabase round trips per request.
+
+    python -m bench                                   # all scenarios, small dataset
+    python -m bench -s inbox -s browse -n 500 -c 8    # pick scenarios, iterations, concurrency
+    python -m bench --json report.json                # also write the report as JSON
+    python -m bench --write-baseline bench/baseline.json
+    python -m bench --check bench/baseline.json       # CI: exit 1 on regressions or errors
+
+--check compares each endpoint's round trips per request with the baseline (they barely depend
+on the machine, so this is the signal CI should gate on) and fails on any request error. Means
+are compared only when the run uses the baseline's settings; maxima always. Latency is compared
+only when --latency-tolerance is given.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+from .fake_postgrest import FakeDatabase
+from .fakes import FakeLLM, FakeVerifier, install
+from .scenarios import SCENARIOS, Session
+from .seed import SIZES, Dataset
+
+MAX_ERRORS_KEPT = 20
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}  # endpoint -> [(seconds, round_trips, ok)]
+        self.errors = []
+
+    def record(self, endpoint: str, seconds: float, round_trips: int, ok: bool):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((seconds, round_trips, ok))
+
+    def error(self, endpoint: str, status: int, body):
+        with self._lock:
+            if len(self.errors) < MAX_ERRORS_KEPT:
+                self.errors.append({"endpoint": endpoint, "status": status, "body": body})
+
+    @staticmethod
+    def _summary(samples: list, wall: float | None = None) -> dict:
+        lat = sorted(s[0] for s in samples)
+        trips = [s[1] for s in samples]
+        out = {
+            "requests": len(samples),
+            "errors": sum(1 for s in samples if not s[2]),
+            "p50_ms": round(percentile(lat, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(lat, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(lat, 0.99) * 1000, 3),
+            "max_ms": round(lat[-1] * 1000, 3) if lat else 0.0,
+            "round_trips": round(sum(trips) / len(trips), 3) if trips else 0.0,
+            "max_round_trips": max(trips) if trips else 0,
+        }
+        if wall:
+            out["throughput_rps"] = round(len(samples) / wall, 1)
+        return out
+
+    def report(self, wall: float) -> dict:
+        everything = [s for samples in self.samples.values() for s in samples]
+        return {
+            **self._summary(everything, wall),
+            "wall_seconds": round(wall, 3),
+            "endpoints": {ep: self._summary(s) for ep, s in sorted(self.samples.items())},
+            "sample_errors": self.errors,
+        }
+
+
+def run_scenario(app, db, data, name: str, iterations: int, concurrency: int, seed: int) -> dict:
+    fn = SCENARIOS[name][1]
+    recorder = Recorder()
+    counter = iter(range(iterations))
+    counter_lock = threading.Lock()
+
+    def worker(index: int):
+        client = app.test_client()
+        rng = random.Random(seed * 1000 + index)
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    return
+            fn(Session(client, db, recorder, rng), data)
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"bench-{name}-{i}") for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder.report(time.perf_counter() - start)
+
+
+def run(args) -> dict:
+    db = FakeDatabase(latency=args.db_latency_ms / 1000)
+    data = Dataset(args.size, args.seed)
+    data.load_into(db)
+    install(db, FakeVerifier(args.auth_latency_ms / 1000), FakeLLM(args.llm_latency_ms / 1000))
+    from app import create_app
+    from app.live_index import warm_all
+    app = create_app()
+    warm_all(wait=True)
+    names = args.scenario or list(SCENARIOS)
+    report = {
+        "config": {k: getattr(args, k) for k in ("size", "seed", "iterations", "concurrency", "warmup", "db_latency_ms", "llm_latency_ms", "auth_latency_ms")},
+        "dataset": data.counts(),
+        "scenarios": {},
+    }
+    for name in names:
+        if args.warmup:
+            run_scenario(app, db, data, name, args.warmup, 1, args.seed + 1)
+        report["scenarios"][name] = {"blueprint": SCENARIOS[name][0], **run_scenario(app, db, data, name, args.iterations, args.concurrency, args.seed)}
+    return report
+
+
+def print_report(report: dict, out=sys.stdout):
+    cfg = report["config"]
+    print(f"dataset={cfg['size']} {report['dataset']}  iterations={cfg['iterations']} concurrency={cfg['concurrency']} "
+          f"db_latency={cfg['db_latency_ms']}ms llm_latency={cfg['llm_latency_ms']}ms", file=out)
+    header = f"{'endpoint':<34}{'reqs':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'trips':>7}{'max':>5}"
+    for name, sc in report["scenarios"].items():
+        print(f"\n[{name}] {sc['requests']} requests in {sc['wall_seconds']}s = {sc['throughput_rps']} req/s, "
+              f"p50 {sc['p50_ms']} / p95 {sc['p95_ms']} / p99 {sc['p99_ms']} ms, {sc['round_trips']} round trips/request", file=out)
+        print(header, file=out)
+        for ep, s in sc["endpoints"].items():
+            print(f"{ep:<34}{s['requests']:>7}{s['errors']:>5}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['round_trips']:>7.2f}{s['max_round_trips']:>5}", file=out)
+        for e in sc["sample_errors"][:5]:
+            print(f"  error: {e['endpoint']} -> {e['status']} {e['body']}", file=out)
+
+
+def check(report: dict, baseline: dict, trips_tolerance: float, latency_tolerance: float | None) -> list:
+    """Regressions of report against baseline, as human-readable strings."""
+    problems = []
+    # Cache hit rates depend on the run length, so mean round trips are only comparable when the
+    # run matches the baseline's config; the per-request maximum is compared regardless.
+    same_config = baseline.get("config") == report["config"]
+    for name, sc in report["scenarios"].items():
+        if sc["errors"]:
+            problems.append(f"{name}: {sc['errors']} failed requests")
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for ep, s in sc["endpoints"].items():
+            b = base["endpoints"].get(ep)
+            if not b:
+                continue
+            allowed = b["round_trips"] * (1 + trips_tolerance) + 0.25
+            if same_config and s["round_trips"] > allowed:
+                problems.append(f"{name} {ep}: {s['round_trips']} round trips/request, baseline {b['round_trips']}")
+            if s["max_round_trips"] > b["max_round_trips"]:
+                problems.append(f"{name} {ep}: up to {s['max_round_trips']} round trips, baseline {b['max_round_trips']}")
+            if latency_tolerance is not None and s["p95_ms"] > b["p95_ms"] * (1 + latency_tolerance) + 1:
+                problems.append(f"{name} {ep}: p95 {s['p95_ms']} ms, baseline {b['p95_ms']} ms")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="scenario to run (repeatable; default all)")
+    parser.add_argument("-n", "--iterations", type=int, default=200, help="sessions per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="concurrent sessions")
+    parser.add_argument("--warmup", type=int, default=5, help="unrecorded sessions per scenario first")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small", help="dataset size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="simulated Supabase round-trip time")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="simulated OpenAI call time")
+    parser.add_argument("--auth-latency-ms", type=float, default=0.0, help="simulated Firebase verification time")
+    parser.add_argument("--json", metavar="PATH", help="write the report as JSON")
+    parser.add_argument("--write-baseline", metavar="PATH", help="write the report as the new baseline")
+    parser.add_argument("--check", metavar="BASELINE", help="compare with a baseline; exit 1 on regressions")
+    parser.add_argument("--trips-tolerance", type=float, default=0.1, help="allowed relative round-trip increase")
+    parser.add_argument("--latency-tolerance", type=float, default=None, help="allowed relative p95 increase (off by default)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print_report(report)
+    for path in filter(None, (args.json, args.write_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+    if args.check:
+        with open(args.check) as f:
+            problems = check(report, json.load(f), args.trips_tolerance, args.latency_tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
@@ -0,0 +1,129 @@
+"""Load scenarios, one per area of the API. Each scenario is one user session: a short sequence
+of requests made through Session.call(), which records latency, status and round trips."""
+import threading
+import time
+
+from .fakes import token_for
+
+SCENARIOS = {}
+MAX_POLLS = 200
+
+
+def scenario(name: str, blueprint: str):
+    def register(fn):
+        SCENARIOS[name] = (blueprint, fn)
+        return fn
+    return register
+
+
+class Session:
+    def __init__(self, client, db, recorder, rng, uid: str | None = None):
+        self.client = client
+        self.db = db
+        self.recorder = recorder
+        self.rng = rng
+        self.uid = uid
+
+    def call(self, endpoint: str, method: str, path: str, json=None, expect=(200, 201, 202), **query):
+        headers = {"Authorization": f"Bearer {token_for(self.uid)}"} if self.uid else {}
+        self.db.reset_round_trips()
+        start = time.perf_counter()
+        resp = self.client.open(path, method=method, json=json, headers=headers, query_string=query or None)
+        body = resp.get_json(silent=True)  # drains streamed bodies inside the timed window
+        resp.close()
+        elapsed = time.perf_counter() - start
+        ok = resp.status_code in expect
+        self.recorder.record(endpoint, elapsed, self.db.round_trips(), ok)
+        if not ok:
+            self.recorder.error(endpoint, resp.status_code, body)
+        return body if ok else None
+
+
+@scenario("inbox", "messages")
+def inbox(s: Session, data):
+    s.uid = s.rng.choice(list(data.threads_by_user))
+    threads = s.call("messages.list_threads", "GET", "/api/messages/threads")
+    s.call("messages.unread", "GET", "/api/messages/unread")
+    if not threads or not threads["items"]:
+        return
+    thread_id = s.rng.choice(threads["items"][:10])["id"]
+    page = s.call("messages.get_thread", "GET", f"/api/messages/thread/{thread_id}", limit=20)
+    if page and page.get("prev_cursor"):
+        s.call("messages.older", "GET", f"/api/messages/thread/{thread_id}/messages", before=page["prev_cursor"], limit=20)
+    s.call("messages.send", "POST", f"/api/messages/thread/{thread_id}/messages", json={"body": "Sounds good, talk soon."})
+
+
+@scenario("browse", "projects")
+def browse(s: Session, data):
+    s.uid = None
+    rng = s.rng
+    skills = rng.sample(data.skills_in_use, 2)  # sent as repeated ?skills= parameters
+    first = s.call("projects.list", "GET", "/api/projects", limit=20)
+    if first and first.get("next_cursor"):
+        s.call("projects.list_next", "GET", "/api/projects", limit=20, cursor=first["next_cursor"])
+    s.call("projects.list_skills", "GET", "/api/projects", limit=20, skills=skills, budget_min=1500)
+    word = rng.choice(["dashboard", "api", "mobile", "store", "pipeline"])
+    s.call("projects.search", "GET", "/api/projects", q=f"{word} platform", limit=20)
+    s.call("projects.suggest", "GET", "/api/projects/suggest", q=word[:3])
+    project_id = rng.choice(data.open_projects)
+    s.call("projects.get", "GET", f"/api/projects/{project_id}")
+    s.call("projects.similar", "GET", f"/api/projects/{project_id}/similar", limit=5)
+    listing = s.call("profiles.freelancers", "GET", "/api/profiles/freelancers", skills=skills, sort="rate_asc", limit=20)
+    if listing and listing["items"]:
+        s.call("profiles.freelancer", "GET", f"/api/profiles/freelancer/{rng.choice(listing['items'])['username']}")
+
+
+_pairs_lock = threading.Lock()
+_pairs = {}
+
+
+def _next_pair(data):
+    with _pairs_lock:
+        it = _pairs.get(id(data))
+        if it is None:
+            it = _pairs[id(data)] = iter(data.interview_pairs)
+        return next(it, None)
+
+
+@scenario("interview", "interviews")
+def interview(s: Session, data):
+    pair = _next_pair(data)
+    if pair is None:
+        return
+    project_id, s.uid = pair
+    inv = s.call("interviews.start", "POST", f"/api/interviews/start/{project_id}")
+    if not inv:
+        return
+    status = inv.get("status")
+    for _ in range(MAX_POLLS):
+        if status != "generating":
+            break
+        time.sleep(0.01)
+        st = s.call("interviews.status", "GET", f"/api/interviews/{inv['id']}/status")
+        status = st.get("status") if st else None
+    full = s.call("interviews.get", "GET", f"/api/interviews/{inv['id']}")
+    for i, _ in enumerate((full or {}).get("questions") or []):
+        s.call("interviews.answer", "POST", f"/api/interviews/{inv['id']}/answer", json={"answer": f"My answer to question {i + 1}, with details.", "index": i})
+    s.call("interviews.status", "GET", f"/api/interviews/{inv['id']}/status")
+
+
+@scenario("proposal_review", "proposals")
+def proposal_review(s: Session, data):
+    s.uid = s.rng.choice(data.clients_with_proposals)
+    project_id = s.rng.choice(data.projects_with_proposals[s.uid])
+    sort = s.rng.choice(["newest", "score", "budget_asc"])
+    listing = s.call("proposals.list_by_project", "GET", f"/api/proposals/project/{project_id}", sort=sort, limit=5)
+    if listing and listing.get("next_cursor"):
+        s.call("proposals.list_next", "GET", f"/api/proposals/project/{project_id}", sort=sort, limit=5, cursor=listing["next_cursor"])
+    for p in ((listing or {}).get("items") or [])[:3]:
+        s.call("proposals.get", "GET", f"/api/proposals/{p['id']}")
+    s.call("projects.my", "GET", "/api/projects/my")
+
+
+@scenario("matching", "projects")
+def matching(s: Session, data):
+    s.uid = s.rng.choice(data.freelancers)
+    s.call("projects.recommended", "GET", "/api/projects/recommended", limit=20)
+    s.uid = s.rng.choice(list(data.projects_by_client))
+    project_id = s.rng.choice(data.projects_by_client[s.uid])
+    s.call("projects.suggested_freelancers", "GET", f"/api/projects/{project_id}/suggested-freelancers", limit=20)
@@ -0,0 +1,141 @@
+"""Deterministic datasets for the benchmark scenarios."""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+SKILLS = [
+    "python", "django", "flask", "react", "angular", "vue", "node", "typescript", "go", "rust",
+    "java", "kotlin", "swift", "flutter", "postgres", "mongodb", "aws", "gcp", "docker", "kubernetes",
+    "figma", "seo", "copywriting", "data-analysis", "machine-learning", "devops", "shopify", "wordpress",
+]
+WORDS = "build ship scale design refactor migrate integrate automate optimize launch dashboard api mobile web store platform pipeline".split()
+
+SIZES = {
+    "small": {"clients": 20, "freelancers": 120, "projects": 150, "threads": 200, "messages_per_thread": 15, "proposals_per_project": 6},
+    "medium": {"clients": 60, "freelancers": 500, "projects": 800, "threads": 1000, "messages_per_thread": 25, "proposals_per_project": 12},
+    "large": {"clients": 150, "freelancers": 2000, "projects": 3000, "threads": 4000, "messages_per_thread": 40, "proposals_per_project": 25},
+}
+
+
+class Dataset:
+    """Seeded rows plus the handles scenarios draw from (who owns what)."""
+
+    def __init__(self, size: str = "small", seed: int = 7):
+        self.size = size
+        self.rng = random.Random(seed)
+        self.spec = SIZES[size]
+        self.now = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        self.tables = {}
+        self.clients = []
+        self.freelancers = []
+        self.projects_by_client = {}
+        self.threads_by_user = {}
+        self.open_projects = []
+        self.interview_pairs = []
+        self.skills_in_use = []
+        self.projects_with_proposals = {}
+        self.clients_with_proposals = []
+        self._build()
+
+    def _id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _ts(self, max_days_ago: float) -> str:
+        return (self.now - timedelta(seconds=self.rng.uniform(0, max_days_ago * 86400))).isoformat(timespec="microseconds")
+
+    def _sentence(self, n: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+    def _build(self):
+        rng, spec = self.rng, self.spec
+        profiles = []
+        for i in range(spec["clients"]):
+            uid = self._id()
+            profiles.append({"id": uid, "role": "client", "username": f"client{i}", "full_name": f"Client {i}", "company_name": f"Company {i}", "industry": "software", "bio": self._sentence(12), "created_at": self._ts(400)})
+            self.clients.append(uid)
+        for i in range(spec["freelancers"]):
+            uid = self._id()
+            profiles.append({
+                "id": uid, "role": "freelancer", "username": f"freelancer{i}", "full_name": f"Freelancer {i}",
+                "title": self._sentence(3), "bio": self._sentence(30), "skills": rng.sample(SKILLS, rng.randint(2, 8)),
+                "hourly_rate": rng.choice([15, 20, 25, 30, 40, 50, 60, 75, 90, 120]), "avatar_url": None, "created_at": self._ts(400),
+            })
+            self.freelancers.append(uid)
+        projects = []
+        for i in range(spec["projects"]):
+            client = rng.choice(self.clients)
+            status = "open" if rng.random() < 0.85 else rng.choice(["closed", "in_progress"])
+            row = {
+                "id": self._id(), "client_id": client, "title": f"{self._sentence(4)[:-1]} #{i}",
+                "description": " ".join(self._sentence(15) for _ in range(3)), "skills": rng.sample(SKILLS, rng.randint(1, 5)),
+                "budget": rng.choice([1000, 1500, 2500, 4000, 8000, 15000]), "timeline": rng.choice(["1 week", "1 month", "3 months"]),
+                "deliverables": [self._sentence(4) for _ in range(3)], "status": status, "created_at": self._ts(120),
+            }
+            projects.append(row)
+            self.projects_by_client.setdefault(client, []).append(row["id"])
+            if status == "open":
+                self.open_projects.append(row["id"])
+        interviews, proposals = [], []
+        for p in projects:
+            for fid in rng.sample(self.freelancers, min(len(self.freelancers), rng.randint(0, spec["proposals_per_project"]))):
+                questions = [f"Question {k + 1}?" for k in range(5)]
+                answers = [self._sentence(25) for _ in range(5)]
+                score = rng.randint(60, 98)
+                inv = {
+                    "id": self._id(), "project_id": p["id"], "freelancer_id": fid, "questions": questions, "answers": answers,
+                    "transcript": [{"q": q, "a": a} for q, a in zip(questions, answers)], "answer_count": 5,
+                    "score": score, "passed": True, "status": "completed", "created_at": self._ts(60),
+                }
+                interviews.append(inv)
+                cover_letter = " ".join(self._sentence(20) for _ in range(3))
+                proposals.append({
+                    "id": self._id(), "project_id": p["id"], "freelancer_id": fid, "interview_id": inv["id"],
+                    "cover_letter": cover_letter, "cover_letter_excerpt": cover_letter[:280],
+                    "proposed_budget": int(p["budget"] * rng.choice([0.8, 1.0, 1.2])),
+                    "timeline": p["timeline"], "portfolio_item_ids": [], "status": "active", "created_at": self._ts(30),
+                    "interview_score": score, "interview_passed": True,
+                })
+        interviewed = {(i["project_id"], i["freelancer_id"]) for i in interviews}
+        threads, messages = [], []
+        for _ in range(spec["threads"]):
+            p = rng.choice(projects)
+            fid = rng.choice(self.freelancers)
+            tid = self._id()
+            msgs = []
+            for _ in range(rng.randint(1, 2 * spec["messages_per_thread"])):
+                sender = rng.choice([p["client_id"], fid])
+                msgs.append({"id": self._id(), "thread_id": tid, "sender_id": sender, "body": self._sentence(rng.randint(4, 30)), "created_at": self._ts(30), "read_at": None})
+            msgs.sort(key=lambda m: m["created_at"])
+            for m in msgs[:-3]:
+                m["read_at"] = m["created_at"]
+            unread = lambda uid: sum(1 for m in msgs if m["read_at"] is None and m["sender_id"] != uid)
+            threads.append({
+                "id": tid, "project_id": p["id"], "client_id": p["client_id"], "freelancer_id": fid,
+                "created_at": msgs[0]["created_at"], "updated_at": msgs[-1]["created_at"],
+                "client_unread": unread(p["client_id"]), "freelancer_unread": unread(fid),
+            })
+            messages += msgs
+            for uid in (p["client_id"], fid):
+                self.threads_by_user.setdefault(uid, []).append(tid)
+        # Fresh (project, freelancer) pairs for the interview flow, in a fixed order.
+        self.interview_pairs = [(pid, fid) for pid in self.open_projects for fid in self.freelancers[:50] if (pid, fid) not in interviewed]
+        rng.shuffle(self.interview_pairs)
+        self.skills_in_use = sorted({sk for p in projects for sk in p["skills"]})
+        with_proposals = {}
+        by_id = {p["id"]: p for p in projects}
+        for prop in proposals:
+            client = by_id[prop["project_id"]]["client_id"]
+            with_proposals.setdefault(client, set()).add(prop["project_id"])
+        self.projects_with_proposals = {c: sorted(ids) for c, ids in with_proposals.items()}
+        self.clients_with_proposals = sorted(self.projects_with_proposals)
+        self.tables = {
+            "profiles": profiles, "projects": projects, "interviews": interviews, "proposals": proposals,
+            "message_threads": threads, "messages": messages,
+        }
+
+    def load_into(self, db):
+        for table, rows in self.tables.items():
+            db.load(table, rows)
+
+    def counts(self) -> dict:
+        return {t: len(rows) for t, rows in self.tables.items()}
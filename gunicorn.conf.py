@@ -0,0 +1,72 @@
+"""Production serving: gunicorn with gevent workers (see "Production serving and worker model" in README.md).
+
+    gunicorn -c gunicorn.conf.py index:app
+
+Each worker process monkey-patches the standard library, so every socket call (Supabase via
+httpx, OpenAI, Firebase token checks, outbound page fetches) yields to other requests instead
+of blocking. One worker holds up to WORKER_CONNECTIONS requests in flight.
+"""
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+worker_class = os.getenv("WORKER_CLASS", "gevent")
+# I/O-bound: one worker per core is enough, the concurrency comes from greenlets. Message
+# events only cross processes through Redis, so without EVENT_BACKEND=redis the default is
+# one worker, and asking for more is refused rather than silently losing SSE events.
+shared_events = os.getenv("EVENT_BACKEND", "memory") == "redis"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() if shared_events else 1)))
+if workers > 1 and not shared_events:
+    raise RuntimeError(
+        f"WEB_CONCURRENCY={workers} needs EVENT_BACKEND=redis (and REDIS_URL): with the memory "
+        "backend a message sent through one worker never reaches streams held by another"
+    )
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", "1000"))
+# No request should take this long; SSE streams send a heartbeat well within it.
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# After SIGTERM a worker keeps its listener open this long, answering 503 + Connection: close
+# and failing /healthz, so the load balancer takes it out of rotation before it stops
+# accepting. Counts against graceful_timeout.
+drain_seconds = min(float(os.getenv("DRAIN_SECONDS", "5")), graceful_timeout / 2)
+keepalive = int(os.getenv("KEEPALIVE_SECONDS", "5"))
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+# The app must be imported after the worker has monkey-patched, so never preload it.
+preload_app = False
+accesslog = os.getenv("ACCESS_LOG") or None
+errorlog = "-"
+
+# Greenlets are cheap, so let in-request fan-out (app/parallel.py) scale with the connection
+# count instead of the thread-sized default. Workers import the app after fork and read this.
+os.environ.setdefault("PARALLEL_WORKERS", str(worker_connections))
+
+
+def post_worker_init(worker):
+    """On SIGTERM, start draining (503s, /healthz down, event streams closed) and only after
+    drain_seconds let gunicorn stop accepting and wait for in-flight requests."""
+    from app import serving
+    stop = worker.handle_exit
+
+    def drain(sig, frame):
+        serving.begin_drain()
+        time.sleep(drain_seconds)
+        stop(sig, frame)
+
+    def handle_term(sig, frame):
+        # No blocking calls in the signal handler itself (gunicorn #1126): drain elsewhere.
+        if "gevent" in worker_class:
+            import gevent
+            gevent.spawn(drain, sig, frame)
+        else:
+            threading.Thread(target=drain, args=(sig, frame), daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    from app import serving
+    serving.shutdown(wait=True)
@@ -0,0 +1,23 @@
+-- Server-side filtering and keyset pagination for GET /api/projects.
+
+create extension if not exists pg_trgm;
+
+-- Keyset order: status = 'open' order by created_at desc, id desc
+create index if not exists projects_open_created_idx
+    on public.projects (created_at desc, id desc)
+    where status = 'open';
+
+-- skills && array[...]
+create index if not exists projects_skills_gin_idx
+    on public.projects using gin (skills);
+
+-- budget range filters
+create index if not exists projects_open_budget_idx
+    on public.projects (budget)
+    where status = 'open';
+
+-- q: title/description ilike '%...%'
+create index if not exists projects_title_trgm_idx
+    on public.projects using gin (title gin_trgm_ops);
+create index if not exists projects_description_trgm_idx
+    on public.projects using gin (description gin_trgm_ops);
@@ -0,0 +1,4 @@
+-- Warm-up scan for the in-process freelancer directory (app/directory.py).
+create index if not exists profiles_freelancer_created_idx
+    on public.profiles (created_at, id)
+    where role = 'freelancer';
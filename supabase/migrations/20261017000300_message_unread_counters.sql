@@ -0,0 +1,68 @@
+-- Per-participant unread counters kept on message_threads, so the inbox never scans messages.
+
+alter table public.message_threads
+    add column if not exists client_unread integer not null default 0,
+    add column if not exists freelancer_unread integer not null default 0;
+
+update public.message_threads t set
+    client_unread = (
+        select count(*) from public.messages m
+        where m.thread_id = t.id and m.read_at is null and m.sender_id <> t.client_id
+    ),
+    freelancer_unread = (
+        select count(*) from public.messages m
+        where m.thread_id = t.id and m.read_at is null and m.sender_id <> t.freelancer_id
+    );
+
+-- GET /api/messages/unread only touches threads with something unread.
+create index if not exists message_threads_client_unread_idx
+    on public.message_threads (client_id) where client_unread > 0;
+create index if not exists message_threads_freelancer_unread_idx
+    on public.message_threads (freelancer_id) where freelancer_unread > 0;
+
+create index if not exists messages_thread_unread_idx
+    on public.messages (thread_id) where read_at is null;
+
+-- Every message insert bumps updated_at and the recipient's counter in the same transaction,
+-- so the counter cannot drift from the messages when a later statement fails.
+create or replace function public.messages_bump_thread_unread() returns trigger
+language plpgsql
+as $$
+begin
+    update public.message_threads
+       set updated_at = coalesce(new.created_at, now()),
+           client_unread = client_unread + (case when client_id = new.sender_id then 0 else 1 end),
+           freelancer_unread = freelancer_unread + (case when freelancer_id = new.sender_id then 0 else 1 end)
+     where id = new.thread_id;
+    return null;
+end;
+$$;
+
+drop trigger if exists messages_bump_thread_unread on public.messages;
+create trigger messages_bump_thread_unread
+    after insert on public.messages
+    for each row execute function public.messages_bump_thread_unread();
+
+-- Called by mark_thread_read / get_thread: zero the reader's counter and stamp read_at on
+-- received messages in the same transaction. The thread row is updated first: its row lock
+-- waits for any message insert still bumping it, and the messages update that follows then
+-- sees that message, so the counter and read_at agree.
+create or replace function public.mark_thread_read(
+    p_thread_id public.message_threads.id%type,
+    p_reader_id public.message_threads.client_id%type
+) returns timestamptz
+language plpgsql
+as $$
+declare
+    v_now timestamptz := now();
+begin
+    update public.message_threads
+       set client_unread = case when client_id = p_reader_id then 0 else client_unread end,
+           freelancer_unread = case when freelancer_id = p_reader_id then 0 else freelancer_unread end
+     where id = p_thread_id;
+    update public.messages
+       set read_at = v_now
+     where thread_id = p_thread_id and sender_id <> p_reader_id and read_at is null;
+    return v_now;
+end;
+$$;
@@ -0,0 +1,3 @@
+-- Keyset pagination of a thread's history on (created_at, id).
+create index if not exists messages_thread_created_idx
+    on public.messages (thread_id, created_at desc, id desc);
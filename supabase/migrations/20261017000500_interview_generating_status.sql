@@ -0,0 +1,37 @@
+-- Interviews are created as 'generating' and move to 'in_progress' once questions are ready.
+
+-- Adds statuses to interviews_status_check without narrowing it: every value the existing
+-- constraint allows and every status already stored is kept. A no-op when all are allowed.
+create or replace function public.widen_interviews_status_check(p_statuses text[]) returns void
+language plpgsql
+as $$
+declare
+    v_def text;
+    v_existing text[];
+    v_allowed text[];
+begin
+    select pg_get_constraintdef(oid) into v_def
+      from pg_constraint
+     where conrelid = 'public.interviews'::regclass and conname = 'interviews_status_check';
+    select coalesce(array_agg(m[1]), '{}') into v_existing
+      from regexp_matches(coalesce(v_def, ''), '''([^'']*)''', 'g') as m;
+    if v_def is not null and p_statuses <@ v_existing then
+        return;
+    end if;
+    select array_agg(distinct s order by s) into v_allowed
+      from (
+          select unnest(p_statuses || v_existing) as s
+          union
+          select status::text from public.interviews where status is not null
+      ) v;
+    if v_def is not null then
+        alter table public.interviews drop constraint interviews_status_check;
+    end if;
+    execute format(
+        'alter table public.interviews add constraint interviews_status_check check (status::text = any (%L::text[]))',
+        v_allowed
+    );
+end;
+$$;
+
+select public.widen_interviews_status_check(array['generating', 'in_progress', 'completed']);
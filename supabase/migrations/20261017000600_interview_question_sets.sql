@@ -0,0 +1,11 @@
+-- Persistent tier of the interview question-set cache (app/question_cache.py).
+create table if not exists public.interview_question_sets (
+    id bigint generated always as identity primary key,
+    cache_key text not null,
+    prompt_version text not null,
+    questions jsonb not null,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists interview_question_sets_key_idx
+    on public.interview_question_sets (cache_key, created_at desc);
@@ -0,0 +1,59 @@
+-- Append-only interview answers: one row per (interview, question index) instead of
+-- rewriting the answers/transcript arrays on every submit.
+
+create table if not exists public.interview_answers (
+    interview_id uuid not null references public.interviews (id) on delete cascade,
+    idx integer not null check (idx >= 0),
+    answer text not null,
+    created_at timestamptz not null default now(),
+    primary key (interview_id, idx)
+);
+
+-- answer_count doubles as the interview's version for compare-and-set appends.
+alter table public.interviews
+    add column if not exists answer_count integer not null default 0;
+
+insert into public.interview_answers (interview_id, idx, answer)
+select i.id, a.ord - 1, a.answer
+  from public.interviews i,
+       jsonb_array_elements_text(coalesce(to_jsonb(i.answers), '[]'::jsonb)) with ordinality as a(answer, ord)
+on conflict do nothing;
+
+update public.interviews
+   set answer_count = jsonb_array_length(coalesce(to_jsonb(answers), '[]'::jsonb))
+ where answer_count = 0;
+
+-- Appends one answer under a row lock. p_expected_index, when given, must equal the current
+-- answer_count (compare-and-set); a mismatch returns error 'stale' and writes nothing.
+create or replace function public.append_interview_answer(
+    p_interview_id public.interviews.id%type,
+    p_freelancer_id public.interviews.freelancer_id%type,
+    p_answer text,
+    p_expected_index integer default null
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_status text;
+    v_count integer;
+    v_total integer;
+begin
+    select status, answer_count, jsonb_array_length(coalesce(to_jsonb(questions), '[]'::jsonb))
+      into v_status, v_count, v_total
+      from public.interviews
+     where id = p_interview_id and freelancer_id = p_freelancer_id
+       for update;
+    if not found or v_status <> 'in_progress' then
+        return jsonb_build_object('ok', false, 'error', 'not_in_progress');
+    end if;
+    if v_count >= v_total then
+        return jsonb_build_object('ok', false, 'error', 'complete', 'answer_count', v_count, 'question_count', v_total);
+    end if;
+    if p_expected_index is not null and p_expected_index <> v_count then
+        return jsonb_build_object('ok', false, 'error', 'stale', 'answer_count', v_count, 'question_count', v_total);
+    end if;
+    insert into public.interview_answers (interview_id, idx, answer) values (p_interview_id, v_count, p_answer);
+    update public.interviews set answer_count = v_count + 1 where id = p_interview_id;
+    return jsonb_build_object('ok', true, 'index', v_count, 'answer_count', v_count + 1, 'question_count', v_total);
+end;
+$$;
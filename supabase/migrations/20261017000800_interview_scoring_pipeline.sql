@@ -0,0 +1,45 @@
+-- Asynchronous scoring: the last answer moves an interview to 'scoring'; the scoring
+-- pipeline (app/scoring.py) moves it to 'completed' or, after repeated failures, 'score_failed'.
+
+alter table public.interviews
+    add column if not exists scoring_queued_at timestamptz,
+    add column if not exists scoring_requeues integer not null default 0;
+
+select public.widen_interviews_status_check(array['scoring', 'score_failed']);
+
+create or replace function public.append_interview_answer(
+    p_interview_id public.interviews.id%type,
+    p_freelancer_id public.interviews.freelancer_id%type,
+    p_answer text,
+    p_expected_index integer default null
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_status text;
+    v_count integer;
+    v_total integer;
+begin
+    select status, answer_count, jsonb_array_length(coalesce(to_jsonb(questions), '[]'::jsonb))
+      into v_status, v_count, v_total
+      from public.interviews
+     where id = p_interview_id and freelancer_id = p_freelancer_id
+       for update;
+    if not found or v_status <> 'in_progress' then
+        return jsonb_build_object('ok', false, 'error', 'not_in_progress');
+    end if;
+    if v_count >= v_total then
+        return jsonb_build_object('ok', false, 'error', 'complete', 'answer_count', v_count, 'question_count', v_total);
+    end if;
+    if p_expected_index is not null and p_expected_index <> v_count then
+        return jsonb_build_object('ok', false, 'error', 'stale', 'answer_count', v_count, 'question_count', v_total);
+    end if;
+    insert into public.interview_answers (interview_id, idx, answer) values (p_interview_id, v_count, p_answer);
+    update public.interviews
+       set answer_count = v_count + 1,
+           status = case when v_count + 1 >= v_total then 'scoring' else status end,
+           scoring_queued_at = case when v_count + 1 >= v_total then now() else scoring_queued_at end
+     where id = p_interview_id;
+    return jsonb_build_object('ok', true, 'index', v_count, 'answer_count', v_count + 1, 'question_count', v_total);
+end;
+$$;
@@ -0,0 +1,111 @@
+-- Proposal create/accept as single transactional calls. One proposal per (project, freelancer)
+-- is now enforced by a unique index instead of a check-then-insert in the API.
+
+-- Duplicates could only come from racing submits. Keep the most advanced row of each pair
+-- (accepted, then active, then anything else; earliest first within a status) so a hire record
+-- is never dropped. Two accepted rows for one pair cannot be resolved automatically: abort and
+-- list them for manual cleanup.
+do $$
+declare
+    v_conflicts text;
+begin
+    select string_agg(format('project %s / freelancer %s', project_id, freelancer_id), ', ')
+      into v_conflicts
+      from (
+          select project_id, freelancer_id
+            from public.proposals
+           where status = 'accepted'
+           group by project_id, freelancer_id
+          having count(*) > 1
+      ) c;
+    if v_conflicts is not null then
+        raise exception 'Multiple accepted proposals for the same pair, resolve by hand: %', v_conflicts;
+    end if;
+end;
+$$;
+
+delete from public.proposals p
+ using (
+     select id, row_number() over (
+                partition by project_id, freelancer_id
+                order by case status when 'accepted' then 0 when 'active' then 1 else 2 end, created_at, id
+            ) as rank
+       from public.proposals
+ ) ranked
+ where ranked.id = p.id
+   and ranked.rank > 1;
+
+create unique index if not exists proposals_project_freelancer_key
+    on public.proposals (project_id, freelancer_id);
+
+-- Inserts an active proposal if the freelancer's latest interview for the project passed.
+-- Errors: 'interview_required', 'duplicate'.
+create or replace function public.create_proposal(
+    p_project_id public.proposals.project_id%type,
+    p_freelancer_id public.proposals.freelancer_id%type,
+    p_cover_letter text,
+    p_proposed_budget integer,
+    p_timeline text,
+    p_portfolio_item_ids public.proposals.portfolio_item_ids%type
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_interview_id public.interviews.id%type;
+    v_passed boolean;
+    v_proposal jsonb;
+begin
+    select id, passed into v_interview_id, v_passed
+      from public.interviews
+     where project_id = p_project_id and freelancer_id = p_freelancer_id
+     order by created_at desc
+     limit 1;
+    if v_interview_id is null or not coalesce(v_passed, false) then
+        return jsonb_build_object('ok', false, 'error', 'interview_required');
+    end if;
+    insert into public.proposals as p
+           (project_id, freelancer_id, cover_letter, proposed_budget, timeline, portfolio_item_ids, interview_id, status)
+    values (p_project_id, p_freelancer_id, p_cover_letter, p_proposed_budget, p_timeline, p_portfolio_item_ids, v_interview_id, 'active')
+    on conflict (project_id, freelancer_id) do nothing
+    returning to_jsonb(p.*) into v_proposal;
+    if v_proposal is null then
+        return jsonb_build_object('ok', false, 'error', 'duplicate');
+    end if;
+    return jsonb_build_object('ok', true, 'proposal', v_proposal);
+end;
+$$;
+
+-- Accepts an active proposal on one of p_client_id's projects, declines the project's other
+-- active proposals and moves the project to in_progress. The project row lock serialises
+-- concurrent accepts on the same project. Errors: 'forbidden', 'not_active'.
+create or replace function public.accept_proposal(
+    p_proposal_id public.proposals.id%type,
+    p_client_id public.projects.client_id%type
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_project_id public.projects.id%type;
+    v_status text;
+    v_declined integer;
+begin
+    select pr.id into v_project_id
+      from public.projects pr
+      join public.proposals p on p.project_id = pr.id
+     where p.id = p_proposal_id and pr.client_id = p_client_id
+       for update of pr;
+    if v_project_id is null then
+        return jsonb_build_object('ok', false, 'error', 'forbidden');
+    end if;
+    select status into v_status from public.proposals where id = p_proposal_id for update;
+    if v_status <> 'active' then
+        return jsonb_build_object('ok', false, 'error', 'not_active');
+    end if;
+    update public.proposals set status = 'accepted' where id = p_proposal_id;
+    update public.proposals set status = 'declined'
+     where project_id = v_project_id and status = 'active' and id <> p_proposal_id;
+    get diagnostics v_declined = row_count;
+    update public.projects set status = 'in_progress' where id = v_project_id;
+    return jsonb_build_object('ok', true, 'project_id', v_project_id, 'declined', v_declined);
+end;
+$$;
@@ -0,0 +1,62 @@
+-- Summary listing for the client review screen: the interview's score/passed are copied onto
+-- proposals so the list can be sorted and keyset-paginated without embedding interviews, and
+-- a stored excerpt replaces the full cover letter in list payloads.
+
+alter table public.proposals
+    add column if not exists interview_score integer not null default 0,
+    add column if not exists interview_passed boolean not null default false,
+    add column if not exists cover_letter_excerpt text generated always as (left(cover_letter, 280)) stored;
+
+update public.proposals p
+   set interview_score = coalesce(i.score, 0),
+       interview_passed = coalesce(i.passed, false)
+  from public.interviews i
+ where i.id = p.interview_id;
+
+create or replace function public.proposals_copy_interview_score() returns trigger
+language plpgsql
+as $$
+begin
+    select coalesce(score, 0), coalesce(passed, false)
+      into new.interview_score, new.interview_passed
+      from public.interviews
+     where id = new.interview_id;
+    if not found then
+        new.interview_score := 0;
+        new.interview_passed := false;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists proposals_copy_interview_score on public.proposals;
+create trigger proposals_copy_interview_score
+    before insert or update of interview_id on public.proposals
+    for each row execute function public.proposals_copy_interview_score();
+
+create or replace function public.interviews_sync_proposal_score() returns trigger
+language plpgsql
+as $$
+begin
+    update public.proposals
+       set interview_score = coalesce(new.score, 0),
+           interview_passed = coalesce(new.passed, false)
+     where interview_id = new.id;
+    return null;
+end;
+$$;
+
+drop trigger if exists interviews_sync_proposal_score on public.interviews;
+create trigger interviews_sync_proposal_score
+    after update of score, passed on public.interviews
+    for each row
+    when (old.score is distinct from new.score or old.passed is distinct from new.passed)
+    execute function public.interviews_sync_proposal_score();
+
+-- One index per sort order of GET /api/proposals/project/<id>, each ending in id for the keyset.
+create index if not exists proposals_project_created_idx
+    on public.proposals (project_id, created_at desc, id desc);
+create index if not exists proposals_project_score_idx
+    on public.proposals (project_id, interview_score desc, id desc);
+create index if not exists proposals_project_budget_idx
+    on public.proposals (project_id, proposed_budget, id);
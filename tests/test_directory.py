@@ -0,0 +1,30 @@
+from app.directory import FreelancerDirectory
+
+
+def _directory(n=6):
+    d = FreelancerDirectory()
+    for i in range(1, n + 1):
+        d.upsert({"id": f"p{i}", "created_at": f"2026-01-{i + 1:02d}", "skills": ["python"], "hourly_rate": 10 * i})
+    return d
+
+
+def _ids(entries):
+    return [e["id"] for e in entries]
+
+
+def test_newest_first():
+    entries, total, next_after = _directory().query(limit=2)
+    assert _ids(entries) == ["p6", "p5"]
+    assert total == 6
+    assert next_after == ("2026-01-06", "p5")
+
+
+def test_readded_profile_keeps_created_at_order():
+    d = _directory()
+    d.remove("p1")
+    d.upsert({"id": "p1", "created_at": "2026-01-02", "skills": ["python"], "hourly_rate": 10, "role": "freelancer"})
+    assert _ids(d.query(limit=10)[0]) == ["p6", "p5", "p4", "p3", "p2", "p1"]
+    assert _ids(d.query(limit=2)[0]) == ["p6", "p5"]
+    # Cursor fallback (the cursor row is gone) bisects on created_at.
+    assert _ids(d.query(limit=2, after=("2026-01-05", "missing"))[0]) == ["p3", "p2"]
+    assert _ids(d.query(skills=["python"], rate_max=20, limit=10)[0]) == ["p2", "p1"]